@@ -0,0 +1,8 @@
+import os
+
+# Loaded automatically by `gunicorn app:app` (Procfile, start.sh, render.yaml).
+# Threaded workers: a request waiting on I/O (reCAPTCHA verification, uploads, downloads) holds one
+# thread, not a whole worker process, so a burst of slow requests does not block everyone else.
+# The number of worker processes still comes from WEB_CONCURRENCY (gunicorn's default).
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
@@ -0,0 +1,38 @@
+"""Delta storage columns on blob
+
+Revision ID: 2026_10_18_005
+Revises: 2026_10_18_004
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_005'
+down_revision = '2026_10_18_004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('blob')}
+    if 'base_hash' in columns:
+        # created by db.create_all() with the current model
+        return
+
+    with op.batch_alter_table('blob', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('base_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('delta_depth', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('stored_size', sa.BigInteger(), nullable=True))
+        batch_op.create_foreign_key('blob_base_hash_fkey', 'blob', ['base_hash'], ['blob_hash'])
+
+    op.execute("UPDATE blob SET stored_size = size")
+
+
+def downgrade():
+    with op.batch_alter_table('blob', schema=None) as batch_op:
+        batch_op.drop_constraint('blob_base_hash_fkey', type_='foreignkey')
+        batch_op.drop_column('stored_size')
+        batch_op.drop_column('delta_depth')
+        batch_op.drop_column('base_hash')
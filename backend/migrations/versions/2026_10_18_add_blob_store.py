@@ -0,0 +1,41 @@
+"""Add blob table and file_version.blob_hash
+
+Revision ID: 2026_10_18_004
+Revises: 2026_10_18_003
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_004'
+down_revision = '2026_10_18_003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all(), so the table may already exist at this point
+    if not sa.inspect(op.get_bind()).has_table('blob'):
+        op.create_table('blob',
+            sa.Column('blob_hash', sa.String(length=64), nullable=False),
+            sa.Column('size', sa.BigInteger(), nullable=True),
+            sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('created_date', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('blob_hash')
+        )
+
+    with op.batch_alter_table('file_version', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('blob_hash', sa.String(length=64), nullable=True))
+        batch_op.create_foreign_key('file_version_blob_hash_fkey', 'blob', ['blob_hash'], ['blob_hash'])
+        batch_op.create_index(batch_op.f('ix_file_version_blob_hash'), ['blob_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('file_version', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_file_version_blob_hash'))
+        batch_op.drop_constraint('file_version_blob_hash_fkey', type_='foreignkey')
+        batch_op.drop_column('blob_hash')
+
+    op.drop_table('blob')
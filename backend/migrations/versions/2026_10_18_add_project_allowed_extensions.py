@@ -0,0 +1,30 @@
+"""Per-project allowed extensions
+
+Revision ID: 2026_10_18_006
+Revises: 2026_10_18_005
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_006'
+down_revision = '2026_10_18_005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('project')}
+    if 'allowed_extensions' in columns:
+        # created by db.create_all() with the current model
+        return
+
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('allowed_extensions', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.drop_column('allowed_extensions')
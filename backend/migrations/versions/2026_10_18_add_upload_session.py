@@ -0,0 +1,55 @@
+"""Add upload_session table, widen file_version.file_size
+
+Revision ID: 2026_10_18_003
+Revises: 2026_10_18_002
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_003'
+down_revision = '2026_10_18_002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all(), so the table may already exist at this point
+    if not sa.inspect(op.get_bind()).has_table('upload_session'):
+        op.create_table('upload_session',
+            sa.Column('upload_id', sa.String(length=32), nullable=False),
+            sa.Column('file_name', sa.String(length=255), nullable=True),
+            sa.Column('file_type', sa.String(length=100), nullable=True),
+            sa.Column('file_size', sa.BigInteger(), nullable=True),
+            sa.Column('received_size', sa.BigInteger(), nullable=True),
+            sa.Column('comment', sa.String(length=100), nullable=True),
+            sa.Column('status', postgresql.ENUM('active', 'completed', name='upload_status_enum'), nullable=True),
+            sa.Column('created_date', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('updated_date', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('file_data_id', sa.Integer(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['file_data_id'], ['file_data.file_data_id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['user_profile.user_id'], ),
+            sa.PrimaryKeyConstraint('upload_id')
+        )
+
+    # multi-GB files do not fit in a 32-bit integer
+    with op.batch_alter_table('file_version', schema=None) as batch_op:
+        batch_op.alter_column('file_size',
+               existing_type=sa.Integer(),
+               type_=sa.BigInteger(),
+               existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('file_version', schema=None) as batch_op:
+        batch_op.alter_column('file_size',
+               existing_type=sa.BigInteger(),
+               type_=sa.Integer(),
+               existing_nullable=True)
+
+    op.drop_table('upload_session')
+    postgresql.ENUM(name='upload_status_enum').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,52 @@
+"""Add user_project_freshness table
+
+Revision ID: 2026_10_18_001
+Revises: 2026_03_01_001
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_001'
+down_revision = '2026_03_01_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all(), so the table may already exist (empty) at this point
+    if not sa.inspect(op.get_bind()).has_table('user_project_freshness'):
+        op.create_table('user_project_freshness',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('project_id', sa.Integer(), nullable=False),
+            sa.Column('stale_files', sa.Integer(), nullable=False, server_default='0'),
+            sa.ForeignKeyConstraint(['project_id'], ['project.project_id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['user_profile.user_id'], ),
+            sa.PrimaryKeyConstraint('user_id', 'project_id')
+        )
+
+    # Backfill from the current on-the-fly computation (same as `flask freshness rebuild`)
+    op.execute("""
+        INSERT INTO user_project_freshness (user_id, project_id, stale_files)
+        SELECT up.user_id, up.project_id,
+               COUNT(fv.version_id) FILTER (
+                   WHERE (fv.user_id IS NULL OR fv.user_id <> up.user_id)
+                   AND NOT EXISTS (
+                       SELECT 1 FROM last_download ld
+                       WHERE ld.user_id = up.user_id
+                       AND ld.file_data_id = fv.file_data_id
+                       AND ld.version_id = fv.version_id
+                   )
+               )
+        FROM user_project up
+        LEFT JOIN file_data fd ON fd.project_id = up.project_id
+        LEFT JOIN file_version fv ON fv.file_data_id = fd.file_data_id AND fv.last_version = TRUE
+        GROUP BY up.user_id, up.project_id
+        ON CONFLICT (user_id, project_id) DO NOTHING
+    """)
+
+
+def downgrade():
+    op.drop_table('user_project_freshness')
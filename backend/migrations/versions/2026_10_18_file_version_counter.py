@@ -0,0 +1,49 @@
+"""Per-file version counter and a single latest version per file
+
+Revision ID: 2026_10_18_011
+Revises: 2026_10_18_010
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_011'
+down_revision = '2026_10_18_010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('file_data')}
+    if 'version_count' not in columns:
+        with op.batch_alter_table('file_data', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # continue numbering after the highest existing version
+    op.execute("""
+        UPDATE file_data fd SET version_count = v.max_number
+        FROM (SELECT file_data_id, max(version_number) AS max_number FROM file_version GROUP BY file_data_id) v
+        WHERE v.file_data_id = fd.file_data_id AND fd.version_count < v.max_number
+    """)
+
+    # concurrent uploads could leave several latest versions: keep the highest one
+    op.execute("""
+        UPDATE file_version fv SET last_version = false
+        WHERE fv.last_version AND EXISTS (
+            SELECT 1 FROM file_version o
+            WHERE o.file_data_id = fv.file_data_id AND o.last_version
+              AND (coalesce(o.version_number, 0), o.version_id) > (coalesce(fv.version_number, 0), fv.version_id)
+        )
+    """)
+
+    op.execute("DROP INDEX IF EXISTS ix_file_version_latest")
+    op.execute("CREATE UNIQUE INDEX ix_file_version_latest ON file_version (file_data_id) WHERE last_version")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_file_version_latest")
+    op.execute("CREATE INDEX ix_file_version_latest ON file_version (file_data_id) WHERE last_version")
+    with op.batch_alter_table('file_data', schema=None) as batch_op:
+        batch_op.drop_column('version_count')
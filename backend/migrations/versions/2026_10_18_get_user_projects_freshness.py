@@ -0,0 +1,165 @@
+"""get_user_projects reads has_latest from user_project_freshness
+
+Revision ID: 2026_10_18_013
+Revises: 2026_10_18_012
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_013'
+down_revision = '2026_10_18_012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("DROP FUNCTION IF EXISTS public.get_user_projects(integer)")
+    op.execute("""
+        CREATE FUNCTION public.get_user_projects(
+            user_id_param integer)
+        RETURNS TABLE(
+            project_id integer,
+            project_name text,
+            role text,
+            created_date timestamp with time zone,
+            creator_name text,
+            creator_profile_picture text,
+            has_latest boolean,
+            description text,
+            last_modified_by text,
+            last_modified_date timestamp with time zone,
+            nickname text,
+            nickname_id integer
+        )
+        LANGUAGE sql
+        STABLE PARALLEL SAFE
+        ROWS 100
+
+        AS $BODY$
+        -- has_latest reads the user's counter in user_project_freshness (stored with the membership); a row
+        -- missing from a database that was never backfilled is checked on the fly. The row kept by DISTINCT ON is
+        -- the newest upload.
+        WITH latest AS (
+            SELECT DISTINCT ON (fd.project_id)
+                fd.project_id,
+                fv.upload_date,
+                uploader.full_name AS uploader_name
+            FROM user_project up
+            JOIN file_data fd ON fd.project_id = up.project_id
+            JOIN file_version fv ON fv.file_data_id = fd.file_data_id AND fv.last_version
+            LEFT JOIN user_profile uploader ON uploader.user_id = fv.user_id
+            WHERE up.user_id = user_id_param
+            AND up.is_removed = false
+            ORDER BY fd.project_id, fv.upload_date DESC NULLS LAST, fv.version_id DESC
+        )
+        SELECT
+            p.project_id,
+            coalesce(p.name, '')::TEXT,
+            up.role::TEXT,
+            p.created_date,
+            coalesce(creator.full_name, 'Unknown')::TEXT,
+            coalesce(nullif(creator.profile_pic, ''), 'default.png')::TEXT,
+            coalesce(freshness.stale_files = 0, NOT EXISTS (
+                SELECT 1
+                FROM file_data fd
+                JOIN file_version fv ON fv.file_data_id = fd.file_data_id AND fv.last_version
+                WHERE fd.project_id = up.project_id
+                AND (fv.user_id IS NULL OR fv.user_id <> user_id_param)
+                AND NOT EXISTS (
+                    SELECT 1 FROM last_download ld
+                    WHERE ld.user_id = user_id_param AND ld.file_data_id = fv.file_data_id AND ld.version_id = fv.version_id
+                )
+            )),
+            coalesce(p.description, '')::TEXT,
+            CASE WHEN l.upload_date > p.created_date OR (p.created_date IS NULL AND l.upload_date IS NOT NULL)
+                THEN coalesce(l.uploader_name, 'Unknown') ELSE 'Unknown' END::TEXT,
+            CASE WHEN l.upload_date > p.created_date OR (p.created_date IS NULL AND l.upload_date IS NOT NULL)
+                THEN l.upload_date ELSE p.created_date END,
+            creator.nickname::TEXT,
+            creator.nickname_id
+        FROM user_project up
+        JOIN project p ON p.project_id = up.project_id
+        LEFT JOIN user_profile creator ON creator.user_id = p.creator_id
+        LEFT JOIN user_project_freshness freshness
+            ON freshness.user_id = up.user_id AND freshness.project_id = up.project_id
+        LEFT JOIN latest l ON l.project_id = up.project_id
+        WHERE up.user_id = user_id_param
+        AND up.is_removed = false
+        ORDER BY 7 DESC, 10 DESC NULLS LAST, 1;
+        $BODY$;
+    """)
+
+
+
+def downgrade():
+    op.execute("DROP FUNCTION IF EXISTS public.get_user_projects(integer)")
+    op.execute("""
+        CREATE FUNCTION public.get_user_projects(
+            user_id_param integer)
+        RETURNS TABLE(
+            project_id integer,
+            project_name text,
+            role text,
+            created_date timestamp with time zone,
+            creator_name text,
+            creator_profile_picture text,
+            has_latest boolean,
+            description text,
+            last_modified_by text,
+            last_modified_date timestamp with time zone,
+            nickname text,
+            nickname_id integer
+        )
+        LANGUAGE sql
+        STABLE PARALLEL SAFE
+        ROWS 100
+
+        AS $BODY$
+            -- One pass over the latest versions of the user's active projects:
+            -- has_latest is a window aggregate per project, the row kept by DISTINCT ON is the newest upload.
+            WITH latest AS (
+                SELECT DISTINCT ON (fd.project_id)
+                    fd.project_id,
+                    bool_and(
+                        coalesce(fv.user_id = user_id_param, false) OR ld.last_download_id IS NOT NULL
+                    ) OVER (PARTITION BY fd.project_id) AS has_latest,
+                    fv.upload_date,
+                    uploader.full_name AS uploader_name
+                FROM user_project up
+                JOIN file_data fd ON fd.project_id = up.project_id
+                JOIN file_version fv ON fv.file_data_id = fd.file_data_id AND fv.last_version
+                LEFT JOIN last_download ld
+                    ON ld.user_id = user_id_param AND ld.version_id = fv.version_id AND ld.file_data_id = fv.file_data_id
+                LEFT JOIN user_profile uploader ON uploader.user_id = fv.user_id
+                WHERE up.user_id = user_id_param
+                AND up.is_removed = false
+                ORDER BY fd.project_id, fv.upload_date DESC NULLS LAST, fv.version_id DESC
+            )
+            SELECT
+                p.project_id,
+                coalesce(p.name, '')::TEXT,
+                up.role::TEXT,
+                p.created_date,
+                coalesce(creator.full_name, 'Unknown')::TEXT,
+                coalesce(nullif(creator.profile_pic, ''), 'default.png')::TEXT,
+                coalesce(l.has_latest, true),
+                coalesce(p.description, '')::TEXT,
+                CASE WHEN l.upload_date > p.created_date OR (p.created_date IS NULL AND l.upload_date IS NOT NULL)
+                    THEN coalesce(l.uploader_name, 'Unknown') ELSE 'Unknown' END::TEXT,
+                CASE WHEN l.upload_date > p.created_date OR (p.created_date IS NULL AND l.upload_date IS NOT NULL)
+                    THEN l.upload_date ELSE p.created_date END,
+                creator.nickname::TEXT,
+                creator.nickname_id
+            FROM user_project up
+            JOIN project p ON p.project_id = up.project_id
+            LEFT JOIN user_profile creator ON creator.user_id = p.creator_id
+            LEFT JOIN latest l ON l.project_id = up.project_id
+            WHERE up.user_id = user_id_param
+            AND up.is_removed = false
+            ORDER BY 7 DESC, 10 DESC NULLS LAST, 1;
+        $BODY$;
+    """)
+
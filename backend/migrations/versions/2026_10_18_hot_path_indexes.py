@@ -0,0 +1,40 @@
+"""Indexes for the hot lookup paths
+
+Revision ID: 2026_10_18_008
+Revises: 2026_10_18_007
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_008'
+down_revision = '2026_10_18_007'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # active members of a project (membership checks, member lists)
+    ("ix_user_project_active_project", "user_project (project_id, user_id) WHERE NOT is_removed"),
+    # latest version of a file / versions of a file by number
+    ("ix_file_version_latest", "file_version (file_data_id) WHERE last_version"),
+    ("ix_file_version_file_data_number", "file_version (file_data_id, version_number)"),
+    # download flags of a user, and who downloaded a version
+    ("ix_last_download_user_file", "last_download (user_id, file_data_id, version_id)"),
+    ("ix_last_download_version", "last_download (version_id, user_id)"),
+    # invitations per project when re-inviting (a user's pending invitations: migration 2026_10_18_012)
+    ("ix_invitation_project_email", "invitation (project_id, invited_email)"),
+]
+
+
+def upgrade():
+    for name, definition in INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+    for table in ('user_project', 'file_version', 'last_download', 'invitation'):
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
@@ -0,0 +1,34 @@
+"""Pending-only invitation indexes and invitations claimed by user id
+
+Revision ID: 2026_10_18_012
+Revises: 2026_10_18_011
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_012'
+down_revision = '2026_10_18_011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # email-only invitations of addresses that have an account belong to that account
+    op.execute("""
+        UPDATE invitation i SET invited_user_id = u.user_id
+        FROM user_profile u
+        WHERE i.invited_user_id IS NULL AND i.invited_email = u.email
+    """)
+
+    op.execute("CREATE INDEX IF NOT EXISTS ix_invitation_pending_user ON invitation "
+               "(invited_user_id, project_id, invitation_id) WHERE status = 'pending'")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_invitation_pending_email ON invitation "
+               "(invited_email, project_id, invitation_id) WHERE status = 'pending' AND invited_user_id IS NULL")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_invitation_pending_email")
+    op.execute("DROP INDEX IF EXISTS ix_invitation_pending_user")
@@ -0,0 +1,30 @@
+"""Indexes for the paginated project file list
+
+Revision ID: 2026_10_18_007
+Revises: 2026_10_18_006
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_007'
+down_revision = '2026_10_18_006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # files of a project
+    op.execute("CREATE INDEX IF NOT EXISTS ix_file_data_project_id ON file_data (project_id, file_data_id)")
+    # ?uploader= filter
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_file_version_latest_uploader
+        ON file_version (user_id, upload_date) WHERE last_version
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_file_version_latest_uploader")
+    op.execute("DROP INDEX IF EXISTS ix_file_data_project_id")
@@ -0,0 +1,157 @@
+"""Rewrite get_user_projects as a set-based SQL function
+
+Revision ID: 2026_10_18_009
+Revises: 2026_10_18_008
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_009'
+down_revision = '2026_10_18_008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The return type changes (timestamptz, creator nickname), so the old function has to be dropped first
+    op.execute("DROP FUNCTION IF EXISTS public.get_user_projects(integer)")
+    op.execute("""
+        CREATE FUNCTION public.get_user_projects(
+            user_id_param integer)
+        RETURNS TABLE(
+            project_id integer,
+            project_name text,
+            role text,
+            created_date timestamp with time zone,
+            creator_name text,
+            creator_profile_picture text,
+            has_latest boolean,
+            description text,
+            last_modified_by text,
+            last_modified_date timestamp with time zone,
+            nickname text,
+            nickname_id integer
+        )
+        LANGUAGE sql
+        STABLE PARALLEL SAFE
+        ROWS 100
+
+        AS $BODY$
+            -- One pass over the latest versions of the user's active projects:
+            -- has_latest is a window aggregate per project, the row kept by DISTINCT ON is the newest upload.
+            WITH latest AS (
+                SELECT DISTINCT ON (fd.project_id)
+                    fd.project_id,
+                    bool_and(
+                        coalesce(fv.user_id = user_id_param, false) OR ld.last_download_id IS NOT NULL
+                    ) OVER (PARTITION BY fd.project_id) AS has_latest,
+                    fv.upload_date,
+                    uploader.full_name AS uploader_name
+                FROM user_project up
+                JOIN file_data fd ON fd.project_id = up.project_id
+                JOIN file_version fv ON fv.file_data_id = fd.file_data_id AND fv.last_version
+                LEFT JOIN last_download ld
+                    ON ld.user_id = user_id_param AND ld.version_id = fv.version_id AND ld.file_data_id = fv.file_data_id
+                LEFT JOIN user_profile uploader ON uploader.user_id = fv.user_id
+                WHERE up.user_id = user_id_param
+                AND up.is_removed = false
+                ORDER BY fd.project_id, fv.upload_date DESC NULLS LAST, fv.version_id DESC
+            )
+            SELECT
+                p.project_id,
+                coalesce(p.name, '')::TEXT,
+                up.role::TEXT,
+                p.created_date,
+                coalesce(creator.full_name, 'Unknown')::TEXT,
+                coalesce(nullif(creator.profile_pic, ''), 'default.png')::TEXT,
+                coalesce(l.has_latest, true),
+                coalesce(p.description, '')::TEXT,
+                CASE WHEN l.upload_date > p.created_date OR (p.created_date IS NULL AND l.upload_date IS NOT NULL)
+                    THEN coalesce(l.uploader_name, 'Unknown') ELSE 'Unknown' END::TEXT,
+                CASE WHEN l.upload_date > p.created_date OR (p.created_date IS NULL AND l.upload_date IS NOT NULL)
+                    THEN l.upload_date ELSE p.created_date END,
+                creator.nickname::TEXT,
+                creator.nickname_id
+            FROM user_project up
+            JOIN project p ON p.project_id = up.project_id
+            LEFT JOIN user_profile creator ON creator.user_id = p.creator_id
+            LEFT JOIN latest l ON l.project_id = up.project_id
+            WHERE up.user_id = user_id_param
+            AND up.is_removed = false
+            ORDER BY 7 DESC, 10 DESC NULLS LAST, 1;
+        $BODY$;
+    """)
+
+
+def downgrade():
+    op.execute("DROP FUNCTION IF EXISTS public.get_user_projects(integer)")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION public.get_user_projects(
+            user_id_param integer)
+        RETURNS TABLE(
+            project_id integer,
+            project_name text,
+            role text,
+            created_date timestamp without time zone,
+            creator_name text,
+            creator_profile_picture text,
+            has_latest boolean,
+            description text,
+            last_modified_by text,
+            last_modified_date timestamp without time zone
+        ) 
+        LANGUAGE 'plpgsql'
+        COST 100
+        VOLATILE PARALLEL UNSAFE
+        ROWS 1000
+
+        AS $BODY$
+        BEGIN
+            RETURN QUERY
+            SELECT
+                p.project_id,
+                p.name::TEXT AS project_name,
+                up.role::TEXT AS role,
+                p.created_date::TIMESTAMP WITH TIME ZONE AT TIME ZONE 'UTC' AS created_date,
+                COALESCE(u.full_name, 'Unknown')::TEXT AS creator_name,
+                u.profile_pic::TEXT AS creator_profile_picture,
+                NOT EXISTS (
+                    SELECT 1
+                    FROM file_version fv
+                    JOIN file_data fd ON fv.file_id = fd.file_data_id
+                    LEFT JOIN last_download ld
+                        ON fv.file_id = ld.file_id AND ld.user_id = up.user_id
+                    WHERE fd.project_id = p.project_id
+                    AND (fv.last_version = TRUE OR fv.version_id = (SELECT MAX(version_id) FROM file_version WHERE file_id = fv.file_id))
+                    AND (ld.version_id IS NULL OR ld.version_id < fv.version_id)
+                    AND fv.user_id != user_id_param -- Exclude the uploader from "not-up-to-date"
+                ) AS has_latest,
+                p.description::TEXT AS description,
+                COALESCE((
+                    SELECT up2.full_name::TEXT
+                    FROM file_version fv2
+                    JOIN user_profile up2 ON fv2.user_id = up2.user_id
+                    JOIN file_data fd2 ON fv2.file_id = fd2.file_data_id
+                    WHERE fd2.project_id = p.project_id
+                    ORDER BY fv2.upload_date DESC
+                    LIMIT 1
+                ), 'Unknown') AS last_modified_by,
+                COALESCE((
+                    SELECT MAX(fv.upload_date)::TIMESTAMP WITH TIME ZONE AT TIME ZONE 'UTC'
+                    FROM file_version fv
+                    JOIN file_data fd ON fv.file_id = fd.file_data_id
+                    WHERE fd.project_id = p.project_id
+                ), p.created_date::TIMESTAMP WITH TIME ZONE AT TIME ZONE 'UTC') AS last_modified_date
+            FROM user_project up
+            JOIN project p ON up.project_id = p.project_id
+            LEFT JOIN user_profile u ON p.creator_id = u.user_id
+            WHERE up.user_id = user_id_param
+            ORDER BY
+                has_latest ASC,
+                last_modified_date DESC;
+        END;
+        $BODY$;
+    """)
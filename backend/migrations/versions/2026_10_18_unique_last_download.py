@@ -0,0 +1,36 @@
+"""Unique (user_id, version_id) on last_download
+
+Revision ID: 2026_10_18_002
+Revises: 2026_10_18_001
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_002'
+down_revision = '2026_10_18_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    constraints = sa.inspect(op.get_bind()).get_unique_constraints('last_download')
+    if any(c['name'] == 'uq_last_download_user_version' for c in constraints):
+        return
+
+    # Keep the earliest row of every duplicated (user_id, version_id) pair
+    op.execute("""
+        DELETE FROM last_download ld
+        USING last_download keep
+        WHERE ld.user_id = keep.user_id
+        AND ld.version_id = keep.version_id
+        AND ld.last_download_id > keep.last_download_id
+    """)
+
+    op.create_unique_constraint('uq_last_download_user_version', 'last_download', ['user_id', 'version_id'])
+
+
+def downgrade():
+    op.drop_constraint('uq_last_download_user_version', 'last_download', type_='unique')
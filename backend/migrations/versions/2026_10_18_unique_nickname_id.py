@@ -0,0 +1,47 @@
+"""Unique (nickname, nickname_id)
+
+Revision ID: 2026_10_18_010
+Revises: 2026_10_18_009
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_010'
+down_revision = '2026_10_18_009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    # signups used to race, so a nickname_id may be taken twice: the oldest user keeps it,
+    # the others get a random free id of their nickname
+    duplicates = conn.execute(sa.text("""
+        SELECT user_id, nickname FROM (
+            SELECT user_id, nickname,
+                   row_number() OVER (PARTITION BY nickname, nickname_id ORDER BY user_id) AS rn
+            FROM user_profile
+            WHERE nickname IS NOT NULL AND nickname_id IS NOT NULL
+        ) d
+        WHERE rn > 1
+    """)).all()
+    for user_id, nickname in duplicates:
+        conn.execute(sa.text("""
+            UPDATE user_profile SET nickname_id = (
+                SELECT g FROM generate_series(1, 9999) g
+                WHERE NOT EXISTS (SELECT 1 FROM user_profile u WHERE u.nickname = :nickname AND u.nickname_id = g)
+                ORDER BY random()
+                LIMIT 1
+            )
+            WHERE user_id = :user_id
+        """), {"user_id": user_id, "nickname": nickname})
+
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_user_profile_nickname_id ON user_profile (nickname, nickname_id)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS uq_user_profile_nickname_id")
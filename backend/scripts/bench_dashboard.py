@@ -0,0 +1,112 @@
+# Statements and latency of /api/mainpage (website/dashboard.py) for a heavy user on a scratch database:
+# the user is a member of --projects projects with --files files each (one version per file, uploaded
+# by another member); they downloaded every file of every other project, so half the projects are
+# up to date. With --orm, get_user_projects() is dropped first and the ORM fallback is measured.
+#
+#   python scripts/bench_dashboard.py [--projects N] [--files N] [--requests N] [--orm]
+from scratch import scratch_app, client_for
+
+from website import db
+from website.freshness import rebuild_freshness
+
+from sqlalchemy import event, text
+
+import click
+import logging
+import time
+
+# members besides the heavy user in every project
+OTHER_MEMBERS = 4
+
+
+def seed_dashboard(projects, files):
+    params = {"projects": projects, "files": files, "members": OTHER_MEMBERS}
+    statements = [
+        """INSERT INTO user_profile (user_id, full_name, nickname, nickname_id, email, password)
+           SELECT g, 'Dashboard User ' || g, 'dash', g, 'dash-' || g || '@scratch.invalid', 'x'
+           FROM generate_series(1, :members + 1) g""",
+        """INSERT INTO project (project_id, name, description, creator_id, project_activity_status, created_date)
+           SELECT g, 'Dashboard project ' || g, 'Seeded project ' || g, 1 + g % (:members + 1), true,
+                  now() - interval '1 year'
+           FROM generate_series(1, :projects) g""",
+        """INSERT INTO user_project (user_id, project_id, role, is_removed)
+           SELECT u, p, (CASE WHEN u = 1 THEN 'owner' ELSE 'editor' END)::role_enum, false
+           FROM generate_series(1, :projects) p, generate_series(1, :members + 1) u""",
+        """INSERT INTO file_data (file_data_id, title, project_id, version_count)
+           SELECT g, 'Dashboard file ' || g, (g - 1) / :files + 1, 1
+           FROM generate_series(1, :projects * :files) g""",
+        """INSERT INTO file_version (version_id, version_number, file_name, file_type, file_size, last_version,
+                                     upload_date, file_data_id, user_id)
+           SELECT g, 1, 'dash_' || g || '.txt', 'text/plain', g % 100000, true,
+                  now() - (g || ' seconds')::interval, g, 2 + g % :members
+           FROM generate_series(1, :projects * :files) g""",
+        """INSERT INTO last_download (version_id, file_data_id, user_id)
+           SELECT g, g, 1
+           FROM generate_series(1, :projects * :files) g
+           WHERE ((g - 1) / :files) % 2 = 1""",
+    ]
+    for statement in statements:
+        db.session.execute(text(statement), params)
+    db.session.commit()
+    rebuild_freshness()
+    for table in ('user_profile', 'project', 'user_project', 'file_data', 'file_version', 'last_download',
+                  'user_project_freshness'):
+        db.session.execute(text(f"ANALYZE {table}"))
+    db.session.commit()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+@click.command()
+@click.option('--projects', default=500, show_default=True, help='Projects of the heavy user.')
+@click.option('--files', default=2000, show_default=True, help='Files per project.')
+@click.option('--requests', 'count', default=50, show_default=True, help='Measured requests.')
+@click.option('--orm', is_flag=True, help='Measure the ORM fallback instead of get_user_projects().')
+def main(projects, files, count, orm):
+    with scratch_app() as app:
+        click.echo(f"Seeding {projects} projects x {files} files...")
+        start = time.perf_counter()
+        seed_dashboard(projects, files)
+        click.echo(f"seeded in {time.perf_counter() - start:.0f} s")
+        if orm:
+            db.session.execute(text("DROP FUNCTION get_user_projects(integer)"))
+            db.session.commit()
+            # the fallback warns on every request
+            app.logger.setLevel(logging.ERROR)
+
+        client = client_for(app, 1)
+        response = client.get('/api/mainpage')
+        roles = response.get_json()['roles'] if response.status_code == 200 else None
+        if roles is None or len(roles) != projects:
+            raise click.ClickException(f"/api/mainpage returned {response.status_code} with "
+                                       f"{len(roles) if roles is not None else 'no'} projects")
+        click.echo(f"{len(roles)} projects, {sum(r['has_latest'] for r in roles)} up to date")
+
+        statements = [0]
+
+        def count_statement(*args):
+            statements[0] += 1
+
+        counts, latencies = set(), []
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+        try:
+            for _ in range(count):
+                statements[0] = 0
+                start = time.perf_counter()
+                client.get('/api/mainpage')
+                latencies.append((time.perf_counter() - start) * 1000)
+                counts.add(statements[0])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+        click.echo(f"{'ORM fallback' if orm else 'get_user_projects()'}: "
+                   f"{', '.join(map(str, sorted(counts)))} statements per request, "
+                   f"p50 {percentile(latencies, 0.5):.1f} ms, p95 {percentile(latencies, 0.95):.1f} ms "
+                   f"over {count} requests")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# Storage ratio and reconstruction latency of delta storage (website/delta.py, website/blobstore.py) per
+# DELTA_MAX_DEPTH on a scratch database. For every --depths value one file gets --versions versions of
+# --size KB random content, each with --edits small edits against the one before; they are compacted like
+# `flask blobs compact` does and every version is then rebuilt as a download would.
+#
+#   python scripts/bench_deltas.py [--depths 1,2,4,8,16] [--ratio R] [--versions N] [--size KB] [--edits N]
+from scratch import scratch_app
+
+from website import db
+from website.models import User_profile, Project, User_Project, File_data, File_version, Blob
+from website.views import add_file_version
+from website.blobstore import store_stream, compact_version, materialize_version
+
+from flask_login import login_user
+
+import click
+import io
+import os
+import random
+import statistics
+import time
+
+
+# next version: a few replaced, inserted or deleted runs of up to 64 bytes
+def edit(rnd, content, edits):
+    content = bytearray(content)
+    for _ in range(edits):
+        at = rnd.randrange(len(content))
+        run = rnd.randbytes(rnd.randint(1, 64))
+        kind = rnd.random()
+        if kind < 0.4:
+            content[at:at + len(run)] = run
+        elif kind < 0.7:
+            content[at:at] = run
+        else:
+            del content[at:at + len(run)]
+    return bytes(content)
+
+
+@click.command()
+@click.option('--depths', default='1,2,4,8,16', show_default=True, help='DELTA_MAX_DEPTH values, comma separated.')
+@click.option('--ratio', default=None, type=float, help='DELTA_MAX_RATIO (default: the configured one).')
+@click.option('--versions', default=24, show_default=True, help='Versions of the file per depth.')
+@click.option('--size', default=400, show_default=True, help='Size of the first version in KB.')
+@click.option('--edits', default=8, show_default=True, help='Edits between two versions.')
+def main(depths, ratio, versions, size, edits):
+    with scratch_app(DELTA_STORAGE=True) as app:
+        if ratio is not None:
+            app.config['DELTA_MAX_RATIO'] = ratio
+        user = User_profile(full_name="Delta Bench", nickname='delta', nickname_id=1, email='delta@scratch.invalid', password='x')
+        db.session.add(user)
+        db.session.flush()
+        project = Project(name="Delta bench", creator_id=user.user_id, project_activity_status=True)
+        db.session.add(project)
+        db.session.flush()
+        db.session.add(User_Project(user_id=user.user_id, project_id=project.project_id, role='owner'))
+        db.session.commit()
+        user_id, project_id = user.user_id, project.project_id
+
+        click.echo(f"{versions} versions of {size} KB, {edits} edits each, DELTA_MAX_RATIO {app.config['DELTA_MAX_RATIO']}")
+        click.echo(f"{'depth':>5} {'stored':>8} {'deltas':>7} {'encode MB/s':>12} {'rebuild mean':>13} {'rebuild max':>12}")
+        for depth in (int(d) for d in depths.split(',')):
+            app.config['DELTA_MAX_DEPTH'] = depth
+            # own seed per depth: identical content would deduplicate onto the blobs of the previous run
+            rnd = random.Random(depth)
+            with app.test_request_context():
+                login_user(db.session.get(User_profile, user_id))
+                file_data = File_data(title=f"Delta depth {depth}", project_id=project_id)
+                db.session.add(file_data)
+                content = rnd.randbytes(size * 1024)
+                for _ in range(versions):
+                    blob_hash, stored = store_stream(io.BytesIO(content))
+                    add_file_version(file_data, "delta.txt", "text/plain", "", blob_hash, stored)
+                    db.session.commit()
+                    content = edit(rnd, content, edits)
+                file_data_id = file_data.file_data_id
+            db.session.remove()
+
+            file_versions = File_version.query.filter_by(file_data_id=file_data_id).\
+                order_by(File_version.version_number).all()
+            start = time.perf_counter()
+            compacted = sum(compact_version(file_version) for file_version in file_versions)
+            encode_seconds = time.perf_counter() - start
+
+            file_versions = File_version.query.filter_by(file_data_id=file_data_id).\
+                order_by(File_version.version_number).all()
+            blobs = Blob.query.filter(Blob.blob_hash.in_([v.blob_hash for v in file_versions])).all()
+            stored_ratio = sum(b.stored_size for b in blobs) / sum(b.size for b in blobs)
+
+            rebuild_ms = []
+            for file_version in file_versions:
+                start = time.perf_counter()
+                path, is_temp = materialize_version(file_version.file_data, file_version)
+                with open(path, 'rb') as f:
+                    while f.read(1024 * 1024):
+                        pass
+                rebuild_ms.append((time.perf_counter() - start) * 1000)
+                if is_temp:
+                    os.remove(path)
+
+            encoded_mb = compacted * size / 1024
+            click.echo(f"{depth:>5} {stored_ratio:>8.1%} {compacted:>7} "
+                       f"{encoded_mb / encode_seconds if compacted else 0:>12.1f} "
+                       f"{statistics.mean(rebuild_ms):>10.1f} ms {max(rebuild_ms):>9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# Bulk invite of --emails addresses on a scratch database: one account lookup per address (the previous
+# approach) against invite_emails() (website/invitations.py), in time and statements. Half of the
+# addresses have an account; a tenth of those are members and another tenth were removed.
+#
+#   python scripts/bench_invitations.py [--emails N]
+from scratch import scratch_app
+
+from website import db
+from website.models import User_profile, Project, User_Project
+from website.invitations import invite_emails
+
+from sqlalchemy import event, insert, text
+
+import click
+import time
+
+
+@click.command()
+@click.option('--emails', 'count', default=1000, show_default=True, help='Addresses per invite request.')
+def main(count):
+    with scratch_app():
+        project = Project(name="Invite bench", project_activity_status=True)
+        db.session.add(project)
+        db.session.flush()
+        user_ids = db.session.execute(text("""
+            INSERT INTO user_profile (full_name, nickname, nickname_id, email, password)
+            SELECT 'Bench User ' || g, 'bench', g, 'bench-' || g || '@scratch.invalid', 'x'
+            FROM generate_series(1, :users) g
+            RETURNING user_id
+        """), {"users": count // 2}).scalars().all()
+        db.session.execute(insert(User_Project), [
+            {"user_id": user_id, "project_id": project.project_id, "role": 'reader', "is_removed": i % 10 == 1}
+            for i, user_id in enumerate(user_ids) if i % 10 < 2
+        ])
+        db.session.commit()
+        project_id = project.project_id
+        emails = [f"bench-{g}@scratch.invalid" for g in range(1, count + 1)]
+
+        queries = [0]
+
+        def count_query(*args):
+            queries[0] += 1
+
+        event.listen(db.engine, 'before_cursor_execute', count_query)
+        try:
+            start = time.perf_counter()
+            for email in emails:
+                User_profile.query.filter_by(email=email).first()
+            elapsed = time.perf_counter() - start
+            click.echo(f"per-email lookups: {elapsed * 1000:.0f} ms, {queries[0]} queries")
+
+            queries[0] = 0
+            start = time.perf_counter()
+            results = invite_emails(project_id, None, emails, invite_unknown=True)
+            db.session.flush()
+            elapsed = time.perf_counter() - start
+            totals = {}
+            for result in results:
+                totals[result["status"]] = totals.get(result["status"], 0) + 1
+            click.echo(f"invite_emails: {elapsed * 1000:.0f} ms, {queries[0]} queries, {totals}")
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_query)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# Password checks per second for several hashing pool sizes (website/passwords.py), with concurrent
+# request threads. The app runs on a scratch database; no rows are written.
+#
+#   python scripts/bench_passwords.py [--logins N] [--threads N] [--pool-sizes 0,1,2,4]
+from scratch import scratch_app
+
+from website.passwords import hash_method, verify_password
+
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash
+
+import click
+import multiprocessing
+import time
+
+
+@click.command()
+@click.option('--logins', default=32, show_default=True, help='Password checks per run.')
+@click.option('--threads', default=8, show_default=True, help='Concurrent request threads.')
+@click.option('--pool-sizes', default='0,1,2,4', show_default=True, help='PASSWORD_HASH_WORKERS values to compare.')
+def main(logins, threads, pool_sizes):
+    with scratch_app(PASSWORD_HASH_TIMEOUT=3600) as app:
+        pwhash = generate_password_hash("Benchmark-1", method=hash_method())
+        click.echo(f"{logins} logins, {threads} request threads, {hash_method()}, {multiprocessing.cpu_count()} CPUs")
+
+        def login():
+            with app.app_context():
+                return verify_password(pwhash, "Benchmark-1")
+
+        for workers in (int(size) for size in pool_sizes.split(',')):
+            app.config['PASSWORD_HASH_WORKERS'] = workers
+            # start the pool before timing
+            verify_password(pwhash, "Benchmark-1")
+            start = time.perf_counter()
+            with ThreadPoolExecutor(threads) as requests:
+                assert all(requests.map(lambda _: login(), range(logins)))
+            elapsed = time.perf_counter() - start
+            click.echo(f"pool size {workers}: {logins / elapsed:.1f} logins/s")
+
+
+if __name__ == '__main__':
+    main()
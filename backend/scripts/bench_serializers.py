@@ -0,0 +1,78 @@
+# Serialization microbenchmark of a simulated project file listing: hand-built dicts and stdlib json
+# (the previous path) against the DTOs of website/serializers.py and orjson. CPU only, no database.
+#
+#   python scripts/bench_serializers.py [--rows N] [--repeat N]
+import scratch  # puts the backend on sys.path
+
+from website.serializers import ProjectFileDTO, OrjsonProvider, orjson, _default
+
+from collections import namedtuple
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import click
+import json
+import time
+
+
+def _bench(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+@click.command()
+@click.option('--rows', default=10000, show_default=True, help='Rows of the simulated file listing.')
+@click.option('--repeat', default=5, show_default=True)
+def main(rows, repeat):
+    Row = namedtuple('Row', [
+        'version_id', 'file_data_id', 'title', 'file_name', 'version_number', 'file_size', 'file_type',
+        'upload_date', 'description', 'comment', 'user_id', 'nickname', 'nickname_id', 'profile_pic'
+    ])
+    now = datetime.now(timezone.utc)
+    data = [
+        Row(i, i // 3, f"File {i}", f"file_{i}_v1.pdf", 1, i * 37, "application/pdf", now,
+            "description", "comment", i % 50, f"user{i % 50}", i % 50, None if i % 4 else "pic.png")
+        for i in range(rows)
+    ]
+    # old path: ORM-like objects with attribute access, dicts built by hand, stdlib json with sorted keys
+    entities = [SimpleNamespace(**row._asdict()) for row in data]
+
+    def old_path():
+        files = []
+        for f in entities:
+            files.append({
+                "version_id": f.version_id,
+                "file_data_id": f.file_data_id,
+                "title": f.title,
+                "file_name": f.file_name,
+                "version_number": f.version_number,
+                "file_size": f.file_size,
+                "file_type": f.file_type,
+                "upload_date": f.upload_date.isoformat() if f.upload_date else None,
+                "description": f.description,
+                "comment": f.comment,
+                "uploader_id": f.user_id,
+                "uploader_nickname": f.nickname if f.nickname else "Unknown",
+                "uploader_nickname_id": f.nickname_id if f.nickname else "No ID",
+                "uploader_pic": f"/static/profile_pics/{f.profile_pic}" if f.nickname and f.profile_pic else "/static/profile_pics/default.png"
+            })
+        return json.dumps({"files": files}, sort_keys=True)
+
+    def new_path():
+        files = [ProjectFileDTO.from_row(row) for row in data]
+        if orjson is not None:
+            return orjson.dumps({"files": files}, default=_default, option=OrjsonProvider.OPTIONS)
+        return json.dumps({"files": [vars(f) for f in files]}, default=_default, sort_keys=True)
+
+    old_ms = _bench(old_path, repeat)
+    new_ms = _bench(new_path, repeat)
+    click.echo(f"{rows} rows: dicts + json {old_ms:.1f} ms, DTOs + {'orjson' if orjson else 'json'} {new_ms:.1f} ms ({old_ms / new_ms:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
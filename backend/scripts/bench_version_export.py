@@ -0,0 +1,101 @@
+# Memory and time of the project version export (GET /api/projects/<id>/versions) on a scratch database
+# with --versions versions (metadata only, no content): the streamed endpoint against the previous
+# implementation, which ran one query per file and built the whole list in memory.
+# Peak RSS needs the Unix-only resource module and is left out elsewhere.
+#
+#   python scripts/bench_version_export.py [--versions N] [--files N]
+from scratch import scratch_app, client_for
+
+from website import db
+from website.models import User_profile, Project, User_Project, File_data, File_version
+
+from flask import jsonify
+from sqlalchemy import text
+
+import click
+import time
+
+
+def _peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(label, run):
+    import tracemalloc
+
+    rss_before = _peak_rss_kb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = run()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    line = f"{label}: {size / 1024 / 1024:.1f} MB of JSON in {elapsed:.1f} s, Python peak {peak / 1024 / 1024:.1f} MB"
+    if rss_before is not None:
+        line += f", peak RSS +{(_peak_rss_kb() - rss_before) / 1024:.0f} MB"
+    click.echo(line)
+
+
+@click.command()
+@click.option('--versions', 'count', default=200000, show_default=True, help='Versions in the project.')
+@click.option('--files', default=1000, show_default=True, help='Main files they are spread over.')
+def main(count, files):
+    with scratch_app() as app:
+        user = User_profile(full_name="Export Bench", nickname='export', nickname_id=1, email='export@scratch.invalid', password='x')
+        db.session.add(user)
+        db.session.flush()
+        project = Project(name="Export bench", creator_id=user.user_id, project_activity_status=True)
+        db.session.add(project)
+        db.session.flush()
+        db.session.add(User_Project(user_id=user.user_id, project_id=project.project_id, role='owner'))
+        db.session.execute(text("""
+            INSERT INTO file_data (title, description, project_id, version_count)
+            SELECT 'Export file ' || g, 'Exported file number ' || g, :project_id, :per_file
+            FROM generate_series(1, :files) g
+        """), {"project_id": project.project_id, "files": files, "per_file": -(-count // files)})
+        db.session.execute(text("""
+            INSERT INTO file_version (version_number, file_name, file_type, file_size, last_version, upload_date,
+                                      file_data_id, user_id)
+            SELECT row_number() OVER (PARTITION BY fd.file_data_id ORDER BY g), 'export_' || g || '.txt', 'text/plain',
+                   g, false, now(), fd.file_data_id, :user_id
+            FROM generate_series(1, :count) g
+            JOIN (SELECT file_data_id, row_number() OVER (ORDER BY file_data_id) - 1 AS n
+                  FROM file_data WHERE project_id = :project_id) fd ON fd.n = g % :files
+        """), {"project_id": project.project_id, "user_id": user.user_id, "count": count, "files": files})
+        db.session.commit()
+        user_id, project_id = user.user_id, project.project_id
+
+        def previous():
+            with app.test_request_context():
+                versions = []
+                for f in File_data.query.filter_by(project_id=project_id).all():
+                    for v in File_version.query.filter_by(file_data_id=f.file_data_id).all():
+                        versions.append({
+                            "version_id": v.version_id,
+                            "filename": v.file_name,
+                            "timestamp": v.upload_date.isoformat(),
+                            "file_size": v.file_size,
+                            "description": f.description
+                        })
+                size = len(jsonify(versions).get_data())
+                db.session.remove()
+                return size
+
+        def streamed():
+            response = client_for(app, user_id).get(f"/api/projects/{project_id}/versions", buffered=False)
+            size = sum(len(chunk) for chunk in response.response)
+            response.close()
+            return size
+
+        click.echo(f"{count} versions in {files} files")
+        # streamed first: the process' peak RSS only ever grows
+        measure("streamed", streamed)
+        measure("previous", previous)
+
+
+if __name__ == '__main__':
+    main()
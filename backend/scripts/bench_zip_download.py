@@ -0,0 +1,132 @@
+# Time to first byte, total time and peak RSS of a --size MB selection through POST /api/projects/download
+# on a scratch database: the streamed ZIP (website/zipstream.py) against the previous path, which wrote
+# the whole archive to UPLOAD_FOLDER/selected_files.zip before sending it. Half of the bytes are random
+# .jpg content (stored), half repetitive .txt content (deflated).
+# Peak RSS needs the Unix-only resource module and is left out elsewhere.
+#
+#   python scripts/bench_zip_download.py [--size MB] [--files N]
+from scratch import scratch_app, client_for
+
+from website import db
+from website.models import User_profile, Project, User_Project, File_data, File_version
+from website.views import add_file_version
+from website.blobstore import store_file, materialize_version
+
+from flask import send_from_directory
+from flask_login import login_user
+
+import click
+import os
+import tempfile
+import time
+import zipfile
+
+WRITE_SIZE = 1024 * 1024
+
+
+def _peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# (first chunk, total) in seconds and the bytes read from an iterable response body
+def read_body(chunks, start):
+    first_byte, size = None, 0
+    for chunk in chunks:
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    return first_byte, time.perf_counter() - start, size
+
+
+def measure(label, run):
+    first_byte, total, size = run()
+    peak_rss = _peak_rss_kb()
+    line = f"{label}: {size / 1024 / 1024:.0f} MB archive, first byte after {first_byte * 1000:.1f} ms, total {total:.1f} s"
+    if peak_rss is not None:
+        line += f", process peak RSS {peak_rss / 1024:.0f} MB"
+    click.echo(line)
+
+
+# a file of size bytes in the upload folder: random (incompressible) or repeated text
+def write_file(folder, size, compressible):
+    line = b"Sortify download benchmark line, the same text over and over again.\n"
+    fd, path = tempfile.mkstemp(dir=folder)
+    with os.fdopen(fd, 'wb') as f:
+        written = 0
+        while written < size:
+            block = min(WRITE_SIZE, size - written)
+            f.write((line * (block // len(line) + 1))[:block] if compressible else os.urandom(block))
+            written += block
+    return path
+
+
+@click.command()
+@click.option('--size', default=1024, show_default=True, help='Total size of the selection in MB.')
+@click.option('--files', default=16, show_default=True, help='Files in the selection.')
+def main(size, files):
+    with scratch_app() as app:
+        user = User_profile(full_name="Zip Bench", nickname='zip', nickname_id=1, email='zip@scratch.invalid', password='x')
+        db.session.add(user)
+        db.session.flush()
+        project = Project(name="Zip bench", creator_id=user.user_id, project_activity_status=True)
+        db.session.add(project)
+        db.session.flush()
+        db.session.add(User_Project(user_id=user.user_id, project_id=project.project_id, role='owner'))
+        db.session.commit()
+        user_id, project_id = user.user_id, project.project_id
+
+        click.echo(f"Storing {files} files, {size} MB in total...")
+        version_ids = []
+        with app.test_request_context():
+            login_user(db.session.get(User_profile, user_id))
+            for i in range(files):
+                compressible = i % 2 == 1
+                path = write_file(app.config['UPLOAD_FOLDER'], size * 1024 * 1024 // files, compressible)
+                blob_hash, file_size = store_file(path)
+                file_data = File_data(title=f"Zip file {i}", project_id=project_id)
+                db.session.add(file_data)
+                name = f"zip_{i}.txt" if compressible else f"zip_{i}.jpg"
+                version = add_file_version(file_data, name, 'application/octet-stream', "", blob_hash, file_size)
+                db.session.commit()
+                version_ids.append(version.version_id)
+        db.session.remove()
+
+        def streamed():
+            start = time.perf_counter()
+            response = client_for(app, user_id).post('/api/projects/download', json={'selected_files': version_ids},
+                                                     buffered=False)
+            try:
+                return read_body(response.response, start)
+            finally:
+                response.close()
+
+        # the download path before the streamed ZIP: archive written to disk, then sent
+        def previous():
+            with app.test_request_context():
+                start = time.perf_counter()
+                zip_path = os.path.join(app.config['UPLOAD_FOLDER'], "selected_files.zip")
+                with zipfile.ZipFile(zip_path, "w") as zipf:
+                    for version_id in version_ids:
+                        file_version = db.session.get(File_version, version_id)
+                        path, _ = materialize_version(file_version.file_data, file_version)
+                        zipf.write(path, file_version.file_name)
+                response = send_from_directory(app.config['UPLOAD_FOLDER'], "selected_files.zip", as_attachment=True)
+                response.direct_passthrough = False
+                try:
+                    return read_body(response.response, start)
+                finally:
+                    response.close()
+                    os.remove(zip_path)
+                    db.session.remove()
+
+        # streamed first: the process' peak RSS only ever grows
+        measure("streamed ZIP", streamed)
+        measure("temp-file ZIP", previous)
+
+
+if __name__ == '__main__':
+    main()
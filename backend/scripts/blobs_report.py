@@ -0,0 +1,47 @@
+# What the content-addressed blob store (website/blobstore.py) would save on an existing uploads tree.
+# Read-only: hashes every file under PATH and never touches a database.
+#
+#   python scripts/blobs_report.py PATH
+import scratch  # puts the backend on sys.path
+
+from website.blobstore import hash_file
+
+import click
+import os
+
+
+def storage_savings(root):
+    seen = {}
+    files = total = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        # the blob store itself is already deduplicated
+        if os.path.abspath(dirpath) == os.path.abspath(root) and 'blobs' in dirnames:
+            dirnames.remove('blobs')
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            size = os.path.getsize(path)
+            files += 1
+            total += size
+            seen.setdefault(hash_file(path), size)
+    unique = sum(seen.values())
+    return {
+        "files": files,
+        "total_bytes": total,
+        "unique_blobs": len(seen),
+        "unique_bytes": unique,
+        "saved_bytes": total - unique,
+    }
+
+
+@click.command()
+@click.argument('path', type=click.Path(exists=True, file_okay=False))
+def main(path):
+    report = storage_savings(path)
+    saved_pct = 100.0 * report["saved_bytes"] / report["total_bytes"] if report["total_bytes"] else 0.0
+    click.echo(f"{report['files']} files, {report['total_bytes']} bytes")
+    click.echo(f"{report['unique_blobs']} unique contents, {report['unique_bytes']} bytes")
+    click.echo(f"deduplication saves {report['saved_bytes']} bytes ({saved_pct:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# Consistency check of the user_project_freshness counters (website/freshness.py) on a scratch database:
+# random uploads, version uploads and downloads go through the API, then every stored counter is
+# compared with the on-the-fly computation. Exits with 1 on a mismatch.
+#
+#   python scripts/check_freshness.py [--users N] [--projects N] [--steps N] [--seed N]
+from scratch import scratch_app, client_for
+
+import click
+import io
+import random
+
+
+@click.command()
+@click.option('--users', default=6, show_default=True, help='Members of every project.')
+@click.option('--projects', default=3, show_default=True)
+@click.option('--steps', default=300, show_default=True, help='Random uploads/downloads.')
+@click.option('--seed', default=1, show_default=True, help='Random seed.')
+def main(users, projects, steps, seed):
+    rnd = random.Random(seed)
+    with scratch_app() as app:
+        from website import db
+        from website.models import User_profile, Project, User_Project
+        from website.freshness import rebuild_freshness, find_freshness_mismatches
+
+        user_ids, project_ids = [], []
+        for i in range(users):
+            user = User_profile(full_name=f"Fresh User {i}", nickname='fresh', nickname_id=i + 1,
+                                email=f"fresh-{i}@scratch.invalid", password='x')
+            db.session.add(user)
+            db.session.flush()
+            user_ids.append(user.user_id)
+        for i in range(projects):
+            project = Project(name=f"Fresh project {i}", creator_id=user_ids[0], project_activity_status=True)
+            db.session.add(project)
+            db.session.flush()
+            project_ids.append(project.project_id)
+            for k, user_id in enumerate(user_ids):
+                db.session.add(User_Project(user_id=user_id, project_id=project.project_id, role='owner' if k == 0 else 'editor'))
+        db.session.commit()
+        # counter rows for every membership, as the migration backfills them
+        rebuild_freshness()
+
+        clients = [client_for(app, user_id) for user_id in user_ids]
+        files = {project_id: [] for project_id in project_ids}
+        counts = {"uploads": 0, "versions": 0, "downloads": 0}
+        for _ in range(steps):
+            client = rnd.choice(clients)
+            project_id = rnd.choice(project_ids)
+            op = rnd.random()
+            if op < 0.2 or not files[project_id]:
+                data = {'file': (io.BytesIO(b'first'), 'fresh.txt'), 'title': 'Fresh file'}
+                kind = "uploads"
+            elif op < 0.5:
+                data = {'file': (io.BytesIO(b'next'), 'fresh.txt'), 'main_file_id': str(rnd.choice(files[project_id]))}
+                kind = "versions"
+            else:
+                history = client.get(f"/api/files/{rnd.choice(files[project_id])}/versions").get_json()['version_history']
+                picked = rnd.sample([v['version_id'] for v in history], k=min(len(history), rnd.randint(1, 2)))
+                response = client.post('/api/projects/download', json={'selected_files': picked})
+                if response.status_code != 200:
+                    raise click.ClickException(f"download returned {response.status_code}")
+                counts["downloads"] += 1
+                continue
+
+            response = client.post(f"/api/projects/{project_id}/upload", data=data, content_type='multipart/form-data')
+            if response.status_code != 200:
+                raise click.ClickException(f"upload returned {response.status_code}: {response.get_json()}")
+            if kind == "uploads":
+                files[project_id].append(response.get_json()['file_data']['file_data_id'])
+            counts[kind] += 1
+
+        mismatches = find_freshness_mismatches()
+        click.echo(f"{counts['uploads']} uploads, {counts['versions']} version uploads, {counts['downloads']} downloads")
+        for user_id, project_id, stored, computed in mismatches:
+            click.echo(f"user {user_id} project {project_id}: stored {stored}, computed {computed}")
+        if mismatches:
+            raise SystemExit(1)
+        click.echo("user_project_freshness is consistent.")
+
+
+if __name__ == '__main__':
+    main()
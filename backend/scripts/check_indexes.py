@@ -0,0 +1,155 @@
+# EXPLAIN check for the hot lookup paths: every query below must reach its table through an index.
+# Seeds a realistic dataset into a scratch database (schema and indexes from the models, as
+# db.create_all() builds them), ANALYZEs it and inspects the plans. Exits with 1 if a query does not
+# use an index.
+#
+#   python scripts/check_indexes.py [--projects N]
+from scratch import scratch_app
+
+from website import db
+
+from sqlalchemy import text
+
+import click
+
+# (name, table that must be index-scanned, query); parameters come from seed_sample()
+KEY_QUERIES = [
+    ("membership check", "user_project",
+     "SELECT 1 FROM user_project WHERE project_id = :project_id AND user_id = :user_id AND is_removed = false"),
+    ("project members", "user_project",
+     "SELECT user_id, role FROM user_project WHERE project_id = :project_id AND is_removed = false"),
+    ("latest version of a file", "file_version",
+     "SELECT version_id FROM file_version WHERE file_data_id = :file_data_id AND last_version"),
+    ("version counter", "file_data",
+     "SELECT version_count FROM file_data WHERE file_data_id = :file_data_id"),
+    ("version by number", "file_version",
+     "SELECT version_id FROM file_version WHERE file_data_id = :file_data_id AND version_number = :version_number"),
+    ("files of a project", "file_data",
+     "SELECT file_data_id FROM file_data WHERE project_id = :project_id"),
+    ("download flag", "last_download",
+     "SELECT 1 FROM last_download WHERE user_id = :user_id AND file_data_id = :file_data_id AND version_id = :version_id"),
+    ("downloaders of a version", "last_download",
+     "SELECT user_id FROM last_download WHERE version_id = :version_id"),
+    ("invitations by user", "invitation",
+     "SELECT project_id, invitation_id FROM invitation WHERE invited_user_id = :user_id AND status = 'pending'"),
+    ("invitations by email", "invitation",
+     "SELECT project_id, invitation_id FROM invitation WHERE invited_email = :email AND invited_user_id IS NULL AND status = 'pending'"),
+]
+
+INDEX_SCANS = {'Index Scan', 'Index Only Scan', 'Bitmap Index Scan', 'Bitmap Heap Scan'}
+
+# rows per project of the seeded dataset
+SEED_MEMBERS = 10
+SEED_FILES = 20
+SEED_VERSIONS = 3
+SEED_INVITATIONS = 5
+
+
+def _max_id(table, column):
+    return db.session.execute(text(f"SELECT coalesce(max({column}), 0) FROM {table}")).scalar()
+
+
+# projects * (10 members, 20 files x 3 versions, ~2 downloads per version, 5 invitations); 4 users per project
+def seed_dataset(projects):
+    users = projects * 4
+    u0 = _max_id('user_profile', 'user_id')
+    p0 = _max_id('project', 'project_id')
+    f0 = _max_id('file_data', 'file_data_id')
+    v0 = _max_id('file_version', 'version_id')
+    params = {"users": users, "projects": projects, "u0": u0, "p0": p0, "f0": f0, "v0": v0,
+              "members": SEED_MEMBERS, "files": SEED_FILES, "versions": SEED_VERSIONS, "invitations": SEED_INVITATIONS}
+
+    statements = [
+        """INSERT INTO user_profile (user_id, full_name, nickname, nickname_id, email, password)
+           SELECT :u0 + g, 'Seed User ' || g, 'seed' || (g % 500), g / 500 + 1, 'seed' || g || '@seed.invalid', 'x'
+           FROM generate_series(1, :users) g""",
+        """INSERT INTO project (project_id, name, creator_id, project_activity_status)
+           SELECT :p0 + g, 'Seed project ' || g, :u0 + 1 + (g * 7) % :users, true
+           FROM generate_series(1, :projects) g""",
+        """INSERT INTO user_project (user_id, project_id, role, is_removed)
+           SELECT :u0 + 1 + (p * 7 + k * 13) % :users, :p0 + p,
+                  (CASE WHEN k = 0 THEN 'owner' ELSE 'editor' END)::role_enum, k = :members - 1
+           FROM generate_series(1, :projects) p, generate_series(0, :members - 1) k""",
+        """INSERT INTO file_data (file_data_id, title, project_id, version_count)
+           SELECT :f0 + g, 'Seed file ' || g, :p0 + (g - 1) / :files + 1, :versions
+           FROM generate_series(1, :projects * :files) g""",
+        """INSERT INTO file_version (version_id, version_number, file_name, file_type, file_size, last_version,
+                                     upload_date, file_data_id, user_id)
+           SELECT :v0 + g, (g - 1) % :versions + 1, 'seed_' || g || '.txt', 'text/plain', g % 100000,
+                  (g - 1) % :versions = :versions - 1, now() - (g || ' minutes')::interval,
+                  :f0 + (g - 1) / :versions + 1, :u0 + 1 + (g * 11) % :users
+           FROM generate_series(1, :projects * :files * :versions) g""",
+        """INSERT INTO last_download (version_id, file_data_id, user_id)
+           SELECT :v0 + g, :f0 + (g - 1) / :versions + 1, :u0 + 1 + (g * s) % :users
+           FROM generate_series(1, :projects * :files * :versions) g, (VALUES (17), (29)) AS d(s)
+           ON CONFLICT DO NOTHING""",
+        """INSERT INTO invitation (invited_email, invited_user_id, status, referrer_id, project_id)
+           SELECT 'seed' || ((g * 19) % :users + 1) || '@seed.invalid',
+                  CASE WHEN g % 2 = 0 THEN :u0 + (g * 19) % :users + 1 END,
+                  (ARRAY['pending', 'accepted', 'declined'])[g % 3 + 1]::invitation_status_enum,
+                  :u0 + 1 + g % :users, :p0 + (g - 1) / :invitations + 1
+           FROM generate_series(1, :projects * :invitations) g""",
+    ]
+    for statement in statements:
+        db.session.execute(text(statement), params)
+
+    for table in ('user_profile', 'project', 'user_project', 'file_data', 'file_version', 'last_download', 'invitation'):
+        db.session.execute(text(f"ANALYZE {table}"))
+
+
+# parameters for KEY_QUERIES taken from existing rows
+def seed_sample():
+    row = db.session.execute(text("""
+        SELECT up.user_id, up.project_id, fv.file_data_id, fv.version_id, fv.version_number, u.email
+        FROM user_project up
+        JOIN file_data fd ON fd.project_id = up.project_id
+        JOIN file_version fv ON fv.file_data_id = fd.file_data_id
+        JOIN user_profile u ON u.user_id = up.user_id
+        ORDER BY fv.version_id DESC
+        LIMIT 1
+    """)).first()
+    return dict(row._mapping) if row else None
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+# (passed, how the table was accessed) for one query
+def explain_query(table, query, params):
+    plan = db.session.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params).scalar()[0]['Plan']
+    accesses = [
+        (node['Node Type'], node.get('Index Name'))
+        for node in _plan_nodes(plan)
+        if node.get('Relation Name') == table or (node['Node Type'] == 'Bitmap Index Scan' and node.get('Index Name'))
+    ]
+    passed = any(node_type in INDEX_SCANS for node_type, _ in accesses) and \
+        not any(node_type == 'Seq Scan' for node_type, _ in accesses)
+    description = ", ".join(f"{node_type} {index_name}" if index_name else node_type for node_type, index_name in accesses)
+    return passed, description
+
+
+@click.command()
+@click.option('--projects', default=1000, show_default=True, help='Projects to seed.')
+def main(projects):
+    failures = 0
+    with scratch_app():
+        click.echo(f"Seeding {projects} projects...")
+        seed_dataset(projects)
+        db.session.commit()
+
+        params = seed_sample()
+        for name, table, query in KEY_QUERIES:
+            passed, description = explain_query(table, query, params)
+            failures += not passed
+            click.echo(f"{'ok  ' if passed else 'FAIL'} {name}: {description}")
+
+    if failures:
+        raise SystemExit(1)
+    click.echo("All key queries use indexes.")
+
+
+if __name__ == '__main__':
+    main()
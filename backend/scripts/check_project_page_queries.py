@@ -0,0 +1,92 @@
+# Regression check for the project_page file listing (GET /project/<id>, website/views.py) on a scratch
+# database: a project with --files files and one with ten times as many must be served with the same
+# number of statements, with and without ?limit. Exits with 1 if the counts differ.
+#
+#   python scripts/check_project_page_queries.py [--files N]
+from scratch import scratch_app, client_for
+
+from website import db
+from website.models import Project
+
+from sqlalchemy import event, text
+
+import click
+
+# members of both projects; they take turns uploading
+MEMBERS = 5
+
+
+# project with files files, one to three versions each; the first member downloaded every third version
+def seed_project(files):
+    project = Project(name=f"Listing {files}", creator_id=1, project_activity_status=True)
+    db.session.add(project)
+    db.session.flush()
+    params = {"project_id": project.project_id, "files": files, "members": MEMBERS}
+    statements = [
+        """INSERT INTO user_project (user_id, project_id, role, is_removed)
+           SELECT u, :project_id, (CASE WHEN u = 1 THEN 'owner' ELSE 'editor' END)::role_enum, false
+           FROM generate_series(1, :members) u""",
+        """INSERT INTO file_data (title, description, project_id, version_count)
+           SELECT 'Listing file ' || g, 'Seeded file ' || g, :project_id, 1 + g % 3
+           FROM generate_series(1, :files) g""",
+        """INSERT INTO file_version (version_number, file_name, file_type, file_size, last_version, upload_date,
+                                     file_data_id, user_id)
+           SELECT v, 'listing_' || fd.file_data_id || '_v' || v || '.txt', 'text/plain', v * 100,
+                  v = fd.version_count, now() - ((fd.file_data_id * 3 - v) || ' minutes')::interval,
+                  fd.file_data_id, 1 + (fd.file_data_id + v) % :members
+           FROM file_data fd, generate_series(1, 3) v
+           WHERE fd.project_id = :project_id AND v <= fd.version_count""",
+        """INSERT INTO last_download (version_id, file_data_id, user_id)
+           SELECT fv.version_id, fv.file_data_id, 1
+           FROM file_version fv JOIN file_data fd ON fd.file_data_id = fv.file_data_id
+           WHERE fd.project_id = :project_id AND fv.version_id % 3 = 0""",
+    ]
+    for statement in statements:
+        db.session.execute(text(statement), params)
+    return project.project_id
+
+
+@click.command()
+@click.option('--files', default=50, show_default=True, help='Files of the small project (the large one has ten times as many).')
+def main(files):
+    with scratch_app() as app:
+        db.session.execute(text("""
+            INSERT INTO user_profile (user_id, full_name, nickname, nickname_id, email, password)
+            SELECT g, 'Listing User ' || g, 'listing', g, 'listing-' || g || '@scratch.invalid', 'x'
+            FROM generate_series(1, :members) g
+        """), {"members": MEMBERS})
+        projects = {n: seed_project(n) for n in (files, files * 10)}
+        db.session.commit()
+        client = client_for(app, 1)
+
+        statements = [0]
+
+        def count_statement(*args):
+            statements[0] += 1
+
+        results = {}
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+        try:
+            for query in ("", "?limit=20"):
+                for n, project_id in projects.items():
+                    url = f"/project/{project_id}{query}"
+                    # the first request also fills the profile/membership caches
+                    client.get(url)
+                    statements[0] = 0
+                    response = client.get(url)
+                    if response.status_code != 200:
+                        raise click.ClickException(f"{url} returned {response.status_code}")
+                    listed = len(response.get_json()['files'])
+                    results.setdefault(query, []).append(statements[0])
+                    click.echo(f"GET /project/<id>{query} with {n} files: {listed} listed, {statements[0]} statements")
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+    if any(len(set(counts)) != 1 for counts in results.values()):
+        click.echo("The number of statements grows with the number of files.")
+        raise SystemExit(1)
+    click.echo("project_page runs a constant number of statements.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# Check get_user_projects() (the SQL dashboard function) against the ORM dashboard query on a seeded
+# scratch database, and time both. Exits with 1 if any user's rows differ.
+#
+#   python scripts/compare_dashboard.py [--projects N] [--users N] [--repeat N]
+from scratch import scratch_app
+from check_indexes import seed_dataset
+
+from website import db
+from website.models import User_Project, User_project_freshness
+from website.dashboard import build_dashboard_roles, fetch_dashboard_roles
+from website.freshness import rebuild_freshness
+
+from sqlalchemy import func
+
+import click
+import time
+
+
+def _timed(fn, user_id, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(user_id)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+@click.command()
+@click.option('--projects', default=200, show_default=True, help='Projects to seed.')
+@click.option('--users', default=100, show_default=True, help='Users to compare (those with the most projects first).')
+@click.option('--repeat', default=5, show_default=True, help='Runs per path for the latency numbers.')
+def main(projects, users, repeat):
+    with scratch_app():
+        seed_dataset(projects)
+        db.session.commit()
+        rebuild_freshness()
+
+        user_ids = [uid for (uid,) in db.session.query(User_Project.user_id).
+                    group_by(User_Project.user_id).
+                    order_by(func.count().desc(), User_Project.user_id).
+                    limit(users)]
+        # the first user has no counter rows: get_user_projects() computes has_latest on the fly there
+        if user_ids:
+            User_project_freshness.query.filter_by(user_id=user_ids[0]).delete(synchronize_session=False)
+            db.session.commit()
+
+        mismatches = 0
+        orm_total = sql_total = 0.0
+        for uid in user_ids:
+            # SQL first: the ORM path stores the counter rows it finds missing
+            sql_rows, sql_ms = _timed(fetch_dashboard_roles, uid, repeat)
+            orm_rows, orm_ms = _timed(build_dashboard_roles, uid, repeat)
+            orm_total += orm_ms
+            sql_total += sql_ms
+            if orm_rows != sql_rows:
+                mismatches += 1
+                click.echo(f"user {uid}: results differ")
+                for orm_row, sql_row in zip(orm_rows, sql_rows):
+                    if orm_row != sql_row:
+                        click.echo(f"  orm: {orm_row}\n  sql: {sql_row}")
+                        break
+                if len(orm_rows) != len(sql_rows):
+                    click.echo(f"  orm: {len(orm_rows)} rows, sql: {len(sql_rows)} rows")
+
+    if user_ids:
+        click.echo(f"{len(user_ids)} users, avg per call: orm {orm_total / len(user_ids):.2f} ms, sql {sql_total / len(user_ids):.2f} ms")
+    if mismatches:
+        raise SystemExit(1)
+    click.echo("get_user_projects() matches the ORM path.")
+
+
+if __name__ == '__main__':
+    main()
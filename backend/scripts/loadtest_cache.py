@@ -0,0 +1,60 @@
+# Queries per request with and without the profile/membership cache (website/cache.py), on a scratch
+# database: one member of a small project alternates between the members list and their profile.
+#
+#   python scripts/loadtest_cache.py [--requests N] [--members N]
+from scratch import scratch_app, client_for
+
+from website import db
+from website.models import User_profile, Project, User_Project
+from website.cache import NullCache, LocalCache, CacheStats
+
+from sqlalchemy import event
+
+import click
+
+
+@click.command()
+@click.option('--requests', 'count', default=300, show_default=True, help='Requests per run.')
+@click.option('--members', default=20, show_default=True, help='Members of the project.')
+def main(count, members):
+    with scratch_app() as app:
+        users = [User_profile(full_name=f"Cache User {i}", nickname='cache', nickname_id=i + 1,
+                              email=f"cache-{i}@scratch.invalid", password='x') for i in range(members)]
+        db.session.add_all(users)
+        db.session.flush()
+        project = Project(name="Cache load test", creator_id=users[0].user_id, project_activity_status=True)
+        db.session.add(project)
+        db.session.flush()
+        db.session.add_all([User_Project(user_id=user.user_id, project_id=project.project_id, role='owner' if i == 0 else 'editor')
+                            for i, user in enumerate(users)])
+        db.session.commit()
+        user_id, project_id = users[0].user_id, project.project_id
+
+        paths = [f"/api/projects/{project_id}/members", "/api/profile"]
+        queries = [0]
+
+        def count_query(*args):
+            queries[0] += 1
+
+        event.listen(db.engine, 'before_cursor_execute', count_query)
+        try:
+            for label, run_backend in (("without cache", NullCache()), ("with cache", LocalCache())):
+                app.extensions['cache'] = run_backend
+                app.extensions['cache_stats'] = {"user": CacheStats(), "membership": CacheStats()}
+                client = client_for(app, user_id)
+
+                queries[0] = 0
+                for i in range(count):
+                    response = client.get(paths[i % len(paths)])
+                    if response.status_code != 200:
+                        click.echo(f"{paths[i % len(paths)]} returned {response.status_code}")
+                        raise SystemExit(1)
+                click.echo(f"{label}: {queries[0] / count:.2f} queries per request")
+                for kind, kind_stats in app.extensions['cache_stats'].items():
+                    click.echo(f"  {kind}: {kind_stats.as_dict()}")
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_query)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Responsiveness during a burst of slow signups (website/recaptcha.py): serves the app on a scratch
+# database with the local reCAPTCHA stand-in slowed down by --delay, fires --signups concurrent signups
+# and measures how fast a cheap request is answered meanwhile.
+# With --url the burst goes to an already running server instead (start it with RECAPTCHA_VERIFIER=local
+# and RECAPTCHA_LOCAL_DELAY); the signup payload fails validation right after the captcha check, so
+# nothing is written either way.
+#
+#   python scripts/loadtest_recaptcha.py [--delay S] [--signups N] [--probes N] [--url URL]
+from scratch import scratch_app
+
+from website.recaptcha import init_recaptcha
+
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import make_server
+
+import click
+import logging
+import requests
+import statistics
+import threading
+import time
+
+
+def _timed_get(url):
+    start = time.perf_counter()
+    requests.get(url, timeout=60)
+    return (time.perf_counter() - start) * 1000
+
+
+def run_burst(url, signups, probes):
+    probe_url = url.rstrip('/') + '/api/profile'
+    signup = {'captchaResponse': 'loadtest', 'email': 'x'}
+
+    baseline = [_timed_get(probe_url) for _ in range(5)]
+    with ThreadPoolExecutor(max_workers=signups + 1) as pool:
+        start = time.perf_counter()
+        burst = [pool.submit(requests.post, url.rstrip('/') + '/signup', json=signup, timeout=60) for _ in range(signups)]
+        time.sleep(0.1)
+        during = []
+        for _ in range(probes):
+            during.append(_timed_get(probe_url))
+            if all(f.done() for f in burst):
+                break
+        statuses = [f.result().status_code for f in burst]
+        burst_seconds = time.perf_counter() - start
+
+    click.echo(f"probe latency before the burst: median {statistics.median(baseline):.1f} ms")
+    click.echo(f"probe latency during {signups} slow signups: median {statistics.median(during):.1f} ms, "
+               f"max {max(during):.1f} ms ({len(during)} probes)")
+    click.echo(f"burst finished in {burst_seconds:.1f} s, signup statuses {sorted(set(statuses))}")
+
+
+@click.command()
+@click.option('--url', default=None, help='Base URL of a running server (default: serve a scratch app).')
+@click.option('--delay', default=2.0, show_default=True, help='Seconds each captcha check takes (scratch app).')
+@click.option('--signups', default=8, show_default=True, help='Concurrent signups in the burst.')
+@click.option('--probes', default=20, show_default=True, help='Cheap requests sent during the burst.')
+def main(url, delay, signups, probes):
+    if url:
+        run_burst(url, signups, probes)
+        return
+
+    with scratch_app(RECAPTCHA_VERIFIER='local', RECAPTCHA_LOCAL_DELAY=delay) as app:
+        init_recaptcha(app)
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        # one thread per request, like the gthread workers
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            run_burst(f"http://127.0.0.1:{server.server_port}", signups, probes)
+        finally:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# Parallel version uploads of one main file on a scratch database: the version numbers must come out
+# dense (1..N) with exactly one latest version (website/versioning.py). Exits with 1 otherwise.
+#
+#   python scripts/race_versions.py [--uploads N] [--threads N]
+from scratch import scratch_app
+
+from website import db
+from website.models import User_profile, Project, User_Project, File_data, File_version
+from website.views import add_file_version
+from website.blobstore import store_stream
+
+from concurrent.futures import ThreadPoolExecutor
+from flask_login import login_user
+
+import click
+import io
+
+
+@click.command()
+@click.option('--uploads', default=50, show_default=True, help='Parallel version uploads of one file.')
+@click.option('--threads', default=16, show_default=True)
+def main(uploads, threads):
+    with scratch_app() as app:
+        user = User_profile(full_name="Race Test", nickname='race', nickname_id=1, email='race@scratch.invalid', password='x')
+        db.session.add(user)
+        db.session.flush()
+        project = Project(name="Version race", creator_id=user.user_id, project_activity_status=True)
+        db.session.add(project)
+        db.session.flush()
+        db.session.add(User_Project(user_id=user.user_id, project_id=project.project_id, role='owner'))
+        file_data = File_data(title="Version race", project_id=project.project_id)
+        db.session.add(file_data)
+        db.session.commit()
+        user_id, file_data_id = user.user_id, file_data.file_data_id
+
+        def upload(i):
+            with app.test_request_context():
+                login_user(db.session.get(User_profile, user_id))
+                blob_hash, size = store_stream(io.BytesIO(f"race {i}".encode()))
+                version = add_file_version(db.session.get(File_data, file_data_id), "race.txt", "text/plain", "", blob_hash, size)
+                db.session.commit()
+                return version.version_number
+
+        with ThreadPoolExecutor(threads) as pool:
+            returned = sorted(pool.map(upload, range(uploads)))
+        numbers = [n for (n,) in db.session.query(File_version.version_number).
+                   filter(File_version.file_data_id == file_data_id).order_by(File_version.version_number)]
+        latest = db.session.query(File_version.version_number).\
+            filter(File_version.file_data_id == file_data_id, File_version.last_version == True).all()
+
+    dense = numbers == returned == list(range(1, uploads + 1))
+    click.echo(f"{uploads} parallel uploads: versions {'1..' + str(uploads) + ' dense' if dense else numbers}, "
+               f"latest {[n for (n,) in latest]}")
+    if not dense or latest != [(uploads,)]:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
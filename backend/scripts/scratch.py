@@ -0,0 +1,103 @@
+# Throwaway database for the benchmark, stress and consistency scripts in this folder.
+# scratch_app() creates an empty database on the server of DATABASE_URL (same credentials), builds the
+# app on it (db.create_all() and db-init/get_user_projects.sql) with a temporary UPLOAD_FOLDER, and drops
+# both again afterwards, so nothing a script writes ever reaches real data.
+#
+#   cd backend && DATABASE_URL=postgresql://... python scripts/<script>.py --help
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from flask.testing import FlaskClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+dotenv_path = os.path.join(BACKEND_DIR, '.env')
+if os.path.exists(dotenv_path):
+    load_dotenv(dotenv_path)
+
+
+@contextmanager
+def scratch_database():
+    if not os.environ.get('DATABASE_URL'):
+        raise SystemExit("DATABASE_URL is not set; it names the server the scratch database is created on.")
+    server_url = make_url(os.environ['DATABASE_URL'])
+    name = f"sortify_scratch_{uuid.uuid4().hex[:12]}"
+
+    admin = create_engine(server_url, isolation_level='AUTOCOMMIT')
+    with admin.connect() as conn:
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    try:
+        yield server_url.set(database=name).render_as_string(hide_password=False)
+    finally:
+        with admin.connect() as conn:
+            # threads of a script may still hold pooled connections
+            conn.execute(text("SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = :name"), {"name": name})
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+        admin.dispose()
+
+
+# the app on a scratch database, inside an app context; config overrides the environment's settings
+@contextmanager
+def scratch_app(**config):
+    upload_folder = tempfile.mkdtemp(prefix='sortify-scratch-')
+    saved_url = os.environ.get('DATABASE_URL')
+    try:
+        with scratch_database() as url:
+            os.environ['DATABASE_URL'] = url
+            from website import create_app, db
+            app = create_app()
+            app.config['UPLOAD_FOLDER'] = upload_folder
+            app.config.update(config)
+            try:
+                with app.app_context():
+                    with open(os.path.join(BACKEND_DIR, 'db-init', 'get_user_projects.sql')) as f:
+                        db.session.execute(text(f.read()))
+                    db.session.commit()
+                    yield app
+            finally:
+                with app.app_context():
+                    db.session.remove()
+                    db.engine.dispose()
+    finally:
+        if saved_url is not None:
+            os.environ['DATABASE_URL'] = saved_url
+        shutil.rmtree(upload_folder, ignore_errors=True)
+
+
+# Requests of a scratch client run in their own app context (own g and db session), as in a real
+# worker, and go to https://localhost (the session cookie is Secure). Buffered responses are read
+# before the context ends; streamed ones end it when they are closed.
+class ScratchClient(FlaskClient):
+    def open(self, *args, **kwargs):
+        kwargs.setdefault('base_url', 'https://localhost')
+        ctx = self.application.app_context()
+        ctx.push()
+        try:
+            response = super().open(*args, **kwargs)
+        except BaseException:
+            ctx.pop()
+            raise
+        if kwargs.get('buffered', True):
+            response.get_data()
+            ctx.pop()
+        else:
+            # streamed responses keep the app context (and its session) until the caller closes them
+            response.call_on_close(ctx.pop)
+        return response
+
+
+# test client logged in as user_id (session cookie set directly, no password or captcha)
+def client_for(app, user_id):
+    client = ScratchClient(app, app.response_class, use_cookies=True)
+    with client.session_transaction(base_url='https://localhost') as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
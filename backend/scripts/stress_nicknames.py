@@ -0,0 +1,53 @@
+# Parallel signups under one nickname on a scratch database: every user must get a distinct nickname_id
+# (website/nicknames.py). --prefill takes ids 1..N beforehand to test a crowded nickname.
+# Exits with 1 if ids were duplicated or signups lost.
+#
+#   python scripts/stress_nicknames.py [--signups N] [--threads N] [--prefill N]
+from scratch import scratch_app
+
+from website import db
+from website.models import User_profile
+from website.nicknames import assign_nickname
+
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+
+import click
+
+
+@click.command()
+@click.option('--signups', default=200, show_default=True, help='Users created with the same nickname.')
+@click.option('--threads', default=16, show_default=True, help='Concurrent signups.')
+@click.option('--nickname', default='stress', show_default=True)
+@click.option('--prefill', default=0, show_default=True, help='Ids 1..N taken beforehand (a crowded nickname).')
+def main(signups, threads, nickname, prefill):
+    with scratch_app() as app:
+        if prefill:
+            db.session.execute(text("""
+                INSERT INTO user_profile (full_name, nickname, nickname_id, email, password)
+                SELECT 'Stress Test', :nickname, g, 'stress-p' || g || '@scratch.invalid', 'x'
+                FROM generate_series(1, :prefill) g
+            """), {"nickname": nickname, "prefill": prefill})
+            db.session.commit()
+
+        def signup(i):
+            with app.app_context():
+                user = User_profile(email=f"stress-s{i}@scratch.invalid", full_name="Stress Test", password="x")
+                nickname_id = assign_nickname(user, nickname)
+                db.session.commit()
+                return nickname_id
+
+        with ThreadPoolExecutor(threads) as pool:
+            ids = list(pool.map(signup, range(signups)))
+        stored = db.session.execute(text(
+            "SELECT count(*), count(DISTINCT nickname_id) FROM user_profile WHERE nickname = :nickname AND email LIKE 'stress-s%'"
+        ), {"nickname": nickname}).one()
+
+    click.echo(f"{signups} parallel signups as {nickname!r}: {len(set(ids))} distinct ids returned, "
+               f"{stored[0]} users stored with {stored[1]} distinct ids")
+    if not (len(set(ids)) == stored[0] == stored[1] == signups):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,9 @@ DB_NAME = "database.db"
 # Function to initialize the application
 def create_app():
     app = Flask(__name__, static_folder='static')
+    # faster JSON encoding when orjson is installed
+    from .serializers import init_json_provider
+    init_json_provider(app)
     # configuration from environment (fallback to dev values)
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'szekret')
     # DATABASE_URL is the standard name used by many hosting providers
@@ -36,6 +39,36 @@ def create_app():
     UPLOAD_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'uploads')
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)    
     app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER 
+    # resumable uploads: largest accepted file and largest single chunk (bytes)
+    app.config['MAX_CHUNKED_UPLOAD_SIZE'] = int(os.environ.get('MAX_CHUNKED_UPLOAD_SIZE', 20 * 1024 * 1024 * 1024))
+    app.config['UPLOAD_CHUNK_SIZE'] = int(os.environ.get('UPLOAD_CHUNK_SIZE', 16 * 1024 * 1024))
+    # delta storage of successive versions (off by default), applied by `flask blobs compact` outside requests;
+    # a full snapshot every DELTA_MAX_DEPTH versions, only files up to DELTA_MAX_SIZE bytes, and only when
+    # the delta is at most DELTA_MAX_RATIO of the full size
+    app.config['DELTA_STORAGE'] = os.environ.get('DELTA_STORAGE', '').lower() in ('1', 'true', 'yes')
+    app.config['DELTA_MAX_DEPTH'] = int(os.environ.get('DELTA_MAX_DEPTH', 8))
+    app.config['DELTA_MAX_SIZE'] = int(os.environ.get('DELTA_MAX_SIZE', 16 * 1024 * 1024))
+    app.config['DELTA_MAX_RATIO'] = float(os.environ.get('DELTA_MAX_RATIO', 0.5))
+    # process-wide cache of user profiles and project memberships ("local", "none" or "module:Class"
+    # of a shared backend); TTLs in seconds
+    app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'local')
+    app.config['CACHE_MAX_ENTRIES'] = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+    app.config['CACHE_USER_TTL'] = int(os.environ.get('CACHE_USER_TTL', 300))
+    app.config['CACHE_MEMBERSHIP_TTL'] = int(os.environ.get('CACHE_MEMBERSHIP_TTL', 30))
+    # reCAPTCHA verifier ("google", "local" stand-in or "module:Class"); timeout in seconds, the circuit
+    # opens after BREAKER_THRESHOLD failures in a row and stays open for BREAKER_COOLDOWN seconds
+    app.config['RECAPTCHA_VERIFIER'] = os.environ.get('RECAPTCHA_VERIFIER', 'google')
+    app.config['RECAPTCHA_TIMEOUT'] = float(os.environ.get('RECAPTCHA_TIMEOUT', 3.0))
+    app.config['RECAPTCHA_POOL_SIZE'] = int(os.environ.get('RECAPTCHA_POOL_SIZE', 10))
+    app.config['RECAPTCHA_BREAKER_THRESHOLD'] = int(os.environ.get('RECAPTCHA_BREAKER_THRESHOLD', 5))
+    app.config['RECAPTCHA_BREAKER_COOLDOWN'] = float(os.environ.get('RECAPTCHA_BREAKER_COOLDOWN', 30))
+    app.config['RECAPTCHA_LOCAL_DELAY'] = float(os.environ.get('RECAPTCHA_LOCAL_DELAY', 0))
+    # password hashing: pbkdf2 cost, hashing processes per worker (0 = inline), hashes allowed to queue
+    # per worker, and how long (seconds) a request waits for a slot before getting a 503
+    app.config['PASSWORD_HASH_ITERATIONS'] = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 1000000))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 1))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
 
     # enable CORS for all routes with credential support (required for session-based auth with cookies)
     # When credentials=True, origins CANNOT be '*'. Must be specific origin(s).
@@ -73,6 +106,18 @@ def create_app():
 
     create_database(app)
 
+    from .cache import init_cache
+    init_cache(app)
+    from .recaptcha import init_recaptcha
+    init_recaptcha(app)
+
+    from .freshness import freshness_cli
+    from .blobstore import blobs_cli
+    from .reconcile import uploads_cli
+    app.cli.add_command(freshness_cli)
+    app.cli.add_command(blobs_cli)
+    app.cli.add_command(uploads_cli)
+
     # Handlers for login/logout
     login_manager = LoginManager()
     login_manager.login_view = 'auth.login'
@@ -80,7 +125,8 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(id):
-        return User_profile.query.get(int(id))
+        from .cache import get_cached_user
+        return get_cached_user(int(id))
     
     @login_manager.unauthorized_handler
     def unauthorized():
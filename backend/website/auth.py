@@ -1,7 +1,11 @@
 from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
 from .models import User_profile, User_Project, Project
-from werkzeug.security import generate_password_hash, check_password_hash
 from . import db
+from .recaptcha import verify_recaptcha, RecaptchaUnavailable
+from .passwords import hash_password, verify_password, needs_rehash, HashingBusy
+from .cache import invalidate_user
+from .nicknames import assign_nickname, NicknameIdsExhausted
+from .invitations import claim_email_invitations
 from flask_login import login_user, login_required, logout_user, current_user
 import phonenumbers
 import re
@@ -9,8 +13,6 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField
 from flask_wtf.recaptcha import RecaptchaField
 import os
-import requests
-import random
 import bleach
 
 
@@ -28,7 +30,19 @@ def login():
 
     user = User_profile.query.filter_by(email=email).first()
     if user:
-        if check_password_hash(user.password, password):
+        try:
+            password_ok = verify_password(user.password, password)
+        except HashingBusy:
+            return {"message": "Server is busy, please try again.", "status": "error"}, 503
+        if password_ok:
+            # hashed with an older cost setting: store a new hash
+            if needs_rehash(user.password):
+                try:
+                    user.password = hash_password(password)
+                    db.session.commit()
+                    invalidate_user(user.user_id)
+                except HashingBusy:
+                    pass
             login_user(user, remember=True)
             return {"message": "Logged in successfully!", "status": "success"}, 200
         else:
@@ -54,19 +68,7 @@ def logout():
 #   RECAPTCHA_PUBLIC_KEY=6LeKEvEqAAAAAI1MIfoiTYc_MBpk6GZ0hXO-fCot
 #   RECAPTCHA_PRIVATE_KEY=6LeKEvEqAAAAACB2kZN3_QckJOu_nYtxpHuRWz2O
 
-# Verify reCAPTCHA function
-
-def verify_recaptcha(response):
-    secret_key = os.getenv('RECAPTCHA_PRIVATE_KEY')
-    print("reCAPTCHA secret used:", secret_key)  # debug
-    if not secret_key:
-        # fallback for local testing (not recommended long term)
-        secret_key = "6LeKEvEqAAAAACB2kZN3_QckJOu_nYtxpHuRWz2O"
-    verify_url = "https://www.google.com/recaptcha/api/siteverify"
-    payload = {'secret': secret_key, 'response': response}
-    result = requests.post(verify_url, data=payload).json()
-    print("reCAPTCHA API response:", result)  # Debugging
-    return result.get("success", False)
+# Verification itself lives in recaptcha.py (pooled session, timeout, circuit breaker)
 
 # Regex patterns
 FULL_NAME_REGEX = re.compile(r"^[A-Za-zÀ-ÖØ-öø-ÿ-]+(?: [A-Za-zÀ-ÖØ-öø-ÿ-]+)*$")
@@ -91,8 +93,12 @@ def sign_up():
         captcha_response = data.get('captchaResponse')
 
         # Verify reCAPTCHA
-        if not verify_recaptcha(captcha_response):
-            return {"message": "Please complete the CAPTCHA.", "status": "error"}, 400
+        try:
+            if not verify_recaptcha(captcha_response):
+                return {"message": "Please complete the CAPTCHA.", "status": "error"}, 400
+        except RecaptchaUnavailable as e:
+            print("reCAPTCHA verification unavailable:", e)
+            return {"message": "CAPTCHA verification is temporarily unavailable, please try again.", "status": "error"}, 503
 
         # Get data from the request, bleach and validate
         email = data.get('email')
@@ -135,36 +141,32 @@ def sign_up():
                 "status": "error",
             }, 400
         
-        # Generate nickname_id 
-        possible_ids = list(range(1, 10000))
-        taken_ids = [
-            user.nickname_id for user in User_profile.query.filter_by(nickname=nickname).all()
-        ]            
-        available_ids = list(set(possible_ids) - set(taken_ids))
-
-        if not available_ids:
+        try:
+            password_hash = hash_password(password1)
+        except HashingBusy:
+            return {"message": "Server is busy, please try again.", "status": "error"}, 503
+
+        new_user = User_profile(
+            email=email,
+            full_name=full_name,
+            password=password_hash,
+            mobile=mobile,
+            job=job,
+        )
+
+        # Generate nickname_id (unique per nickname, see nicknames.py)
+        try:
+            assign_nickname(new_user, nickname)
+        except NicknameIdsExhausted:
+            db.session.rollback()
             return {"message": "No available nickname IDs for this nickname.", "status": "error"}, 500
-        else:
-            nickname_id = random.choice(available_ids)
-
-        # Check if nickname is already taken, and if not, generate a new user
-        if nickname_id:
-            new_user = User_profile(
-                email=email,
-                full_name=full_name,
-                password=generate_password_hash(password1, method='pbkdf2:sha256'),
-                nickname=nickname,
-                mobile=mobile,
-                nickname_id=nickname_id, 
-                job=job,
-            )
-
-            db.session.add(new_user)
-            db.session.commit()
-
-            login_user(new_user, remember=True)
-
-            return {"message": "Account created successfully!", "status": "success"}, 201
+        # invitations sent to this address before the account existed
+        claim_email_invitations(new_user.user_id, email)
+        db.session.commit()
+
+        login_user(new_user, remember=True)
+
+        return {"message": "Account created successfully!", "status": "success"}, 201
 
     # If the request method is not POST, return an error
     return {"message": "Invalid request method.", "status": "error"}, 405
@@ -0,0 +1,331 @@
+from .models import Blob, File_data, File_version
+from . import db
+from .delta import encode_delta, apply_delta
+
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+import click
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+
+# Content-addressed storage for file versions: every distinct content is stored once under
+# UPLOAD_FOLDER/blobs/<aa>/<bb>/<sha256>, and File_version.blob_hash points at it.
+# Blob.ref_count counts the versions using a blob; `flask blobs gc` removes unreferenced blobs.
+# Versions uploaded before the blob store existed keep blob_hash NULL and their old path.
+#
+# Optional delta storage (DELTA_STORAGE): uploads store full blobs; `flask blobs compact` later re-encodes
+# them as binary deltas against the previous version of the same file, kept at <sha256>.delta. Every
+# DELTA_MAX_DEPTH versions a full snapshot is kept instead, so rebuilding a version never applies
+# more than DELTA_MAX_DEPTH deltas. A base blob counts one reference per delta built on it.
+
+READ_SIZE = 1024 * 1024
+# unreferenced blobs younger than this may belong to an upload that has not committed yet
+GC_GRACE_SECONDS = 60 * 60
+# advisory lock: shared by every transaction that puts a blob into the store, exclusive for gc
+BLOB_GC_LOCK = 0x626c6f6273
+
+
+def get_blob_root():
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], 'blobs')
+
+def get_blob_path(blob_hash):
+    return os.path.join(get_blob_root(), blob_hash[:2], blob_hash[2:4], blob_hash)
+
+def get_delta_path(blob_hash):
+    return get_blob_path(blob_hash) + '.delta'
+
+def get_tmp_dir():
+    tmp_dir = os.path.join(get_blob_root(), 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    return tmp_dir
+
+# legacy location: UPLOAD_FOLDER/<project_id>/<file_data_id>/<file_name>
+def get_legacy_path(file_data, file_version):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], str(file_data.project_id), str(file_data.file_data_id), file_version.file_name)
+
+def version_file_exists(file_data, file_version):
+    if file_version.blob_hash:
+        return os.path.exists(get_blob_path(file_version.blob_hash)) or os.path.exists(get_delta_path(file_version.blob_hash))
+    return os.path.exists(get_legacy_path(file_data, file_version))
+
+# path holding the full content of a version; is_temp means the caller deletes it after use
+def materialize_version(file_data, file_version):
+    if file_version.blob_hash:
+        return materialize_blob(file_version.blob_hash)
+    return get_legacy_path(file_data, file_version), False
+
+def materialize_blob(blob_hash):
+    blob = Blob.query.get(blob_hash)
+    if blob is None or blob.base_hash is None:
+        return get_blob_path(blob_hash), False
+
+    # deltas from this blob down to the nearest full snapshot
+    chain = []
+    while blob.base_hash is not None:
+        chain.append(blob.blob_hash)
+        blob = Blob.query.get(blob.base_hash)
+
+    source, source_is_temp = get_blob_path(blob.blob_hash), False
+    for delta_hash in reversed(chain):
+        fd, out_path = tempfile.mkstemp(dir=get_tmp_dir(), prefix='.rebuild-')
+        try:
+            with open(source, 'rb') as base_file, open(get_delta_path(delta_hash), 'rb') as delta_file, \
+                    os.fdopen(fd, 'wb') as out_file:
+                apply_delta(base_file, delta_file, out_file)
+        except BaseException:
+            os.remove(out_path)
+            raise
+        finally:
+            if source_is_temp:
+                os.remove(source)
+        source, source_is_temp = out_path, True
+    return source, True
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# held until the caller's transaction ends, so gc never recounts references while a version pointing
+# at a blob it just stored is uncommitted
+def _lock_against_gc():
+    db.session.execute(select(func.pg_advisory_xact_lock_shared(BLOB_GC_LOCK)))
+
+# move a finished file into the store; identical content already stored means the file is dropped
+def _commit_blob_file(path, blob_hash):
+    final_path = get_blob_path(blob_hash)
+    if os.path.exists(final_path) or os.path.exists(get_delta_path(blob_hash)):
+        os.remove(path)
+        # the existing copy may be a leftover without a row; it must outlive gc's grace period again
+        for existing in (final_path, get_delta_path(blob_hash)):
+            try:
+                os.utime(existing)
+            except FileNotFoundError:
+                pass
+    else:
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(path, final_path)
+    return final_path
+
+# store a file that is already on disk (e.g. a completed chunked upload); returns (blob_hash, size)
+# keep_source leaves the file in place and stores a hard link (or a copy across filesystems), so the
+# caller still has it if its transaction fails; an orphaned blob is left to gc
+def store_file(path, keep_source=False):
+    _lock_against_gc()
+    size = os.path.getsize(path)
+    blob_hash = hash_file(path)
+    if keep_source:
+        path = _link_to_tmp(path)
+    _commit_blob_file(path, blob_hash)
+    return blob_hash, size
+
+def _link_to_tmp(path):
+    tmp_path = os.path.join(get_tmp_dir(), f".upload-{uuid.uuid4().hex}")
+    try:
+        os.link(path, tmp_path)
+    except OSError:
+        shutil.copyfile(path, tmp_path)
+    return tmp_path
+
+# store a readable stream, hashing while writing; returns (blob_hash, size)
+def store_stream(stream):
+    _lock_against_gc()
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=get_tmp_dir(), prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            for block in iter(lambda: stream.read(READ_SIZE), b''):
+                digest.update(block)
+                tmp.write(block)
+                size += len(block)
+        blob_hash = digest.hexdigest()
+        _commit_blob_file(tmp_path, blob_hash)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return blob_hash, size
+
+# count one more version using the blob (part of the caller's transaction)
+def add_blob_reference(blob_hash, size):
+    db.session.execute(
+        insert(Blob).
+        values(blob_hash=blob_hash, size=size, stored_size=size, ref_count=1).
+        on_conflict_do_update(index_elements=['blob_hash'], set_={'ref_count': Blob.ref_count + 1})
+    )
+
+
+# re-encode the blob of a committed version as a delta against the previous version
+def compact_version(file_version):
+    if not current_app.config['DELTA_STORAGE'] or not file_version.blob_hash:
+        return False
+
+    previous = File_version.query.filter(
+        File_version.file_data_id == file_version.file_data_id,
+        File_version.version_number < file_version.version_number,
+        File_version.blob_hash != None
+    ).order_by(File_version.version_number.desc()).first()
+
+    if previous is None or previous.blob_hash == file_version.blob_hash:
+        return False
+    return delta_encode_blob(file_version.blob_hash, previous.blob_hash)
+
+def delta_encode_blob(blob_hash, base_hash):
+    config = current_app.config
+    blob = Blob.query.filter_by(blob_hash=blob_hash).with_for_update().first()
+    base = Blob.query.get(base_hash)
+
+    # only full blobs nothing else is built on (keeps depths exact and rules out cycles)
+    if blob is None or base is None or blob.base_hash is not None or \
+            Blob.query.filter_by(base_hash=blob_hash).first() is not None:
+        db.session.rollback()
+        return False
+
+    # a full snapshot every DELTA_MAX_DEPTH versions bounds reconstruction depth
+    if base.delta_depth + 1 > config['DELTA_MAX_DEPTH'] or max(blob.size or 0, base.size or 0) > config['DELTA_MAX_SIZE']:
+        db.session.rollback()
+        return False
+
+    base_path, base_is_temp = materialize_blob(base_hash)
+    try:
+        with open(base_path, 'rb') as base_file, open(get_blob_path(blob_hash), 'rb') as blob_file:
+            delta = encode_delta(base_file.read(), blob_file.read())
+    finally:
+        if base_is_temp:
+            os.remove(base_path)
+
+    if len(delta) > (blob.size or 0) * config['DELTA_MAX_RATIO']:
+        db.session.rollback()
+        return False
+
+    fd, tmp_path = tempfile.mkstemp(dir=get_tmp_dir(), prefix='.delta-')
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(delta)
+    os.replace(tmp_path, get_delta_path(blob_hash))
+
+    blob.base_hash = base_hash
+    blob.delta_depth = base.delta_depth + 1
+    blob.stored_size = len(delta)
+    Blob.query.filter_by(blob_hash=base_hash).update({"ref_count": Blob.ref_count + 1}, synchronize_session=False)
+    db.session.commit()
+
+    # the full copy is only dropped once the metadata points at the delta
+    os.remove(get_blob_path(blob_hash))
+    return True
+
+
+# recount references from file_version, then delete unreferenced blobs and stray files
+def collect_garbage(grace_seconds=GC_GRACE_SECONDS):
+    # waits for uploads that stored a blob but have not committed yet, and holds new ones back
+    # until the unreferenced rows are gone
+    db.session.execute(select(func.pg_advisory_xact_lock(BLOB_GC_LOCK)))
+    version_refs = db.session.query(File_version.blob_hash.label('blob_hash')).filter(File_version.blob_hash != None)
+    delta_refs = db.session.query(Blob.base_hash.label('blob_hash')).filter(Blob.base_hash != None)
+    all_refs = version_refs.union_all(delta_refs).subquery()
+    references = db.session.query(all_refs.c.blob_hash, func.count().label('refs')).\
+        group_by(all_refs.c.blob_hash).subquery()
+
+    Blob.query.update(
+        {"ref_count": func.coalesce(
+            db.session.query(references.c.refs).filter(references.c.blob_hash == Blob.blob_hash).scalar_subquery(), 0)},
+        synchronize_session=False
+    )
+
+    cutoff = func.now() - timedelta(seconds=grace_seconds)
+    unreferenced = Blob.query.filter(Blob.ref_count == 0, Blob.created_date < cutoff).all()
+    freed = 0
+    for blob in unreferenced:
+        for path in (get_blob_path(blob.blob_hash), get_delta_path(blob.blob_hash)):
+            if os.path.exists(path):
+                os.remove(path)
+        freed += blob.stored_size or blob.size or 0
+        db.session.delete(blob)
+    db.session.commit()
+
+    # files without a row (crashed uploads, leftovers in tmp/, full copies of delta blobs)
+    known = {
+        blob_hash + '.delta' if base_hash else blob_hash
+        for blob_hash, base_hash in db.session.query(Blob.blob_hash, Blob.base_hash).all()
+    }
+    now = time.time()
+    stray = 0
+    for dirpath, _, filenames in os.walk(get_blob_root()):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if name in known or now - os.path.getmtime(path) < grace_seconds:
+                continue
+            freed += os.path.getsize(path)
+            os.remove(path)
+            stray += 1
+
+    return len(unreferenced), stray, freed
+
+
+# move versions stored at their legacy path into the blob store
+def import_legacy_versions():
+    rows = db.session.query(File_version, File_data).\
+        join(File_data, File_version.file_data_id == File_data.file_data_id).\
+        filter(File_version.blob_hash == None).all()
+
+    imported = missing = 0
+    for file_version, file_data in rows:
+        path = get_legacy_path(file_data, file_version)
+        if not os.path.exists(path):
+            missing += 1
+            continue
+        # the legacy file stays until the version points at its blob
+        blob_hash, size = store_file(path, keep_source=True)
+        add_blob_reference(blob_hash, size)
+        file_version.blob_hash = blob_hash
+        db.session.commit()
+        os.remove(path)
+        imported += 1
+    return imported, missing
+
+
+# delta-encode the history of every file, oldest version first. Uploads always store full blobs and
+# never run the encoder in the request; this pass (run periodically) compacts them afterwards, and
+# skips versions whose blob is already a delta
+def compact_all_versions():
+    compacted = 0
+    versions = File_version.query.join(Blob, Blob.blob_hash == File_version.blob_hash).\
+        filter(Blob.base_hash == None).\
+        order_by(File_version.file_data_id, File_version.version_number).all()
+    for file_version in versions:
+        if compact_version(file_version):
+            compacted += 1
+    return compacted
+
+
+# CLI: flask blobs gc / import / compact (dedup estimate for an uploads tree: scripts/blobs_report.py)
+blobs_cli = AppGroup('blobs', help='Maintain the content-addressed file store.')
+
+@blobs_cli.command('gc')
+@click.option('--grace', default=GC_GRACE_SECONDS, show_default=True, help='Keep unreferenced blobs younger than this (seconds).')
+def gc_command(grace):
+    blobs, stray, freed = collect_garbage(grace)
+    click.echo(f"Removed {blobs} unreferenced blobs and {stray} stray files ({freed} bytes).")
+
+@blobs_cli.command('import')
+def import_command():
+    imported, missing = import_legacy_versions()
+    click.echo(f"Imported {imported} versions into the blob store ({missing} files missing on disk).")
+
+@blobs_cli.command('compact')
+def compact_command():
+    if not current_app.config['DELTA_STORAGE']:
+        raise click.ClickException("DELTA_STORAGE is not enabled.")
+    compacted = compact_all_versions()
+    click.echo(f"Stored {compacted} blobs as deltas.")
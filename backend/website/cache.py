@@ -0,0 +1,188 @@
+from .models import User_profile, User_Project
+from .userloader import get_user_loader, load_user_profile
+from . import db
+
+from flask import current_app
+from sqlalchemy.orm import make_transient_to_detached
+from werkzeug.utils import import_string
+
+from collections import OrderedDict
+
+import threading
+import time
+import uuid
+
+# Process-wide cache for the lookups made on nearly every request: the logged-in user's profile
+# (Flask-Login's user_loader) and the (user_id, project_id) membership behind is_user_active_member().
+# Entries expire after a TTL, and past CACHE_MAX_ENTRIES the least recently used ones are dropped.
+# Writes invalidate their keys once committed (invalidate_user / invalidate_membership).
+#
+# LocalCache lives in one worker process, so another worker only sees an invalidation once its own
+# entry expires (CACHE_MEMBERSHIP_TTL bounds how long a removed member keeps access there).
+# The members list of a project also has a revision here (members_revision), a random token that
+# is dropped whenever a membership or a member's profile changes; it backs the list's ETag.
+# CACHE_BACKEND can name a shared backend instead ("module:Class" with get/set/delete/clear, values
+# are plain lists/dicts); "none" disables caching.
+
+
+class LocalCache:
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # value, or None if missing/expired
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class NullCache:
+    def __init__(self, maxsize=None):
+        pass
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+# hit/miss counters of one kind of entry (per process)
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self):
+        return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations,
+                "hit_rate": round(self.hit_rate(), 4)}
+
+
+# the password hash is never cached; it stays unloaded on cached profiles and is read where it is checked
+USER_ATTRIBUTES = tuple(attr.key for attr in User_profile.__mapper__.column_attrs if attr.key != 'password')
+
+
+def init_cache(app):
+    name = app.config.get('CACHE_BACKEND', 'local')
+    if name == 'local':
+        backend_class = LocalCache
+    elif name in ('none', 'null', ''):
+        backend_class = NullCache
+    else:
+        backend_class = import_string(name)
+    app.extensions['cache'] = backend_class(maxsize=app.config.get('CACHE_MAX_ENTRIES', 10000))
+    app.extensions['cache_stats'] = {"user": CacheStats(), "membership": CacheStats()}
+
+
+def get_cache():
+    return current_app.extensions['cache']
+
+def cache_stats():
+    return {kind: stats.as_dict() for kind, stats in current_app.extensions['cache_stats'].items()}
+
+def _stats(kind):
+    return current_app.extensions['cache_stats'][kind]
+
+
+# User_profile for Flask-Login; a cached profile is attached to the session without a query
+def get_cached_user(user_id):
+    key = f"user:{user_id}"
+    values = get_cache().get(key)
+    if values is None:
+        _stats("user").misses += 1
+        user = load_user_profile(user_id)
+        if user is not None:
+            get_cache().set(key, {attr: getattr(user, attr) for attr in USER_ATTRIBUTES}, current_app.config['CACHE_USER_TTL'])
+        return user
+
+    _stats("user").hits += 1
+    user = User_profile(**values)
+    make_transient_to_detached(user)
+    user = db.session.merge(user, load=False)
+    get_user_loader().add(user)
+    return user
+
+
+# (role, is_removed) of a user in a project, or None if they never were a member
+def get_membership(project_id, user_id):
+    key = f"membership:{int(project_id)}:{int(user_id)}"
+    membership = get_cache().get(key)
+    if membership is not None:
+        _stats("membership").hits += 1
+        return tuple(membership)
+
+    _stats("membership").misses += 1
+    row = db.session.query(User_Project.role, User_Project.is_removed).\
+        filter_by(project_id=project_id, user_id=user_id).\
+        first()
+    if row is None:
+        return None
+    membership = (row.role, bool(row.is_removed))
+    get_cache().set(key, list(membership), current_app.config['CACHE_MEMBERSHIP_TTL'])
+    return membership
+
+
+# call after the commit that changed the row
+def invalidate_user(user_id):
+    get_cache().delete(f"user:{user_id}")
+    _stats("user").invalidations += 1
+
+def invalidate_membership(project_id, user_id):
+    get_cache().delete(f"membership:{int(project_id)}:{int(user_id)}")
+    invalidate_members_revision(project_id)
+    _stats("membership").invalidations += 1
+
+
+# revision of a project's members list (memberships and the members' profiles); a new one is made
+# when there is none, and it expires with the membership entries so other workers pick up changes
+def members_revision(project_id):
+    key = f"members_rev:{int(project_id)}"
+    revision = get_cache().get(key)
+    if revision is None:
+        revision = uuid.uuid4().hex
+        get_cache().set(key, revision, current_app.config['CACHE_MEMBERSHIP_TTL'])
+    return revision
+
+def invalidate_members_revision(project_id):
+    get_cache().delete(f"members_rev:{int(project_id)}")
+
+# a member's profile is shown in the members list of each of their projects
+def invalidate_member_profile(user_id):
+    project_ids = db.session.query(User_Project.project_id).filter_by(user_id=user_id)
+    for (project_id,) in project_ids:
+        invalidate_members_revision(project_id)
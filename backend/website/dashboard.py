@@ -0,0 +1,111 @@
+from .models import User_profile, User_Project, Project, File_data, File_version
+from .freshness import get_stale_counts
+from .serializers import DashboardProjectDTO
+from . import db
+
+from flask import current_app
+from sqlalchemy import text, func
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.orm import aliased
+
+# Dashboard (/api/mainpage) rows: one per active project of a user.
+# The get_user_projects() SQL function (migrations 2026_10_18_009/013, db-init/get_user_projects.sql)
+# builds them in one statement; build_dashboard_roles() is the ORM equivalent, used when the
+# function is not installed and as the reference for scripts/compare_dashboard.py.
+# Both take has_latest from the user_project_freshness counters (see freshness.py).
+
+
+# ORM path: dashboard rows built in a constant number of queries (reference for the SQL function)
+def build_dashboard_roles(user_id):
+    creator = aliased(User_profile)
+
+    # Memberships with their project and creator profile
+    memberships = db.session.query(User_Project.role, Project, creator).\
+        join(Project, Project.project_id == User_Project.project_id).\
+        outerjoin(creator, creator.user_id == Project.creator_id).\
+        filter(User_Project.user_id == user_id, User_Project.is_removed == False).\
+        all()
+
+    if not memberships:
+        return []
+
+    # Latest versions in the user's active projects only
+    latest_versions = db.session.query(
+        File_data.project_id.label('project_id'),
+        File_version.version_id.label('version_id'),
+        File_version.user_id.label('user_id'),
+        File_version.upload_date.label('upload_date'),
+    ).join(File_data, File_version.file_data_id == File_data.file_data_id).\
+        join(User_Project, (User_Project.project_id == File_data.project_id) &
+             (User_Project.user_id == user_id) & (User_Project.is_removed == False)).\
+        filter(File_version.last_version == True).\
+        subquery()
+
+    # Most recent upload per project (window function) with the uploader's name
+    ranked = db.session.query(
+        latest_versions.c.project_id,
+        latest_versions.c.upload_date,
+        User_profile.full_name.label('uploader_name'),
+        func.row_number().over(
+            partition_by=latest_versions.c.project_id,
+            order_by=(latest_versions.c.upload_date.desc().nulls_last(), latest_versions.c.version_id.desc())
+        ).label('rn')
+    ).outerjoin(User_profile, User_profile.user_id == latest_versions.c.user_id).\
+        subquery()
+
+    last_modified = {
+        row.project_id: row
+        for row in db.session.query(ranked.c.project_id, ranked.c.upload_date, ranked.c.uploader_name).
+        filter(ranked.c.rn == 1).all()
+    }
+
+    # Number of latest versions per project the user neither uploaded nor downloaded (user_project_freshness)
+    stale_counts = get_stale_counts(user_id, [project.project_id for _, project, _ in memberships])
+
+    roles_list = []
+    for role, project, creator_profile in memberships:
+        created_dt = project.created_date
+        last_modified_dt = created_dt
+        last_modified_by = "Unknown"
+
+        latest = last_modified.get(project.project_id)
+        if latest and latest.upload_date and (created_dt is None or latest.upload_date > created_dt):
+            last_modified_dt = latest.upload_date
+            last_modified_by = latest.uploader_name or "Unknown"
+
+        roles_list.append({
+            "project_id": project.project_id,
+            "project_name": project.name or "",
+            "role": role.value if hasattr(role, "value") else role,
+            "created_date": created_dt,
+            "creator_name": creator_profile.full_name if creator_profile else "Unknown",
+            "creator_profile_picture": creator_profile.profile_pic if creator_profile and creator_profile.profile_pic else "default.png",
+            "has_latest": stale_counts.get(project.project_id, 0) == 0,
+            "description": project.description or "",
+            "last_modified_by": last_modified_by,
+            "last_modified_date": last_modified_dt,
+            "nickname": creator_profile.nickname if creator_profile else None,
+            "nickname_id": creator_profile.nickname_id if creator_profile else None,
+        })
+
+    # Sort: has_latest first, then last_modified_date DESC (stable sort)
+    roles_list.sort(key=lambda r: (r["last_modified_date"] is not None, r["last_modified_date"] or 0), reverse=True)
+    roles_list.sort(key=lambda r: (0 if r["has_latest"] else 1))
+
+    return [DashboardProjectDTO(**r) for r in roles_list]
+
+
+# SQL path: one call of get_user_projects()
+def fetch_dashboard_roles(user_id):
+    rows = db.session.execute(text("SELECT * FROM get_user_projects(:user_id)"), {"user_id": user_id}).all()
+    return [DashboardProjectDTO.from_row(row) for row in rows]
+
+
+def get_dashboard_roles(user_id):
+    try:
+        return fetch_dashboard_roles(user_id)
+    except ProgrammingError:
+        # database created by db.create_all() without running the migrations
+        db.session.rollback()
+        current_app.logger.warning("get_user_projects() is missing, run `flask db upgrade`; using the ORM dashboard query.")
+        return build_dashboard_roles(user_id)
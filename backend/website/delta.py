@@ -0,0 +1,111 @@
+import hashlib
+import random
+import struct
+
+# Binary deltas between two versions of a file.
+# Both contents are cut into content-defined chunks (gear rolling hash), so an insertion only shifts
+# the chunks around it. Target chunks that also exist in the base become COPY ops, everything else
+# is stored literally in INSERT ops; adjacent COPY ops are merged.
+#
+# Format: MAGIC, then ops:
+#   b'C' + offset (8 bytes) + length (4 bytes)   copy from the base
+#   b'I' + length (4 bytes) + data               literal bytes
+
+MAGIC = b'SDELTA1\n'
+MIN_CHUNK = 512
+AVG_MASK = (1 << 11) - 1  # ~2 KiB average chunk
+MAX_CHUNK = 16 * 1024
+COPY_BLOCK = 1024 * 1024
+_GEAR = [random.Random(i).getrandbits(64) for i in range(256)]
+_MASK64 = (1 << 64) - 1
+
+
+def chunk_spans(data):
+    spans = []
+    start = 0
+    length = len(data)
+    gear = _GEAR
+    while start < length:
+        end = min(start + MAX_CHUNK, length)
+        cut = end
+        h = 0
+        # the gear hash only depends on the last 64 bytes, so start hashing just before MIN_CHUNK
+        for i in range(max(start, start + MIN_CHUNK - 64), end):
+            h = ((h << 1) + gear[data[i]]) & _MASK64
+            if i - start >= MIN_CHUNK and not (h >> 40) & AVG_MASK:
+                cut = i + 1
+                break
+        spans.append((start, cut))
+        start = cut
+    return spans
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def encode_delta(base, target):
+    index = {}
+    for start, end in chunk_spans(base):
+        index.setdefault(_digest(base[start:end]), start)
+
+    out = [MAGIC]
+    copy_offset = copy_length = 0
+    literal = []
+
+    def flush_copy():
+        if copy_length:
+            out.append(b'C' + struct.pack('>QI', copy_offset, copy_length))
+
+    def flush_literal():
+        if literal:
+            data = b''.join(literal)
+            out.append(b'I' + struct.pack('>I', len(data)) + data)
+            literal.clear()
+
+    for start, end in chunk_spans(target):
+        chunk = target[start:end]
+        offset = index.get(_digest(chunk))
+        if offset is not None and base[offset:offset + len(chunk)] == chunk:
+            flush_literal()
+            if copy_length and copy_offset + copy_length == offset:
+                copy_length += len(chunk)
+            else:
+                flush_copy()
+                copy_offset, copy_length = offset, len(chunk)
+        else:
+            flush_copy()
+            copy_length = 0
+            literal.append(chunk)
+    flush_copy()
+    flush_literal()
+    return b''.join(out)
+
+
+def _copy(source, target, length):
+    while length:
+        block = source.read(min(length, COPY_BLOCK))
+        if not block:
+            raise ValueError("Truncated delta or base file")
+        target.write(block)
+        length -= len(block)
+
+
+# base_file must be seekable; the result is written to out_file
+def apply_delta(base_file, delta_file, out_file):
+    if delta_file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a delta file")
+
+    while True:
+        op = delta_file.read(1)
+        if not op:
+            break
+        if op == b'C':
+            offset, length = struct.unpack('>QI', delta_file.read(12))
+            base_file.seek(offset)
+            _copy(base_file, out_file, length)
+        elif op == b'I':
+            (length,) = struct.unpack('>I', delta_file.read(4))
+            _copy(delta_file, out_file, length)
+        else:
+            raise ValueError("Corrupt delta file")
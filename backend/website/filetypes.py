@@ -0,0 +1,137 @@
+from flask import current_app
+
+import os
+import threading
+
+# Upload policy: which extensions may be uploaded and what their content has to look like.
+# allowed_extensions.txt is parsed once and only re-read when its mtime changes, so checking a
+# filename is a set lookup. A project can extend or narrow the global list (Project.allowed_extensions),
+# and the first bytes of the upload are compared against the known signature of the extension.
+
+DEFAULT_EXTENSIONS = frozenset({'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'zip', 'rar', 'tar', 'gz', '7z', 'docx', 'xlsx', 'pptx'})
+
+# how many leading bytes are needed to sniff any of the signatures below
+SNIFF_SIZE = 512
+
+# (offset, magic bytes) pairs; a file matches if any of them is found
+_ZIP = ((0, b'PK\x03\x04'), (0, b'PK\x05\x06'))
+SIGNATURES = {
+    'pdf': ((0, b'%PDF-'),),
+    'png': ((0, b'\x89PNG\r\n\x1a\n'),),
+    'jpg': ((0, b'\xff\xd8\xff'),),
+    'jpeg': ((0, b'\xff\xd8\xff'),),
+    'gif': ((0, b'GIF87a'), (0, b'GIF89a')),
+    'zip': _ZIP,
+    'docx': _ZIP,
+    'xlsx': _ZIP,
+    'pptx': _ZIP,
+    'rar': ((0, b'Rar!\x1a\x07'),),
+    '7z': ((0, b"7z\xbc\xaf'\x1c"),),
+    'gz': ((0, b'\x1f\x8b'),),
+    'tar': ((257, b'ustar'),),
+}
+
+# plain text formats: no signature, but NUL bytes mean a binary file with a text extension
+TEXT_EXTENSIONS = {'txt', 'py', 'csv', 'md', 'json', 'xml', 'html', 'css', 'js'}
+_TEXT_BOMS = (b'\xff\xfe', b'\xfe\xff')
+
+_lock = threading.Lock()
+_cache = {"path": None, "mtime": None, "extensions": DEFAULT_EXTENSIONS}
+_overrides = {}
+
+
+def get_extension(filename):
+    if not filename or '.' not in filename:
+        return None
+    return filename.rsplit('.', 1)[1].lower()
+
+
+def load_allowed_extensions(filepath=None):
+    if filepath is None:
+        filepath = os.path.join(current_app.static_folder, 'allowed_extensions.txt')
+
+    try:
+        mtime = os.stat(filepath).st_mtime_ns
+    except OSError:
+        mtime = None
+
+    if _cache["path"] == filepath and _cache["mtime"] == mtime:
+        return _cache["extensions"]
+
+    with _lock:
+        if _cache["path"] == filepath and _cache["mtime"] == mtime:
+            return _cache["extensions"]
+
+        if mtime is None:
+            print(f"[ERROR] {filepath} not found. Using default set.")
+            extensions = DEFAULT_EXTENSIONS
+        else:
+            with open(filepath, "r", encoding="utf-8") as f:
+                extensions = frozenset(line.strip().lower().lstrip('.') for line in f if line.strip())
+
+        _cache.update(path=filepath, mtime=mtime, extensions=extensions)
+        return extensions
+
+
+# "dwg, step -zip" -> (added, removed); parsed once per distinct override string
+def parse_extension_override(raw):
+    if not raw:
+        return frozenset(), frozenset()
+
+    parsed = _overrides.get(raw)
+    if parsed is None:
+        added, removed = set(), set()
+        for token in raw.replace(',', ' ').split():
+            token = token.lower()
+            if token.startswith('-'):
+                removed.add(token[1:].lstrip('.'))
+            else:
+                added.add(token.lstrip('+.'))
+        parsed = (frozenset(added - {''}), frozenset(removed - {''}))
+        if len(_overrides) > 1024:
+            _overrides.clear()
+        _overrides[raw] = parsed
+    return parsed
+
+
+# normalized form stored on the project (None when empty)
+def normalize_extension_override(raw):
+    added, removed = parse_extension_override(raw or '')
+    tokens = sorted(added) + sorted('-' + ext for ext in removed)
+    return ' '.join(tokens) or None
+
+
+def is_extension_allowed(ext, project=None):
+    if not ext:
+        return False
+    if project is not None and project.allowed_extensions:
+        added, removed = parse_extension_override(project.allowed_extensions)
+        if ext in removed:
+            return False
+        if ext in added:
+            return True
+    return ext in load_allowed_extensions()
+
+
+def allowed_file(filename, project=None):
+    return is_extension_allowed(get_extension(filename), project)
+
+
+# sorted list of the effective extensions of a project (for the settings endpoint)
+def effective_extensions(project=None):
+    extensions = set(load_allowed_extensions())
+    if project is not None and project.allowed_extensions:
+        added, removed = parse_extension_override(project.allowed_extensions)
+        extensions = (extensions | added) - removed
+    return sorted(extensions)
+
+
+# head: the first bytes of the file (at least SNIFF_SIZE unless the file is shorter)
+def content_matches_extension(filename, head):
+    ext = get_extension(filename)
+    signatures = SIGNATURES.get(ext)
+    if signatures:
+        return any(head[offset:offset + len(magic)] == magic for offset, magic in signatures)
+    if ext in TEXT_EXTENSIONS:
+        return head.startswith(_TEXT_BOMS) or b'\x00' not in head
+    return True
@@ -0,0 +1,180 @@
+from .models import User_Project, Project, File_data, File_version, Last_download, User_project_freshness
+from . import db
+
+from flask.cli import AppGroup
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.postgresql import insert
+
+import click
+
+# Keeps user_project_freshness.stale_files in sync with what the dashboard would compute on the fly:
+# a latest version is "stale" for a member if they neither uploaded nor downloaded it.
+# Rows are created with the membership and adjusted incrementally inside the upload/download
+# transactions; `flask freshness rebuild` recomputes the whole table. A membership without a row
+# (database not backfilled) is computed on the fly by the readers.
+
+
+# on-the-fly computation (source of truth for rebuilds and consistency checks)
+def stale_files_query(user_id=None, project_ids=None):
+    downloaded = db.session.query(Last_download.last_download_id).filter(
+        Last_download.user_id == User_Project.user_id,
+        Last_download.file_data_id == File_version.file_data_id,
+        Last_download.version_id == File_version.version_id
+    ).exists()
+
+    stale = or_(File_version.user_id == None, File_version.user_id != User_Project.user_id) & ~downloaded
+
+    query = db.session.query(
+        User_Project.user_id,
+        User_Project.project_id,
+        func.count(File_version.version_id).filter(stale).label('stale_files')
+    ).outerjoin(File_data, File_data.project_id == User_Project.project_id).\
+        outerjoin(File_version, (File_version.file_data_id == File_data.file_data_id) & (File_version.last_version == True)).\
+        group_by(User_Project.user_id, User_Project.project_id)
+
+    if user_id is not None:
+        query = query.filter(User_Project.user_id == user_id)
+    if project_ids is not None:
+        query = query.filter(User_Project.project_id.in_(project_ids))
+    return query
+
+
+# stale counts of a user for the given projects; missing rows are computed, not stored (read-only)
+def get_stale_counts(user_id, project_ids):
+    counts = dict(
+        db.session.query(User_project_freshness.project_id, User_project_freshness.stale_files).
+        filter(User_project_freshness.user_id == user_id, User_project_freshness.project_id.in_(project_ids)).
+        all()
+    )
+
+    missing = [project_id for project_id in project_ids if project_id not in counts]
+    if missing:
+        counts.update({r.project_id: r.stale_files for r in stale_files_query(user_id=user_id, project_ids=missing)})
+
+    return counts
+
+
+# a user joined (or rejoined) a project: store their counter row with the membership, which must be
+# flushed already. stale_files=0 is for the owner of a new project; otherwise it is computed.
+def record_membership(user_id, project_id, stale_files=None):
+    if stale_files is None:
+        # the count must not miss an upload that commits meanwhile: the project row lock waits for and
+        # blocks new files (their insert key-shares it), the shared file_data locks do the same for new
+        # versions (next_version_number() updates the row), until this transaction commits
+        db.session.query(Project.project_id).filter(Project.project_id == project_id).with_for_update().all()
+        db.session.query(File_data.file_data_id).\
+            filter(File_data.project_id == project_id).\
+            order_by(File_data.file_data_id).\
+            with_for_update(read=True).\
+            all()
+        stale_files = stale_files_query(user_id=user_id, project_ids=[project_id]).one().stale_files
+
+    statement = insert(User_project_freshness).values(user_id=user_id, project_id=project_id, stale_files=stale_files)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['user_id', 'project_id'],
+        set_={"stale_files": statement.excluded.stale_files}
+    ))
+
+
+# a new version of a file was added; previous_version is the latest version before the upload (or None)
+def record_upload(project_id, uploader_id, previous_version):
+    # every other member goes from fresh to stale unless the previous latest was already stale for them
+    was_fresh = User_project_freshness.user_id != uploader_id
+    if previous_version is not None:
+        downloaded_previous = db.session.query(Last_download.user_id).filter(
+            Last_download.version_id == previous_version.version_id,
+            Last_download.file_data_id == previous_version.file_data_id
+        )
+        was_fresh = was_fresh & or_(
+            User_project_freshness.user_id == previous_version.user_id,
+            User_project_freshness.user_id.in_(downloaded_previous)
+        )
+
+    User_project_freshness.query.filter(
+        User_project_freshness.project_id == project_id,
+        was_fresh
+    ).update({"stale_files": User_project_freshness.stale_files + 1}, synchronize_session=False)
+
+    # the uploader is up to date with their own version
+    if previous_version is not None and previous_version.user_id != uploader_id:
+        previous_downloaded = Last_download.query.filter_by(
+            user_id=uploader_id,
+            file_data_id=previous_version.file_data_id,
+            version_id=previous_version.version_id
+        ).first() is not None
+
+        if not previous_downloaded:
+            User_project_freshness.query.filter(
+                User_project_freshness.project_id == project_id,
+                User_project_freshness.user_id == uploader_id,
+                User_project_freshness.stale_files > 0
+            ).update({"stale_files": User_project_freshness.stale_files - 1}, synchronize_session=False)
+
+
+# a user downloaded versions for the first time; downloads is a list of (project_id, version)
+def record_downloads(user_id, downloads):
+    if not downloads:
+        return
+    version_projects = {version.version_id: project_id for project_id, version in downloads}
+
+    # lock the files (shared) against next_version_number(): an upload of the same file waits for this
+    # transaction, so whether a version is still the latest one cannot change before the commit
+    file_data_ids = sorted({version.file_data_id for _, version in downloads})
+    db.session.query(File_data.file_data_id).\
+        filter(File_data.file_data_id.in_(file_data_ids)).\
+        order_by(File_data.file_data_id).\
+        with_for_update(read=True).\
+        all()
+
+    latest = db.session.query(File_version.version_id).filter(
+        File_version.version_id.in_(list(version_projects)),
+        File_version.last_version == True,
+        or_(File_version.user_id == None, File_version.user_id != user_id)
+    )
+    became_fresh = {}
+    for (version_id,) in latest:
+        project_id = version_projects[version_id]
+        became_fresh[project_id] = became_fresh.get(project_id, 0) + 1
+
+    for project_id, count in became_fresh.items():
+        User_project_freshness.query.filter(
+            User_project_freshness.project_id == project_id,
+            User_project_freshness.user_id == user_id
+        ).update({"stale_files": func.greatest(User_project_freshness.stale_files - count, 0)}, synchronize_session=False)
+
+
+# recompute the whole table from scratch
+def rebuild_freshness():
+    User_project_freshness.query.delete(synchronize_session=False)
+    computed = stale_files_query().subquery()
+    db.session.execute(
+        insert(User_project_freshness).from_select(
+            ['user_id', 'project_id', 'stale_files'],
+            db.session.query(computed.c.user_id, computed.c.project_id, computed.c.stale_files)
+        )
+    )
+    db.session.commit()
+    return User_project_freshness.query.count()
+
+
+# rows whose stored count differs from the on-the-fly computation
+def find_freshness_mismatches():
+    stored = {
+        (r.user_id, r.project_id): r.stale_files
+        for r in User_project_freshness.query.all()
+    }
+    mismatches = []
+    for row in stale_files_query().all():
+        key = (row.user_id, row.project_id)
+        if key in stored and stored[key] != row.stale_files:
+            mismatches.append((row.user_id, row.project_id, stored[key], row.stale_files))
+    return mismatches
+
+
+# CLI: flask freshness rebuild (consistency check: scripts/check_freshness.py)
+freshness_cli = AppGroup('freshness', help='Maintain the user_project_freshness table.')
+
+@freshness_cli.command('rebuild')
+def rebuild_command():
+    rows = rebuild_freshness()
+    click.echo(f"Rebuilt user_project_freshness ({rows} rows).")
@@ -0,0 +1,88 @@
+from .models import User_profile, User_Project, Invitation
+from . import db
+
+from sqlalchemy import insert, or_
+
+# Invitations reach a user by id (invited_user_id) or, when the address had no account yet, by email only.
+# The listing reads both as separate index-friendly branches; to keep the email branch small, email-only
+# invitations are claimed (invited_user_id filled in) as soon as an account owns the address:
+# at sign-up and when a user changes their email.
+
+INVITATION_STATUSES = set(Invitation.__table__.c.status.type.enums)
+
+# per-email results of invite_emails(); the first two mean an invitation was created
+INVITE_MESSAGES = {
+    'invited': "Invitation sent successfully",
+    're-invited': "User re-invited successfully. They need to accept the invitation.",
+    'member': "User is already a member of this project",
+    'no_account': "No user with this email",
+    'duplicate': "Email listed more than once",
+}
+SENT_STATUSES = {'invited', 're-invited'}
+
+
+# give the email-only invitations sent to `email` to user_id; returns the number of claimed invitations
+# (only pending ones can be email-only: answering an invitation takes an account, which claims it first)
+def claim_email_invitations(user_id, email):
+    if not email:
+        return 0
+    return Invitation.query.filter(
+        Invitation.invited_email == email,
+        Invitation.invited_user_id == None,
+        Invitation.status == 'pending'
+    ).update({"invited_user_id": user_id}, synchronize_session=False)
+
+
+# split a pasted list ("a@x.com, b@x.com\nc@x.com") into addresses
+def split_emails(raw):
+    return [email.strip() for email in raw.replace("\n", ",").replace(";", ",").split(",") if email.strip()]
+
+
+# Invite a list of emails to a project in a constant number of statements, whatever the list size:
+# accounts and their memberships are resolved with one IN query each, pending invitations of the
+# invited addresses are superseded with one DELETE and the new invitations are inserted together.
+# Active members are skipped; addresses without an account get an email-only invitation when
+# invite_unknown is set. Returns [{"email", "status"}] in input order; the caller commits.
+def invite_emails(project_id, referrer_id, emails, invite_unknown=False):
+    unique_emails = list(dict.fromkeys(emails))
+
+    users = dict(db.session.query(User_profile.email, User_profile.user_id).
+                 filter(User_profile.email.in_(unique_emails)))
+    memberships = dict(db.session.query(User_Project.user_id, User_Project.is_removed).
+                       filter(User_Project.project_id == project_id,
+                              User_Project.user_id.in_(list(users.values()))))
+
+    statuses = {}
+    for email in unique_emails:
+        user_id = users.get(email)
+        if user_id is None:
+            statuses[email] = 'invited' if invite_unknown else 'no_account'
+        elif user_id not in memberships:
+            statuses[email] = 'invited'
+        elif memberships[user_id]:
+            statuses[email] = 're-invited'
+        else:
+            statuses[email] = 'member'
+
+    invited = [email for email in unique_emails if statuses[email] in SENT_STATUSES]
+    if invited:
+        invited_user_ids = [users[email] for email in invited if email in users]
+        # the new invitation replaces whatever was still pending for the same person
+        Invitation.query.filter(
+            Invitation.project_id == project_id,
+            Invitation.status == 'pending',
+            or_(Invitation.invited_email.in_(invited), Invitation.invited_user_id.in_(invited_user_ids))
+        ).delete(synchronize_session=False)
+        db.session.execute(insert(Invitation), [{
+            "invited_email": email,
+            "invited_user_id": users.get(email),
+            "referrer_id": referrer_id,
+            "project_id": project_id,
+            "status": 'pending',
+        } for email in invited])
+
+    results, seen = [], set()
+    for email in emails:
+        results.append({"email": email, "status": 'duplicate' if email in seen else statuses[email]})
+        seen.add(email)
+    return results
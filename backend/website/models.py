@@ -19,6 +19,11 @@ class User_profile (db.Model, UserMixin):
 
     user_activity_status = db.Column(db.Boolean, default=True)
 
+    # nickname#nickname_id identifies a user (allocated in nicknames.py)
+    __table_args__ = (
+        db.Index('uq_user_profile_nickname_id', nickname, nickname_id, unique=True),
+    )
+
     # Define the relationship to the Project model
     projects = db.relationship('Project', secondary='user_project', backref='users')
     invitations = db.relationship('Invitation', foreign_keys='Invitation.invited_user_id', backref='invitee', lazy=True)
@@ -33,6 +38,8 @@ class Project(db.Model):
     description = db.Column(db.Text)
     created_date = db.Column(db.DateTime(timezone=True), default=func.now())
     project_activity_status = db.Column(db.Boolean, default=True)
+    # per-project change to allowed_extensions.txt, e.g. "dwg step -zip" (NULL = global list)
+    allowed_extensions = db.Column(db.Text, nullable=True)
     
     creator_id = db.Column(db.Integer, db.ForeignKey('user_profile.user_id'))
 
@@ -48,6 +55,11 @@ class User_Project(db.Model):
 
     is_removed = db.Column(db.Boolean, default=False)  # New field to track if the user was removed
 
+    # active members of a project (the primary key already covers lookups by user)
+    __table_args__ = (
+        db.Index('ix_user_project_active_project', project_id, user_id, postgresql_where=db.not_(is_removed)),
+    )
+
 # invitation table
 class Invitation(db.Model):
     invitation_id = db.Column(db.Integer, primary_key=True)
@@ -62,32 +74,74 @@ class Invitation(db.Model):
     project = db.relationship('Project', backref='invitations')
     referrer = db.relationship('User_profile', foreign_keys=[referrer_id], backref='sent_invitations')
 
+    # invitations per project when re-inviting
+    __table_args__ = (
+        db.Index('ix_invitation_project_email', project_id, invited_email),
+        # pending invitations of a user, per project (the default invitations listing; index-only)
+        db.Index('ix_invitation_pending_user', invited_user_id, project_id, invitation_id,
+                 postgresql_where=(status == 'pending')),
+        db.Index('ix_invitation_pending_email', invited_email, project_id, invitation_id,
+                 postgresql_where=db.and_(status == 'pending', invited_user_id == None)),
+    )
+
 # file_data table
 class File_data(db.Model):
     file_data_id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100))
     description = db.Column(db.Text)    
+    version_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # last version_number handed out (versioning.py)
 
     project_id = db.Column(db.Integer, db.ForeignKey('project.project_id'))
 
+    __table_args__ = (
+        db.Index('ix_file_data_project_id', 'project_id', 'file_data_id'),
+    )
+
 # file_data table
 class File_version(db.Model):
     version_id = db.Column(db.Integer, primary_key=True)
     version_number = db.Column(db.Integer)
     file_name = db.Column(db.String(255))
     file_type = db.Column(db.String(100))
-    file_size = db.Column(db.Integer)
+    file_size = db.Column(db.BigInteger)
     last_version = db.Column(db.Boolean, default=False)
     comment = db.Column(db.String(100))
     upload_date = db.Column(db.DateTime(timezone=True), default=text("CURRENT_TIMESTAMP(0)"))
 
     file_data_id = db.Column(db.Integer, db.ForeignKey('file_data.file_data_id'))
     user_id = db.Column(db.Integer, db.ForeignKey('user_profile.user_id'))
+    blob_hash = db.Column(db.String(64), db.ForeignKey('blob.blob_hash'), nullable=True, index=True)  # NULL: stored at the legacy per-version path
 
     file_data = db.relationship('File_data', backref='versions')
 
+    # latest versions of an uploader (project file list ?uploader= filter)
+    __table_args__ = (
+        db.Index('ix_file_version_latest_uploader', user_id, upload_date, postgresql_where=last_version),
+        # latest version of a file (at most one), and versions of a file by number
+        db.Index('ix_file_version_latest', file_data_id, unique=True, postgresql_where=last_version),
+        db.Index('ix_file_version_file_data_number', file_data_id, version_number),
+    )
+
+# content-addressed file content (sha256), shared by every version with identical bytes
+class Blob(db.Model):
+    blob_hash = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger)
+    ref_count = db.Column(db.Integer, default=0, nullable=False)
+    created_date = db.Column(db.DateTime(timezone=True), default=text("CURRENT_TIMESTAMP(0)"))
+
+    # delta storage: when base_hash is set the blob is stored as a binary delta against that blob
+    base_hash = db.Column(db.String(64), db.ForeignKey('blob.blob_hash'), nullable=True)
+    delta_depth = db.Column(db.Integer, default=0, nullable=False)  # deltas to apply to rebuild the content
+    stored_size = db.Column(db.BigInteger)  # bytes on disk (size of the delta for delta blobs)
+
 # file_download table
 class Last_download(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'version_id', name='uq_last_download_user_version'),
+        db.Index('ix_last_download_user_file', 'user_id', 'file_data_id', 'version_id'),
+        db.Index('ix_last_download_version', 'version_id', 'user_id'),
+    )
+
     last_download_id = db.Column(db.Integer, primary_key=True)
     version_id = db.Column(db.Integer, db.ForeignKey('file_version.version_id')) 
     download_date = db.Column(db.DateTime(timezone=True), default=text("CURRENT_TIMESTAMP(0)"))
@@ -95,3 +149,26 @@ class Last_download(db.Model):
     file_data_id = db.Column(db.Integer, db.ForeignKey('file_data.file_data_id'))
     user_id = db.Column(db.Integer, db.ForeignKey('user_profile.user_id'))
 
+
+# number of latest file versions per (user, project) the user has not uploaded or downloaded yet
+class User_project_freshness(db.Model):
+    __tablename__ = 'user_project_freshness'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user_profile.user_id'), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.project_id'), primary_key=True)
+    stale_files = db.Column(db.Integer, default=0, nullable=False)
+
+# resumable upload in progress (chunks are appended to a part file until finalize)
+class Upload_session(db.Model):
+    upload_id = db.Column(db.String(32), primary_key=True)
+    file_name = db.Column(db.String(255))
+    file_type = db.Column(db.String(100))
+    file_size = db.Column(db.BigInteger)
+    received_size = db.Column(db.BigInteger, default=0)
+    comment = db.Column(db.String(100))
+    status = db.Column(db.Enum('active', 'completed', name='upload_status_enum'), default='active')
+    created_date = db.Column(db.DateTime(timezone=True), default=text("CURRENT_TIMESTAMP(0)"))
+    updated_date = db.Column(db.DateTime(timezone=True), default=text("CURRENT_TIMESTAMP(0)"))
+
+    file_data_id = db.Column(db.Integer, db.ForeignKey('file_data.file_data_id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user_profile.user_id'))
@@ -0,0 +1,64 @@
+from .models import User_profile
+from . import db
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+import random
+
+# nickname_id allocation ("nick#1234").
+# (nickname, nickname_id) is unique in the database (uq_user_profile_nickname_id), so allocation just
+# tries a random id and lets the index decide: the row is flushed inside a savepoint and a conflict
+# (taken id, or a concurrent signup that got it first) rolls back the savepoint and tries another id.
+# While a nickname is sparse the first probe almost always succeeds. After RANDOM_PROBES conflicts
+# the nickname counts as crowded and the next id is drawn from its free ids, computed by the database.
+
+MAX_NICKNAME_ID = 9999
+RANDOM_PROBES = 4
+# total attempts, the ones after RANDOM_PROBES use the free-id pool
+MAX_ATTEMPTS = 12
+UNIQUE_INDEX = 'uq_user_profile_nickname_id'
+
+
+class NicknameIdsExhausted(Exception):
+    pass
+
+
+# a random free id of a nickname, None when all are taken
+def free_nickname_id(nickname):
+    return db.session.execute(text("""
+        SELECT g FROM generate_series(1, :max_id) g
+        WHERE NOT EXISTS (SELECT 1 FROM user_profile u WHERE u.nickname = :nickname AND u.nickname_id = g)
+        ORDER BY random()
+        LIMIT 1
+    """), {"nickname": nickname, "max_id": MAX_NICKNAME_ID}).scalar()
+
+
+def _is_nickname_conflict(error):
+    diag = getattr(error.orig, 'diag', None)
+    return diag is not None and diag.constraint_name == UNIQUE_INDEX
+
+
+# set user.nickname with a free nickname_id and flush the user (new or existing); the caller commits
+def assign_nickname(user, nickname):
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt < RANDOM_PROBES:
+            nickname_id = random.randint(1, MAX_NICKNAME_ID)
+        else:
+            nickname_id = free_nickname_id(nickname)
+            if nickname_id is None:
+                raise NicknameIdsExhausted(nickname)
+
+        try:
+            # set inside the savepoint: begin_nested() flushes pending changes before it starts
+            with db.session.begin_nested():
+                user.nickname = nickname
+                user.nickname_id = nickname_id
+                db.session.add(user)
+        except IntegrityError as e:
+            if not _is_nickname_conflict(e):
+                raise
+            continue
+        return nickname_id
+
+    raise NicknameIdsExhausted(nickname)
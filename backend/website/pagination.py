@@ -0,0 +1,60 @@
+from sqlalchemy import tuple_
+
+from datetime import datetime
+
+import base64
+import json
+
+# Keyset (cursor) pagination helpers.
+# A cursor is the sort key of the last row of a page, opaque to the client (urlsafe base64 JSON).
+# The next page continues strictly after that key, so pages stay stable while rows are added
+# and the database never has to skip over OFFSET rows.
+
+MAX_PAGE_SIZE = 500
+
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _load(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values, tag=None):
+    payload = {"k": [_dump(v) for v in values]}
+    if tag:
+        payload["t"] = tag
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+# values of the cursor, or None if it is malformed or was issued for another sort (tag)
+def decode_cursor(raw, tag=None, length=None):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(raw + '=' * (-len(raw) % 4)))
+        values = [_load(v) for v in payload["k"]]
+    except (ValueError, TypeError, KeyError):
+        return None
+    if payload.get("t") != tag or (length is not None and len(values) != length):
+        return None
+    return values
+
+
+# rows strictly after the cursor; all columns are sorted in the same direction
+def keyset_filter(columns, values, descending=False):
+    if descending:
+        return tuple_(*columns) < tuple_(*values)
+    return tuple_(*columns) > tuple_(*values)
+
+
+# page size from the request: None means "no limit" (old clients), otherwise clamped to MAX_PAGE_SIZE
+def parse_limit(raw, maximum=MAX_PAGE_SIZE):
+    if raw is None or raw == '':
+        return None
+    if not str(raw).isdigit() or int(raw) < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(int(raw), maximum)
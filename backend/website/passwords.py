@@ -0,0 +1,70 @@
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from concurrent.futures import ProcessPoolExecutor
+
+import multiprocessing
+import threading
+
+# Password hashing off the request threads.
+# pbkdf2 hashes are CPU-bound; they run in a per-worker process pool of PASSWORD_HASH_WORKERS
+# processes (0 = inline). At most PASSWORD_HASH_QUEUE hashes may be queued or running per worker;
+# a request that cannot get a slot within PASSWORD_HASH_TIMEOUT seconds gets HashingBusy (503)
+# instead of piling up behind a login storm.
+# The cost is PASSWORD_HASH_ITERATIONS; a successful login with a hash of a different cost
+# re-hashes the password (needs_rehash). Only pbkdf2 is used: scrypt hashes do not fit
+# User_profile.password (150 characters).
+
+HASH_ALGORITHM = 'pbkdf2:sha256'
+
+
+class HashingBusy(Exception):
+    pass
+
+
+_lock = threading.Lock()
+_pool = {"executor": None, "slots": None, "workers": None}
+
+
+def _executor():
+    workers = current_app.config['PASSWORD_HASH_WORKERS']
+    with _lock:
+        if _pool["workers"] != workers:
+            if _pool["executor"] is not None:
+                _pool["executor"].shutdown(wait=False)
+            # created lazily inside each gunicorn worker; spawn, as forking a threaded process is unsafe
+            _pool["executor"] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) if workers else None
+            _pool["slots"] = threading.BoundedSemaphore(current_app.config['PASSWORD_HASH_QUEUE'])
+            _pool["workers"] = workers
+        return _pool["executor"], _pool["slots"]
+
+
+def _run(fn, *args):
+    executor, slots = _executor()
+    if executor is None:
+        return fn(*args)
+    if not slots.acquire(timeout=current_app.config['PASSWORD_HASH_TIMEOUT']):
+        raise HashingBusy("password hashing queue is full")
+    try:
+        return executor.submit(fn, *args).result()
+    finally:
+        slots.release()
+
+
+def hash_method():
+    return f"{HASH_ALGORITHM}:{current_app.config['PASSWORD_HASH_ITERATIONS']}"
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, hash_method())
+
+
+def verify_password(pwhash, password):
+    if not pwhash or not password:
+        return False
+    return _run(check_password_hash, pwhash, password)
+
+
+# True if the stored hash was made with other parameters than the configured ones
+def needs_rehash(pwhash):
+    return pwhash.split('$', 1)[0] != hash_method()
@@ -0,0 +1,108 @@
+from flask import current_app
+from werkzeug.utils import import_string
+from requests.adapters import HTTPAdapter
+
+import os
+import requests
+import threading
+import time
+
+# reCAPTCHA verification for sign-up.
+# The verifier is created once per app and keeps a pooled keep-alive session to Google, so a
+# signup costs one round trip on an open connection, bounded by RECAPTCHA_TIMEOUT. After
+# RECAPTCHA_BREAKER_THRESHOLD failed calls in a row the circuit opens: for RECAPTCHA_BREAKER_COOLDOWN
+# seconds signups are refused at once (503) instead of each one waiting for the timeout.
+# RECAPTCHA_VERIFIER picks the implementation: "google" (default), "local" (stand-in for tests and
+# development, optionally slowed down by RECAPTCHA_LOCAL_DELAY) or "module:Class".
+
+VERIFY_URL = "https://www.google.com/recaptcha/api/siteverify"
+# fallback for local testing (not recommended long term)
+FALLBACK_SECRET = "6LeKEvEqAAAAACB2kZN3_QckJOu_nYtxpHuRWz2O"
+
+
+# verification could not be done (network error, timeout, circuit open)
+class RecaptchaUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=5, cooldown=30):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    # False while open; after the cooldown one call is let through to probe the service
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+class GoogleVerifier:
+    def __init__(self, config):
+        self.secret = os.getenv('RECAPTCHA_PRIVATE_KEY') or FALLBACK_SECRET
+        self.timeout = config.get('RECAPTCHA_TIMEOUT', 3.0)
+        self.breaker = CircuitBreaker(config.get('RECAPTCHA_BREAKER_THRESHOLD', 5), config.get('RECAPTCHA_BREAKER_COOLDOWN', 30))
+        pool_size = config.get('RECAPTCHA_POOL_SIZE', 10)
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0))
+
+    def verify(self, response):
+        if not response:
+            return False
+        if not self.breaker.allow():
+            raise RecaptchaUnavailable("reCAPTCHA circuit open")
+        try:
+            reply = self.session.post(VERIFY_URL, data={'secret': self.secret, 'response': response}, timeout=self.timeout)
+            reply.raise_for_status()
+            result = reply.json()
+        except (requests.RequestException, ValueError) as e:
+            self.breaker.record_failure()
+            raise RecaptchaUnavailable(str(e)) from e
+        self.breaker.record_success()
+        if not result.get("success", False):
+            print("reCAPTCHA rejected:", result.get("error-codes"))  # Debugging
+        return result.get("success", False)
+
+
+# stand-in without network access: any non-empty response passes except "fail"
+class LocalVerifier:
+    def __init__(self, config):
+        self.delay = config.get('RECAPTCHA_LOCAL_DELAY', 0)
+
+    def verify(self, response):
+        if self.delay:
+            time.sleep(self.delay)
+        return bool(response) and response != "fail"
+
+
+def init_recaptcha(app):
+    name = app.config.get('RECAPTCHA_VERIFIER', 'google')
+    if name == 'google':
+        verifier_class = GoogleVerifier
+    elif name == 'local':
+        verifier_class = LocalVerifier
+    else:
+        verifier_class = import_string(name)
+    app.extensions['recaptcha'] = verifier_class(app.config)
+
+
+def verify_recaptcha(response):
+    return current_app.extensions['recaptcha'].verify(response)
@@ -0,0 +1,97 @@
+from .models import File_data, File_version, Upload_session
+from . import db
+from .blobstore import version_file_exists, collect_garbage, GC_GRACE_SECONDS
+
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func
+
+from datetime import timedelta
+
+import click
+import os
+import time
+
+# Leftovers of interrupted uploads.
+# Uploads commit their rows in one transaction after the content is stored, so a crash leaves at most
+# an unreferenced blob (collected by `flask blobs gc`). Older uploads committed File_data on its own,
+# and chunked uploads may be abandoned half way; the reconciler removes what they left:
+# stale upload sessions with their part files, part files without a session, main files that never
+# got a version, and half-written temp files. Versions whose content is missing are only reported.
+
+# active chunked uploads untouched for this long are abandoned
+SESSION_MAX_AGE_DAYS = 7
+
+
+def expire_upload_sessions(max_age_days=SESSION_MAX_AGE_DAYS):
+    cutoff = func.now() - timedelta(days=max_age_days)
+    stale = Upload_session.query.filter(
+        Upload_session.status == 'active',
+        func.coalesce(Upload_session.updated_date, Upload_session.created_date) < cutoff
+    ).all()
+    for upload_session in stale:
+        file_data = db.session.get(File_data, upload_session.file_data_id)
+        if file_data is not None:
+            part_path = os.path.join(current_app.config['UPLOAD_FOLDER'], str(file_data.project_id),
+                                     str(file_data.file_data_id), f".{upload_session.upload_id}.part")
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        db.session.delete(upload_session)
+    db.session.commit()
+    return len(stale)
+
+
+# main files without any version and without an upload still running for them
+def delete_empty_file_data():
+    has_version = db.session.query(File_version.version_id).filter(File_version.file_data_id == File_data.file_data_id).exists()
+    has_upload = db.session.query(Upload_session.upload_id).filter(Upload_session.file_data_id == File_data.file_data_id).exists()
+    deleted = File_data.query.filter(~has_version, ~has_upload).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+# part files of sessions that no longer exist and half-written temp files (.upload-*) older than grace
+def remove_stray_files(grace_seconds=GC_GRACE_SECONDS):
+    active = {upload_id for (upload_id,) in db.session.query(Upload_session.upload_id).filter(Upload_session.status == 'active')}
+    blob_root = os.path.join(current_app.config['UPLOAD_FOLDER'], 'blobs')
+    now = time.time()
+    removed = 0
+    for dirpath, dirnames, filenames in os.walk(current_app.config['UPLOAD_FOLDER']):
+        if dirpath == blob_root:
+            # the blob store cleans up after itself (blobs gc)
+            dirnames[:] = []
+            continue
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if name.startswith('.') and name.endswith('.part'):
+                stray = name[1:-len('.part')] not in active
+            else:
+                stray = name.startswith('.upload-')
+            if stray and now - os.path.getmtime(path) >= grace_seconds:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def count_missing_content():
+    rows = db.session.query(File_version, File_data).join(File_data, File_data.file_data_id == File_version.file_data_id).all()
+    return sum(1 for file_version, file_data in rows if not version_file_exists(file_data, file_version))
+
+
+# CLI: flask uploads reconcile [--grace S] [--session-age D]
+uploads_cli = AppGroup('uploads', help='Upload maintenance.')
+
+@uploads_cli.command('reconcile')
+@click.option('--grace', default=GC_GRACE_SECONDS, show_default=True, help='Keep stray files younger than this (seconds).')
+@click.option('--session-age', default=SESSION_MAX_AGE_DAYS, show_default=True, help='Expire active chunked uploads idle for this many days.')
+def reconcile_command(grace, session_age):
+    sessions = expire_upload_sessions(session_age)
+    empty = delete_empty_file_data()
+    stray = remove_stray_files(grace)
+    blobs, stray_blobs, freed = collect_garbage(grace)
+    missing = count_missing_content()
+    click.echo(f"Expired {sessions} upload sessions, deleted {empty} main files without versions, "
+               f"removed {stray} stray files.")
+    click.echo(f"Blob store: removed {blobs} unreferenced blobs and {stray_blobs} stray files ({freed / 1024 / 1024:.1f} MB).")
+    if missing:
+        click.echo(f"{missing} versions have no content on disk.")
@@ -0,0 +1,270 @@
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+from dataclasses import dataclass
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to Flask's json provider
+    orjson = None
+
+# Response rows of the listing endpoints.
+# Queries select only the columns a listing needs (row tuples, no ORM entities); each row is mapped
+# to a dataclass which the JSON provider below encodes directly, without building dicts.
+# (No slots: orjson reads a dataclass' __dict__ in one go but falls back to getattr() per field
+# for slotted ones, which makes serializing several times slower.)
+
+DEFAULT_PROFILE_PIC = "default.png"
+
+
+def profile_pic_url(profile_pic):
+    return f"/static/profile_pics/{profile_pic or DEFAULT_PROFILE_PIC}"
+
+
+# /api/projects/<id>/members
+@dataclass
+class MemberDTO:
+    id: int
+    name: str
+    role: str
+    email: str
+    phoneNumber: str
+    nickname: str
+    job: str
+    nickname_id: int
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row.user_id, row.full_name, row.role, row.email, row.mobile, row.nickname, row.job, row.nickname_id)
+
+
+# /project/<id> file list
+@dataclass
+class ProjectFileDTO:
+    version_id: int
+    file_data_id: int
+    title: str
+    file_name: str
+    version_number: int
+    file_size: int
+    file_type: str
+    upload_date: datetime
+    description: str
+    comment: str
+    uploader_id: int
+    uploader_nickname: str
+    uploader_nickname_id: object
+    uploader_pic: str
+
+    @classmethod
+    def from_row(cls, row):
+        uploaded = row.nickname is not None
+        return cls(
+            row.version_id,
+            row.file_data_id,
+            row.title,
+            row.file_name,
+            row.version_number,
+            row.file_size,
+            row.file_type,
+            row.upload_date,
+            row.description,
+            row.comment,
+            row.user_id,
+            row.nickname if uploaded else "Unknown",
+            row.nickname_id if uploaded else "No ID",
+            profile_pic_url(row.profile_pic if uploaded else None),
+        )
+
+
+# /api/files/<id>/versions
+@dataclass
+class FileVersionDTO:
+    version_id: int
+    version_number: int
+    file_name: str
+    file_size: int
+    file_type: str
+    upload_date: datetime
+    comment: str
+    uploader_nickname: str
+    uploader_nickname_id: object
+    uploader_pic: str
+    downloaded: bool
+
+    @classmethod
+    def from_row(cls, row):
+        uploaded = row.nickname is not None
+        return cls(
+            row.version_id,
+            row.version_number,
+            row.file_name,
+            row.file_size,
+            row.file_type,
+            row.upload_date,
+            row.comment,
+            row.nickname if uploaded else "Unknown",
+            row.nickname_id if uploaded else "No ID",
+            profile_pic_url(row.profile_pic if uploaded else None),
+            bool(row.downloaded),
+        )
+
+
+# version history returned after an upload
+@dataclass
+class UploadedVersionDTO:
+    version_number: int
+    file_name: str
+    file_size: int
+    comment: str
+    uploader: str
+    uploader_pic: str
+
+    @classmethod
+    def from_row(cls, row):
+        uploaded = row.full_name is not None
+        return cls(
+            row.version_number,
+            row.file_name,
+            row.file_size,
+            row.comment,
+            row.full_name if uploaded else "Unknown",
+            profile_pic_url(row.profile_pic if uploaded else None),
+        )
+
+
+# /invitations
+@dataclass
+class InvitationDTO:
+    project_name: str
+    id: int
+    project_id: int
+    status: str
+    invite_date: str
+    profile_pic: str
+    referrer_nickname: str
+    referrer_nickname_id: object
+
+    @classmethod
+    def from_row(cls, row):
+        referred = row.nickname is not None
+        return cls(
+            row.project_name,
+            row.invitation_id,
+            row.project_id,
+            row.status,
+            http_date(row.invite_date) if row.invite_date else None,
+            profile_pic_url(row.profile_pic if referred else None),
+            row.nickname if referred else "Unknown",
+            row.nickname_id if referred else "No ID",
+        )
+
+
+# /api/projects/<id>/versions export (streamed, see iter_json)
+@dataclass
+class ProjectVersionDTO:
+    version_id: int
+    filename: str
+    timestamp: datetime
+    file_size: int
+    description: str
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row.version_id, row.file_name, row.upload_date, row.file_size, row.description)
+
+
+# /api/mainpage roles
+@dataclass
+class DashboardProjectDTO:
+    project_id: int
+    project_name: str
+    role: str
+    created_date: datetime
+    creator_name: str
+    creator_profile_picture: str
+    has_latest: bool
+    description: str
+    last_modified_by: str
+    last_modified_date: datetime
+    nickname: str
+    nickname_id: int
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            row.project_id,
+            row.project_name or "",
+            row.role,
+            row.created_date,
+            row.creator_name,
+            row.creator_profile_picture,
+            row.has_latest,
+            row.description,
+            row.last_modified_by,
+            row.last_modified_date,
+            row.nickname,
+            row.nickname_id,
+        )
+
+
+# JSON encoding of responses: datetimes as ISO 8601 (the format the listings always used), so
+# DTOs can carry datetime columns as they come from the database
+def _default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class JSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+
+# orjson-backed provider (same output, dict keys sorted, non-string keys as strings)
+class OrjsonProvider(JSONProvider):
+    OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # options orjson does not support (indent, ensure_ascii, ...)
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self.OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.OPTIONS | orjson.OPT_APPEND_NEWLINE
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(orjson.dumps(obj, default=_default, option=option), mimetype=self.mimetype)
+
+
+# Large listings encoded incrementally: `batches` yields lists of items, each batch becomes one chunk
+# of the response. Output is a single JSON array, or NDJSON (one document per line) with ndjson=True.
+def iter_json(batches, ndjson=False):
+    dumps = current_app.json.dumps
+    started = False
+    if not ndjson:
+        yield "["
+    for batch in batches:
+        if not batch:
+            continue
+        encoded = [dumps(item) for item in batch]
+        if ndjson:
+            yield "\n".join(encoded) + "\n"
+        else:
+            yield ("," if started else "") + ",".join(encoded)
+        started = True
+    if not ndjson:
+        yield "]\n"
+
+
+def init_json_provider(app):
+    app.json_provider_class = OrjsonProvider if orjson is not None else JSONProvider
+    app.json = app.json_provider_class(app)
@@ -0,0 +1,59 @@
+from .models import User_profile
+
+from flask import g
+
+# Request-scoped User_profile loader (DataLoader pattern).
+# Code that will need several users primes their ids first; the first lookup then fetches every
+# pending id with one IN query. Loaded profiles (and misses) are remembered until the request ends,
+# so the same user is never queried twice in one request.
+
+
+class UserLoader:
+    def __init__(self):
+        self._users = {}
+        self._pending = set()
+
+    # queue ids for the next batch
+    def prime(self, user_ids):
+        for user_id in user_ids:
+            if user_id is not None and user_id not in self._users:
+                self._pending.add(user_id)
+
+    # a profile that is already loaded (e.g. current_user)
+    def add(self, user):
+        self._users[user.user_id] = user
+        self._pending.discard(user.user_id)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, set()
+        for user in User_profile.query.filter(User_profile.user_id.in_(pending)).all():
+            self._users[user.user_id] = user
+        for user_id in pending:
+            self._users.setdefault(user_id, None)
+
+    def get(self, user_id):
+        if user_id is None:
+            return None
+        if user_id not in self._users:
+            self._pending.add(user_id)
+            self._flush()
+        return self._users[user_id]
+
+    # {user_id: User_profile or None}
+    def get_many(self, user_ids):
+        self.prime(user_ids)
+        self._flush()
+        return {user_id: self._users[user_id] for user_id in user_ids if user_id is not None}
+
+
+def get_user_loader():
+    loader = g.get('_user_loader')
+    if loader is None:
+        loader = g._user_loader = UserLoader()
+    return loader
+
+
+def load_user_profile(user_id):
+    return get_user_loader().get(user_id)
@@ -0,0 +1,20 @@
+from .models import File_data
+from . import db
+
+from sqlalchemy import update
+
+# Version numbers of a main file come from its counter (File_data.version_count): the UPDATE that
+# increments it also locks the File_data row until the upload's transaction ends, so concurrent
+# uploads of the same file are serialized from the counter to the commit. The numbers are dense
+# and only one version is ever marked last_version (also enforced by ix_file_version_latest).
+
+
+# next version_number of a main file; locks the file_data row for the rest of the transaction
+def next_version_number(file_data_id):
+    return db.session.execute(
+        update(File_data).
+        where(File_data.file_data_id == file_data_id).
+        values(version_count=File_data.version_count + 1).
+        returning(File_data.version_count).
+        execution_options(synchronize_session=False)
+    ).scalar_one()
@@ -1,22 +1,41 @@
-from .models import File_data, User_profile, User_Project, Project, Invitation, File_version, Last_download
+from .models import File_data, User_profile, User_Project, Project, Invitation, File_version, Last_download, Upload_session
 from . import db
 from .auth import FULL_NAME_REGEX, NICKNAME_REGEX, PASSWORD_REGEX, JOB_REGEX, EMAIL_REGEX
-
-from flask import Blueprint, request, jsonify
+from .freshness import record_upload, record_downloads, record_membership
+from .dashboard import get_dashboard_roles
+from .zipstream import stream_zip, unique_arcnames
+from .filetypes import allowed_file, content_matches_extension, normalize_extension_override, effective_extensions, SNIFF_SIZE
+from .pagination import encode_cursor, decode_cursor, keyset_filter, parse_limit
+from .serializers import MemberDTO, ProjectFileDTO, FileVersionDTO, UploadedVersionDTO, InvitationDTO, ProjectVersionDTO, profile_pic_url, iter_json
+from .userloader import get_user_loader, load_user_profile
+from .cache import get_membership, invalidate_membership, invalidate_user, members_revision, invalidate_member_profile
+from .passwords import hash_password, verify_password, HashingBusy
+from .nicknames import assign_nickname, NicknameIdsExhausted
+from .versioning import next_version_number
+from .invitations import claim_email_invitations, invite_emails, split_emails, INVITATION_STATUSES, INVITE_MESSAGES, SENT_STATUSES
+from .blobstore import version_file_exists, materialize_version, store_file, store_stream, add_blob_reference
+
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask import current_app
 from flask import send_from_directory
 
 from flask_login import login_required, current_user
 
-from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
+from werkzeug.http import http_date
 
-from sqlalchemy import text, func
+from sqlalchemy import text, func, or_, select, union_all, case
 from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert
 
 import os
-import zipfile
 import re
+import hashlib
+import uuid
+import shutil
+import tempfile
+import itertools
+import mimetypes
 import bleach
 import phonenumbers
 
@@ -25,47 +44,96 @@ projects_bp = Blueprint('projects', __name__)
 
 # helper function for multiple places
 def is_user_active_member(project_id, user_id):
-    return User_Project.query.filter_by(project_id=project_id, user_id=user_id, is_removed=False).first() is not None
+    membership = get_membership(project_id, user_id)
+    return membership is not None and not membership[1]
 
 # Members base logic start
-@views.route('/api/projects/<project_id>/members', methods=['GET'])
+# role order of the members list (owners first), then by name
+MEMBER_ROLE_RANK = case({'owner': 1, 'admin': 2, 'editor': 3, 'reader': 4}, value=User_Project.role, else_=5)
+
+@views.route('/api/projects/<int:project_id>/members', methods=['GET'])
 @login_required
 def members(project_id):
-    # Check if the user is an active member of the project
-    if not is_user_active_member(project_id, current_user.user_id):
+    # Check if the user is an active member of the project (cached, like the user itself)
+    membership = get_membership(project_id, current_user.user_id)
+    if membership is None or membership[1]:
         return jsonify({"error": "You are not an active member of this project"}), 403
 
-    # Fetch all members of the project
-    user_projects = User_Project.query.filter_by(project_id=project_id, is_removed=False).all()
-    project = Project.query.get(project_id)
-
-    project_roles = []
-    current_user_role = None
-
-    for user_project in user_projects:
-        user = User_profile.query.get(user_project.user_id)
-        project_roles.append({
-            "id": user.user_id,
-            "name": user.full_name,
-            "role": user_project.role,
-            "email": user.email,
-            "phoneNumber": user.mobile,
-            "nickname": user.nickname,
-            "job": user.job,
-            "nickname_id": user.nickname_id
-        })
-        if user.user_id == current_user.user_id:
-            current_user_role = user_project.role
-
-    if current_user_role is None:
-        return jsonify({"error": "You are not a member of this project"}), 403
+    # optional search (?q= on name, nickname or email) and paging; without ?limit every member is returned
+    search = request.args.get("q", "").strip()
+    try:
+        limit = parse_limit(request.args.get("limit"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    cursor = None
+    if request.args.get("cursor"):
+        cursor = decode_cursor(request.args["cursor"], tag="members", length=3)
+        if cursor is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    # repeat loads of an unchanged list are answered from the cache alone (see members_revision)
+    etag = hashlib.sha256(repr((members_revision(project_id), current_user.user_id, search,
+                                limit, request.args.get("cursor"))).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    # Active members with their profile columns and the project name, in one query
+    name_key = func.coalesce(User_profile.full_name, '')
+    member_rows = db.session.query(
+        User_profile.user_id,
+        User_profile.full_name,
+        User_Project.role,
+        User_profile.email,
+        User_profile.mobile,
+        User_profile.nickname,
+        User_profile.job,
+        User_profile.nickname_id,
+        Project.name.label("project_name"),
+        MEMBER_ROLE_RANK.label("role_rank"),
+        name_key.label("name_key")
+    ).join(User_profile, User_profile.user_id == User_Project.user_id).\
+        join(Project, Project.project_id == User_Project.project_id).\
+        filter(User_Project.project_id == project_id, User_Project.is_removed == False)
+
+    if search:
+        member_rows = member_rows.filter(or_(
+            User_profile.full_name.icontains(search, autoescape=True),
+            User_profile.nickname.icontains(search, autoescape=True),
+            User_profile.email.icontains(search, autoescape=True)
+        ))
+    if cursor is not None:
+        member_rows = member_rows.filter(keyset_filter([MEMBER_ROLE_RANK, name_key, User_profile.user_id], cursor))
+    member_rows = member_rows.order_by(MEMBER_ROLE_RANK, name_key, User_profile.user_id)
+    if limit is not None:
+        member_rows = member_rows.limit(limit + 1)
+    member_rows = member_rows.all()
+
+    next_cursor = None
+    if limit is not None and len(member_rows) > limit:
+        member_rows = member_rows[:limit]
+        last = member_rows[-1]
+        next_cursor = encode_cursor([last.role_rank, last.name_key, last.user_id], tag="members")
+
+    if member_rows:
+        project_name = member_rows[0].project_name
+    else:
+        project = db.session.get(Project, project_id)
+        project_name = project.name if project else "Unknown"
 
-    return jsonify({
+    response = jsonify({
         "user_id": current_user.user_id,
-        "current_user_role": current_user_role, 
-        "project_name": project.name if project else "Unknown",
-        "members": project_roles
+        "current_user_role": membership[0],
+        "project_name": project_name,
+        "members": [MemberDTO.from_row(row) for row in member_rows],
+        "next_cursor": next_cursor
     })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 # Members base logic end
 
 
@@ -88,53 +156,24 @@ def invite_member(project_id):
     if not user_project or user_project.role not in ['admin', 'owner', 'editor']: 
         return jsonify({"error": "You don't have permission to invite members"}), 403
 
-    # Split and clean up the emails
-    email_list = [bleach.clean(email.strip(), strip=True) for email in invited_email.replace("\n", ",").split(",") if email.strip()]
+    # Split and clean up the emails; the whole list is handled at once (invitations.py)
+    email_list = [bleach.clean(email, strip=True) for email in split_emails(invited_email)]
+    results = invite_emails(project_id, current_user.user_id, email_list)
+    db.session.commit()
+
+    sent = [result for result in results if result["status"] in SENT_STATUSES]
+    if not sent:
+        if len(results) == 1 and results[0]["status"] == 'member':
+            error = f"User {results[0]['email']} is already a member of this project"
+        else:
+            error = "Invalid email addresses"
+        return jsonify({"error": error, "results": results}), 400
 
-    for email in email_list:
-        # Check if the invited user already exists
-        invited_user = User_profile.query.filter_by(email=email).first()
-        
-        # check if the user is already a member of the project
-        if invited_user:
-            existing_membership = User_Project.query.filter_by(user_id=invited_user.user_id, project_id=project_id).first()
-            if existing_membership:
-                if existing_membership.is_removed:
-                    # Re-invite the user if they were removed
-                    Invitation.query.filter_by(
-                        invited_user_id=invited_user.user_id,
-                        project_id=project_id,
-                        status='pending'
-                    ).delete(synchronize_session=False)
-
-                    # Create a new invitation
-                    new_invitation = Invitation(
-                        invited_email=email,
-                        invited_user_id=invited_user.user_id,
-                        referrer_id=current_user.user_id,
-                        project_id=project_id,
-                        status='pending'
-                    )
-                    db.session.add(new_invitation)
-                    db.session.commit()
-                    return jsonify({"message": "User re-invited successfully. They need to accept the invitation."}), 200
-                else:
-                    return jsonify({"error": f"User {email} is already a member of this project"}), 400
-            else:
-                # If they weren't a member before; create an invitation
-                new_invitation = Invitation(
-                    invited_email=email,
-                    invited_user_id=invited_user.user_id if invited_user else None,
-                    referrer_id=current_user.user_id,
-                    project_id=project_id,
-                    status='pending'
-                )
-                db.session.add(new_invitation)
-                db.session.commit()
-
-                return jsonify({"message": "Invitation sent successfully"}), 200
-
-    return jsonify({"error": "Invalid email addresses"}), 400  
+    if len(results) == 1:
+        message = INVITE_MESSAGES[sent[0]["status"]]
+    else:
+        message = f"{len(sent)} of {len(results)} invitations sent"
+    return jsonify({"message": message, "results": results}), 200
 # Invite members to a project end
 
 
@@ -189,6 +228,7 @@ def change_role(project_id):
     # Update the role(s)
     target_membership.role = new_role
     db.session.commit()
+    invalidate_membership(project_id, target_membership.user_id)
     return jsonify({"message": "Role updated successfully"})
 # Change role of a member end
 
@@ -225,6 +265,7 @@ def remove_user_from_project(project_id):
             remover_membership.user_deleted_or_left_date = func.now()
 
             db.session.commit()
+            invalidate_membership(project_id, current_user.user_id)
 
             print(f"User {current_user.user_id} successfully left project {project_id}")
             return jsonify({"message": "You have left the project successfully"}), 200
@@ -248,6 +289,7 @@ def remove_user_from_project(project_id):
     target_membership.user_deleted_or_left_date = func.now()
 
     db.session.commit()
+    invalidate_membership(project_id, target_membership.user_id)
 
     return jsonify({"message": "User removed from the project successfully"}), 200
 # Remove a member from a project end
@@ -260,40 +302,67 @@ def invitations():
     filter_status = request.args.getlist('status')  # Get the status filter from the query params
     if not filter_status:
         filter_status = ['pending']  # Default to "pending" if no status is provided
+    if not set(filter_status) <= INVITATION_STATUSES:
+        return jsonify({"error": "Invalid status"}), 400
 
-    # Fetch the latest invitations for the current user based on the filter
-    latest_invites_subquery = db.session.query(
+    # optional paging, newest first; without ?limit every invitation is returned as before
+    try:
+        limit = parse_limit(request.args.get("limit"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    cursor = None
+    if request.args.get("cursor"):
+        cursor = decode_cursor(request.args["cursor"], tag="invitations", length=1)
+        if cursor is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    # invitations of the current user: by id, plus email-only ones not claimed yet (invitations.py).
+    # Two branches instead of "user OR email" so each one is answered by its own index
+    by_user = select(Invitation.project_id, Invitation.invitation_id).where(
+        Invitation.invited_user_id == current_user.user_id,
+        Invitation.status.in_(filter_status)
+    )
+    by_email = select(Invitation.project_id, Invitation.invitation_id).where(
+        Invitation.invited_email == current_user.email,
+        Invitation.invited_user_id == None,
+        Invitation.status.in_(filter_status)
+    )
+    my_invites = union_all(by_user, by_email).subquery()
+
+    # latest matching invitation per project; the page is cut here, before any row is joined
+    latest_id = func.max(my_invites.c.invitation_id)
+    latest_invites_subquery = db.session.query(latest_id.label('max_id')).group_by(my_invites.c.project_id)
+    if cursor is not None:
+        latest_invites_subquery = latest_invites_subquery.having(latest_id < cursor[0])
+    if limit is not None:
+        latest_invites_subquery = latest_invites_subquery.order_by(latest_id.desc()).limit(limit + 1)
+    latest_invites_subquery = latest_invites_subquery.subquery()
+
+    # Latest invitations with their project name and the user who sent them
+    latest_invitations = db.session.query(
+        Invitation.invitation_id,
         Invitation.project_id,
-        func.max(Invitation.invitation_id).label('max_id')
-    ).filter(
-        ((Invitation.invited_user_id == current_user.user_id) | 
-         (Invitation.invited_email == current_user.email)),
-        Invitation.status.in_(filter_status)  # Dynamically filter by status
-    ).group_by(Invitation.project_id).subquery()
-
-    latest_invitations = db.session.query(Invitation).join(
-        latest_invites_subquery,
-        (Invitation.project_id == latest_invites_subquery.c.project_id) & 
-        (Invitation.invitation_id == latest_invites_subquery.c.max_id)
-    ).all()
-
-    invitations_data = []
-    for inv in latest_invitations:
-        referrer = User_profile.query.get(inv.referrer_id)  # Fetch the user who sent the invitation
-        project_creator = User_profile.query.get(inv.project.creator_id)  # Fetch the project creator
-
-        invitations_data.append({
-            "project_name": inv.project.name,
-            "id": inv.invitation_id,
-            "project_id": inv.project_id,
-            "status": inv.status,
-            "invite_date": inv.invite_date,
-            "profile_pic": f"/static/profile_pics/{referrer.profile_pic}" if referrer and referrer.profile_pic else "/static/profile_pics/default.png",  # Fixed this line
-            "referrer_nickname": referrer.nickname if referrer else "Unknown",
-            "referrer_nickname_id": referrer.nickname_id if referrer else "No ID"
-        })
+        Invitation.status,
+        Invitation.invite_date,
+        Project.name.label("project_name"),
+        User_profile.nickname,
+        User_profile.nickname_id,
+        User_profile.profile_pic
+    ).join(latest_invites_subquery, Invitation.invitation_id == latest_invites_subquery.c.max_id).\
+        join(Project, Project.project_id == Invitation.project_id).\
+        outerjoin(User_profile, User_profile.user_id == Invitation.referrer_id).\
+        order_by(Invitation.invitation_id.desc()).\
+        all()
 
-    return jsonify({"invitations": invitations_data})
+    next_cursor = None
+    if limit is not None and len(latest_invitations) > limit:
+        latest_invitations = latest_invitations[:limit]
+        next_cursor = encode_cursor([latest_invitations[-1].invitation_id], tag="invitations")
+
+    invitations_data = [InvitationDTO.from_row(row) for row in latest_invitations]
+
+    return jsonify({"invitations": invitations_data, "next_cursor": next_cursor})
 # base logic for invitations end
 
 
@@ -325,9 +394,14 @@ def accept_invite(invitation_id):
         new_member = User_Project(user_id=current_user.user_id, project_id=invitation.project_id, role='reader')
         db.session.add(new_member)
 
+    # Stale file counter for the dashboard, stored with the membership
+    db.session.flush()
+    record_membership(current_user.user_id, invitation.project_id)
+
     # Update the invitation
     invitation.status = 'accepted'
     db.session.commit()
+    invalidate_membership(invitation.project_id, current_user.user_id)
 
     return jsonify({"message": "Invitation accepted."})
 # acceptin invitations end
@@ -352,18 +426,37 @@ def deny_invite(invitation_id):
 
 
 # allowed file types for upload logic start
-def load_allowed_extensions(filepath=None):
-    if filepath is None:
-        filepath = os.path.join(current_app.static_folder, 'allowed_extensions.txt')
-    if not os.path.exists(filepath):
-        print(f"[ERROR] {filepath} not found. Using default set.")
-        return {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'zip', 'rar', 'tar', 'gz', '7z', 'docx', 'xlsx', 'pptx'}
-    with open(filepath, "r", encoding="utf-8") as f:
-        return {line.strip().lower() for line in f if line.strip()}
-
-def allowed_file(filename):
-    allowed_extensions = load_allowed_extensions()
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
+# (the extension list is cached in filetypes.py and reloaded when allowed_extensions.txt changes)
+def read_upload_head(file):
+    head = file.stream.read(SNIFF_SIZE)
+    file.stream.seek(0)
+    return head
+
+@projects_bp.route("/api/projects/<int:project_id>/allowed-extensions", methods=["GET", "PUT"])
+@login_required
+def project_allowed_extensions(project_id):
+    user_project = User_Project.query.filter_by(user_id=current_user.user_id, project_id=project_id, is_removed=False).first()
+    if not user_project:
+        return jsonify({"error": "You are not a member of this project"}), 403
+
+    project = Project.query.get_or_404(project_id)
+
+    if request.method == "PUT":
+        if user_project.role not in ['admin', 'owner']:
+            return jsonify({"error": "You don't have permission to change the allowed file types"}), 403
+
+        data = request.get_json() or {}
+        override = data.get("allowed_extensions") or ""
+        if not isinstance(override, str) or len(override) > 1000:
+            return jsonify({"error": "allowed_extensions must be a string of extensions"}), 400
+
+        project.allowed_extensions = normalize_extension_override(bleach.clean(override, strip=True))
+        db.session.commit()
+
+    return jsonify({
+        "override": project.allowed_extensions,
+        "allowed_extensions": effective_extensions(project)
+    }), 200
 # allowed file types for upload logic end
 
 # upload base start
@@ -379,10 +472,19 @@ def upload_file():
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
-    if file and allowed_file(file.filename):
+    if file and allowed_file(file.filename) and content_matches_extension(file.filename, read_upload_head(file)):
         filename = secure_filename(file.filename)
         file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        # write next to the target and rename, so a crash never leaves a half-written file under the real name
+        fd, tmp_path = tempfile.mkstemp(dir=current_app.config['UPLOAD_FOLDER'], prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                file.save(tmp)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
         print("Saved to:", file_path)
         return jsonify({"message": "File uploaded successfully!", "file_name": filename})
     else:
@@ -390,6 +492,130 @@ def upload_file():
         return jsonify({"error": "Invalid file type!"}), 400
 #upload base end
 
+# upload helpers start
+# An upload is one transaction: the content is stored first (temp file + rename into the blob store),
+# then File_data, File_version, Last_download and the counters are written and committed together.
+# A crash before the commit leaves only an unreferenced blob, which `flask blobs gc` removes;
+# `flask uploads reconcile` cleans up what older uploads and abandoned chunked uploads left behind.
+
+# Existing main file (version upload) or a new File_data entry (added, not committed); returns (file_data, error_response)
+def get_or_create_file_data(project, main_file_id_raw, title, description):
+    main_file_id = int(main_file_id_raw) if main_file_id_raw and str(main_file_id_raw).isdigit() else None
+
+    if main_file_id:
+        # Version upload: Link to existing main file
+        file_data = File_data.query.get(main_file_id)
+        if not file_data or file_data.project_id != project.project_id:
+            return None, (jsonify({"error": "Main file not found"}), 404)
+        return file_data, None
+
+    # New file upload
+    if len(title) < 4:
+        return None, (jsonify({"error": "Title must be greater than 3 characters."}), 400)
+
+    # Create a new File_data entry (if necessary)
+    file_data = File_data(
+        project_id=project.project_id,
+        description=description,
+        title=title
+    )
+    db.session.add(file_data)
+    return file_data, None
+
+# Folder of a main file: UPLOAD_FOLDER/<project_id>/<file_data_id>
+def get_file_data_folder(file_data):
+    upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], str(file_data.project_id), str(file_data.file_data_id))
+    os.makedirs(upload_folder, exist_ok=True)
+    return upload_folder
+
+# Add the next version of file_data pointing at an already stored blob. The caller commits.
+def add_file_version(file_data, filename, file_type, comment, blob_hash, file_size):
+    # Extract filename and extension
+    filename = secure_filename(filename)
+    name, ext = os.path.splitext(filename)
+
+    # a new main file gets its id here
+    db.session.flush()
+
+    # Determine the next version number (locks file_data until the caller commits)
+    version_number = next_version_number(file_data.file_data_id)
+
+    # Stripping version number from the filename if it exists
+    version_pattern = re.compile(r'(.*)_v\d+$')
+    match = version_pattern.match(name)
+    if match:
+        name = match.group(1)
+
+    # Construct the new filename (used as the download name; the content lives in the blob store)
+    new_filename = f"{name}_v{version_number}{ext}"
+
+    # Keep the previous latest version for the freshness counters
+    previous_version = File_version.query.filter_by(file_data_id=file_data.file_data_id, last_version=True).first()
+
+    # Mark old versions as not the latest
+    File_version.query.filter_by(file_data_id=file_data.file_data_id, last_version=True).update({
+        "last_version": False
+    })
+
+    add_blob_reference(blob_hash, file_size)
+
+    # Create a new File_version entry
+    version = File_version(
+        version_number=version_number,
+        file_name=new_filename,
+        file_type=file_type,
+        file_size=file_size,
+        blob_hash=blob_hash,
+        last_version=True,
+        comment=comment,
+        file_data_id=file_data.file_data_id,
+        user_id=current_user.user_id
+    )
+    db.session.add(version)
+    db.session.flush()
+
+    # Mark the uploaded file as downloaded for the uploader
+    new_download = Last_download(
+        file_data_id=file_data.file_data_id,
+        version_id=version.version_id,
+        user_id=current_user.user_id,
+        download_date=func.now()
+    )
+    db.session.add(new_download)
+    record_upload(file_data.project_id, current_user.user_id, previous_version)
+
+    return version
+
+# Response body after an upload: the main file and its version history
+def build_upload_response(file_data):
+    file_versions = db.session.query(
+        File_version.version_number,
+        File_version.file_name,
+        File_version.file_size,
+        File_version.comment,
+        User_profile.full_name,
+        User_profile.profile_pic
+    ).outerjoin(User_profile, User_profile.user_id == File_version.user_id).\
+        filter(File_version.file_data_id == file_data.file_data_id).\
+        order_by(File_version.version_number.desc()).\
+        all()
+    version_history = [UploadedVersionDTO.from_row(v) for v in file_versions]
+
+    file_data_info = {
+        "file_data_id": file_data.file_data_id,
+        "title": file_data.title,
+        "description": file_data.description,
+        "project_id": file_data.project_id
+    }
+
+    return {
+        "message": "File uploaded successfully",
+        "file_data": file_data_info,
+        "version_history": version_history  
+    }
+# upload helpers end
+
+
 # upload main file(s) + upload new version(s) for main file(s) start
 @projects_bp.route("/api/projects/<int:project_id>/upload", methods=["POST"])
 @login_required
@@ -401,9 +627,6 @@ def upload_file(project_id):
     if file.filename == "":
         return jsonify({"error": "Empty filename"}), 400
 
-    if not allowed_file(file.filename):  
-        return jsonify({"error": "Invalid file type!"}), 400
-
     # Get the user's role in the specific project
     user_project = User_Project.query.filter_by(
         user_id=current_user.user_id,
@@ -427,130 +650,260 @@ def upload_file(project_id):
 
     project = Project.query.get_or_404(project_id)
 
+    if not allowed_file(file.filename, project):
+        return jsonify({"error": "Invalid file type!"}), 400
+
+    if not content_matches_extension(file.filename, read_upload_head(file)):
+        return jsonify({"error": "File content does not match its extension"}), 400
+
     try:
         # get the form data and bleach it
         description = request.form.get("description", "")
         title = request.form.get("title", "")[:100]
-        main_file_id_raw = request.form.get("main_file_id")
         comment = request.form.get("comment", "")[:100]
-        main_file_id = int(main_file_id_raw) if main_file_id_raw and main_file_id_raw.isdigit() else None
 
-        if main_file_id:
-            # Version upload: Link to existing main file
-            file_data = File_data.query.get(main_file_id)
-            if not file_data:
-                return jsonify({"error": "Main file not found"}), 404
-        else:
-            # New file upload
-            if len(title) < 4:
-                return jsonify({"error": "Title must be greater than 3 characters."}), 400
-
-            # Create a new File_data entry (if necessary)
-            file_data = File_data(
-                project_id=project.project_id,
-                description=description,
-                title=title
-            )
-            db.session.add(file_data)
-            db.session.commit()
+        file_data, error = get_or_create_file_data(project, request.form.get("main_file_id"), title, description)
+        if error:
+            return error
 
-        # Use the same folder for versioning (existing folder for the file)
-        folder_name = str(file_data.file_data_id)
-        upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], str(project.project_id), folder_name)
+        blob_hash, stored_size = store_stream(file.stream)
+        add_file_version(file_data, file.filename, file.mimetype, comment, blob_hash, stored_size)
+        db.session.commit()
 
-        # Check if the folder already exists, if not, create it
-        if os.path.exists(upload_folder):
-            print(f"Folder already exists: {upload_folder}")
-        else:
-            print(f"Folder does not exist. Creating: {upload_folder}")
-            os.makedirs(upload_folder, exist_ok=True)
+        return jsonify(build_upload_response(file_data)), 200
 
-        print(f"Uploading file to: {upload_folder}")
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+# Upload file + create version end
 
-        # Extract filename and extension
-        filename = secure_filename(file.filename)
-        name, ext = os.path.splitext(filename)
-
-        # Determine the next version number
-        latest_version = db.session.query(func.max(File_version.version_number)).filter(
-            File_version.file_data_id == file_data.file_data_id
-        ).scalar()
-        version_number = (latest_version or 0) + 1
-
-        # Stripping version number from the filename if it exists
-        version_pattern = re.compile(r'(.*)_v\d+$')
-        match = version_pattern.match(name)
-        if match:
-            name = match.group(1)
-
-        # Construct the new filename
-        new_filename = f"{name}_v{version_number}{ext}"
-
-        # Mark old versions as not the latest
-        File_version.query.filter_by(file_data_id=file_data.file_data_id, last_version=True).update({
-            "last_version": False
-        })
-        db.session.commit()
 
-        # Save the file with the new versioned name in the existing folder
-        file_path = os.path.join(upload_folder, new_filename)
-        file.save(file_path)
-
-        # Create a new File_version entry
-        version = File_version(
-            version_number=version_number,
-            file_name=new_filename,
-            file_type=file.mimetype,
-            file_size=os.path.getsize(file_path),
-            last_version=True,
+# Resumable (chunked) upload start
+# init -> PUT chunks with their offset -> finalize. Chunks are appended to a part file in the
+# main file's folder; the Upload_session row tracks progress so an interrupted upload can resume.
+# Part file of an upload session, next to the versions of its main file
+def get_upload_part_path(upload_session, file_data):
+    return os.path.join(get_file_data_folder(file_data), f".{upload_session.upload_id}.part")
+
+def upload_session_status(upload_session):
+    return {
+        "upload_id": upload_session.upload_id,
+        "file_data_id": upload_session.file_data_id,
+        "file_name": upload_session.file_name,
+        "file_size": upload_session.file_size,
+        "offset": upload_session.received_size or 0,
+        "chunk_size": current_app.config['UPLOAD_CHUNK_SIZE'],
+        "status": upload_session.status
+    }
+
+# Active session of the current user, locked for the rest of the transaction
+def get_active_upload_session(upload_id):
+    return Upload_session.query.filter_by(
+        upload_id=upload_id,
+        user_id=current_user.user_id,
+        status='active'
+    ).with_for_update().first()
+
+@projects_bp.route("/api/projects/<int:project_id>/uploads", methods=["POST"])
+@login_required
+def init_chunked_upload(project_id):
+    data = request.get_json() or {}
+    file_name = secure_filename(data.get("file_name", ""))
+    file_size = data.get("file_size")
+
+    if not file_name:
+        return jsonify({"error": "Empty filename"}), 400
+
+    if not isinstance(file_size, int) or file_size <= 0:
+        return jsonify({"error": "A positive file_size is required"}), 400
+
+    if file_size > current_app.config['MAX_CHUNKED_UPLOAD_SIZE']:
+        return jsonify({"error": "File size exceeds the upload limit"}), 400
+
+    user_project = User_Project.query.filter_by(user_id=current_user.user_id, project_id=project_id, is_removed=False).first()
+    if not user_project:
+        return jsonify({"error": "You are not a member of this project"}), 403
+
+    if user_project.role == "reader":
+        return jsonify({"error": "You don't have permission to upload files"}), 403
+
+    project = Project.query.get_or_404(project_id)
+
+    if not allowed_file(file_name, project):
+        return jsonify({"error": "Invalid file type!"}), 400
+
+    try:
+        description = bleach.clean(data.get("description", ""), strip=True)
+        title = bleach.clean(data.get("title", ""), strip=True)[:100]
+        comment = bleach.clean(data.get("comment", ""), strip=True)[:100]
+
+        file_data, error = get_or_create_file_data(project, data.get("main_file_id"), title, description)
+        if error:
+            return error
+        # a new main file gets its id; it is committed together with the session
+        db.session.flush()
+
+        upload_session = Upload_session(
+            upload_id=uuid.uuid4().hex,
+            file_name=file_name,
+            file_type=data.get("file_type") or mimetypes.guess_type(file_name)[0] or "application/octet-stream",
+            file_size=file_size,
             comment=comment,
             file_data_id=file_data.file_data_id,
             user_id=current_user.user_id
         )
-        db.session.add(version)
+
+        # Empty part file; chunks are appended to it
+        open(get_upload_part_path(upload_session, file_data), "wb").close()
+
+        db.session.add(upload_session)
         db.session.commit()
 
-        # Mark the uploaded file as downloaded for the uploader
-        new_download = Last_download(
-            file_data_id=file_data.file_data_id,
-            version_id=version.version_id,
-            user_id=current_user.user_id,
-            download_date=func.now()
-        )
-        db.session.add(new_download)
+        return jsonify(upload_session_status(upload_session)), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+# Upload status (used to resume after a dropped connection)
+@projects_bp.route("/api/uploads/<upload_id>", methods=["GET"])
+@login_required
+def get_chunked_upload(upload_id):
+    upload_session = Upload_session.query.filter_by(upload_id=upload_id, user_id=current_user.user_id).first()
+    if not upload_session:
+        return jsonify({"error": "Upload not found"}), 404
+
+    # A dropped connection may have left bytes on disk that were never recorded
+    if upload_session.status == 'active':
+        part_path = get_upload_part_path(upload_session, File_data.query.get(upload_session.file_data_id))
+        upload_session.received_size = os.path.getsize(part_path) if os.path.exists(part_path) else 0
         db.session.commit()
 
-        # Return the list of versions for history list
-        file_versions = File_version.query.filter_by(file_data_id=file_data.file_data_id).order_by(File_version.version_number.desc()).all()
-        version_history = []
-        for v in file_versions:
-            uploader = User_profile.query.get(v.user_id)
-            version_history.append({
-                "version_number": v.version_number,
-                "file_name": v.file_name,
-                "file_size": v.file_size,
-                "comment": v.comment,
-                "uploader": uploader.full_name if uploader else "Unknown",  
-                "uploader_pic": f"/static/profile_pics/{uploader.profile_pic}" if uploader and uploader.profile_pic else "/static/profile_pics/default.png"  # Add uploader profile picture
-            })
-
-        file_data_info = {
-            "file_data_id": file_data.file_data_id,
-            "title": file_data.title,
-            "description": file_data.description,
-            "project_id": file_data.project_id
-        }
+    return jsonify(upload_session_status(upload_session)), 200
 
-        return jsonify({
-            "message": "File uploaded successfully",
-            "file_data": file_data_info,
-            "version_history": version_history  
-        }), 200
+# Append one chunk; the offset must match the bytes already received
+# The chunk is read from the (possibly slow) client into a temporary file first, with no transaction
+# open; the session row is locked only to check the offset again and append the chunk from local disk.
+@projects_bp.route("/api/uploads/<upload_id>", methods=["PUT"])
+@login_required
+def put_upload_chunk(upload_id):
+    offset_raw = request.args.get("offset", request.headers.get("Upload-Offset", ""))
+    if not offset_raw.isdigit():
+        return jsonify({"error": "A numeric offset is required"}), 400
+    offset = int(offset_raw)
+
+    upload_session = Upload_session.query.filter_by(upload_id=upload_id, user_id=current_user.user_id, status='active').first()
+    if not upload_session:
+        return jsonify({"error": "Upload not found"}), 404
+
+    file_name, file_size = upload_session.file_name, upload_session.file_size
+    part_path = get_upload_part_path(upload_session, File_data.query.get(upload_session.file_data_id))
+    db.session.commit()
+
+    # The part file is the source of truth: a chunk written before a crash but never recorded still counts
+    received = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if offset != received:
+        return jsonify({"error": "Offset does not match the received size", "offset": received}), 409
+
+    max_chunk = current_app.config['UPLOAD_CHUNK_SIZE']
+    remaining = min(file_size - received, max_chunk)
+    written = 0
+
+    with tempfile.TemporaryFile(dir=os.path.dirname(part_path)) as chunk:
+        while True:
+            block = request.stream.read(min(1024 * 1024, remaining - written + 1))
+            if not block:
+                break
+            # the first chunk carries the magic bytes; check them before anything is kept
+            if received == 0 and written == 0 and not content_matches_extension(file_name, block[:SNIFF_SIZE]):
+                return jsonify({"error": "File content does not match its extension"}), 400
+            if written + len(block) > remaining:
+                return jsonify({"error": "Chunk exceeds the declared file size or the chunk size limit"}), 413
+            chunk.write(block)
+            written += len(block)
+
+        upload_session = get_active_upload_session(upload_id)
+        if not upload_session:
+            db.session.rollback()
+            return jsonify({"error": "Upload not found"}), 404
+
+        # another request may have appended the same range meanwhile
+        received = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset != received:
+            upload_session.received_size = received
+            db.session.commit()
+            return jsonify({"error": "Offset does not match the received size", "offset": received}), 409
+
+        chunk.seek(0)
+        with open(part_path, "ab") as part:
+            shutil.copyfileobj(chunk, part)
+
+    upload_session.received_size = received + written
+    upload_session.updated_date = func.now()
+    db.session.commit()
+
+    return jsonify(upload_session_status(upload_session)), 200
+
+# Create the File_version from the completed part file
+@projects_bp.route("/api/uploads/<upload_id>/finalize", methods=["POST"])
+@login_required
+def finalize_chunked_upload(upload_id):
+    upload_session = get_active_upload_session(upload_id)
+    if not upload_session:
+        return jsonify({"error": "Upload not found"}), 404
+
+    file_data = File_data.query.get(upload_session.file_data_id)
+    part_path = get_upload_part_path(upload_session, file_data)
+    received = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+    if received != upload_session.file_size:
+        db.session.rollback()
+        return jsonify({"error": "Upload is incomplete", "offset": received}), 409
+
+    if not is_user_active_member(file_data.project_id, current_user.user_id):
+        db.session.rollback()
+        return jsonify({"error": "You are not a member of this project"}), 403
+
+    try:
+        # the part file stays until the version is committed, so a failed finalize can be retried
+        blob_hash, stored_size = store_file(part_path, keep_source=True)
+        add_file_version(
+            file_data,
+            upload_session.file_name,
+            upload_session.file_type,
+            upload_session.comment,
+            blob_hash,
+            stored_size
+        )
+        upload_session.status = 'completed'
+        upload_session.received_size = received
+        upload_session.updated_date = func.now()
+        db.session.commit()
+        os.remove(part_path)
+
+        return jsonify(build_upload_response(file_data)), 200
 
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
-# Upload file + create version end
+
+# Abort an upload and drop its part file
+@projects_bp.route("/api/uploads/<upload_id>", methods=["DELETE"])
+@login_required
+def abort_chunked_upload(upload_id):
+    upload_session = get_active_upload_session(upload_id)
+    if not upload_session:
+        return jsonify({"error": "Upload not found"}), 404
+
+    file_data = File_data.query.get(upload_session.file_data_id)
+    part_path = get_upload_part_path(upload_session, file_data)
+    if os.path.exists(part_path):
+        os.remove(part_path)
+
+    db.session.delete(upload_session)
+    db.session.commit()
+    return jsonify({"message": "Upload aborted"}), 200
+# Resumable (chunked) upload end
 
 
 # downlaod base start
@@ -575,58 +928,75 @@ def download_files():
     if not selected_files:
         return jsonify({"error": "No files selected for download"}), 400
 
-    try:
-        # Collect file paths for the selected files
-        file_paths = []
-        for file_id in selected_files:
-            if not str(file_id).isdigit():
-                return jsonify({"error": f"Invalid file ID: {file_id}"}), 400
-
-            # Fetch the file version and its associated file data
-            file_version = File_version.query.get(int(file_id))
-            if not file_version:
-                return jsonify({"error": f"File version with ID {file_id} not found"}), 404
-
-            file_data = File_data.query.get(file_version.file_data_id)
-            if not file_data:
-                return jsonify({"error": f"File data for version ID {file_id} not found"}), 404
-
-            project_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], str(file_data.project_id))
-            file_folder = os.path.join(project_folder, str(file_data.file_data_id))
-            file_path = os.path.join(file_folder, file_version.file_name)
-
-            if not os.path.exists(file_path):
-                return jsonify({"error": f"File {file_version.file_name} not found on server"}), 404
+    if not all(str(file_id).isdigit() for file_id in selected_files):
+        invalid = next(file_id for file_id in selected_files if not str(file_id).isdigit())
+        return jsonify({"error": f"Invalid file ID: {invalid}"}), 400
 
-            file_paths.append(file_path)
+    version_ids = list(dict.fromkeys(int(file_id) for file_id in selected_files))
 
-            existing = Last_download.query.filter_by(
-                file_data_id=file_data.file_data_id,
-                version_id=file_version.version_id,
-                user_id=current_user.user_id
-            ).first()
+    try:
+        # Resolve every requested version with its file data and the caller's membership in one query
+        rows = db.session.query(File_version, File_data, User_Project.role).\
+            join(File_data, File_version.file_data_id == File_data.file_data_id).\
+            outerjoin(User_Project, (User_Project.project_id == File_data.project_id) &
+                      (User_Project.user_id == current_user.user_id) & (User_Project.is_removed == False)).\
+            filter(File_version.version_id.in_(version_ids)).\
+            all()
+        rows_by_id = {file_version.version_id: (file_version, file_data, role) for file_version, file_data, role in rows}
 
-            if not existing:
-                new_download = Last_download(
-                    file_data_id=file_data.file_data_id,
-                    version_id=file_version.version_id,
-                    user_id=current_user.user_id,
-                    download_date=func.now()
-                )
-                db.session.add(new_download)
+        # Collect the selected files (and their names inside the archive)
+        selected = []
+        for version_id in version_ids:
+            if version_id not in rows_by_id:
+                return jsonify({"error": f"File version with ID {version_id} not found"}), 404
 
-            db.session.commit()
+            file_version, file_data, role = rows_by_id[version_id]
+            if role is None:
+                return jsonify({"error": "You are not an active member of this project"}), 403
 
-        # Create a ZIP archive of the selected files
-        zip_filename = "selected_files.zip"
-        zip_path = os.path.join(current_app.config['UPLOAD_FOLDER'], zip_filename)
-        with zipfile.ZipFile(zip_path, "w") as zipf:
-            for file_path in file_paths:
-                zipf.write(file_path, os.path.basename(file_path))
+            if not version_file_exists(file_data, file_version):
+                return jsonify({"error": f"File {file_version.file_name} not found on server"}), 404
+
+            selected.append((file_data, file_version))
+
+        # Mark every version as downloaded in one statement; RETURNING gives only the rows that were new
+        new_version_ids = set(db.session.execute(
+            insert(Last_download).
+            values([{
+                "file_data_id": rows_by_id[version_id][1].file_data_id,
+                "version_id": version_id,
+                "user_id": current_user.user_id,
+                "download_date": func.now()
+            } for version_id in version_ids]).
+            on_conflict_do_nothing(index_elements=["user_id", "version_id"]).
+            returning(Last_download.version_id)
+        ).scalars())
+
+        record_downloads(current_user.user_id, [
+            (rows_by_id[version_id][1].project_id, rows_by_id[version_id][0]) for version_id in new_version_ids
+        ])
+        db.session.commit()
 
-        # Send the ZIP file to the user
-        return send_from_directory(current_app.config['UPLOAD_FOLDER'], zip_filename, as_attachment=True)
+        # Stream a ZIP archive of the selected files (built chunk by chunk, nothing written to disk)
+        arcnames = unique_arcnames([file_version.file_name for _, file_version in selected])
+
+        # Delta-stored versions are rebuilt into a temp file just before they are added to the archive
+        def archive_entries():
+            for (file_data, file_version), arcname in zip(selected, arcnames):
+                path, is_temp = materialize_version(file_data, file_version)
+                try:
+                    yield path, arcname
+                finally:
+                    if is_temp:
+                        os.remove(path)
+
+        return Response(
+            stream_with_context(stream_zip(archive_entries())),
+            mimetype="application/zip",
+            headers={"Content-Disposition": "attachment; filename=selected_files.zip"}
+        )
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 # downlaod files end
 
@@ -662,29 +1032,36 @@ def projects():
 @views.route('/api/projects', methods=['GET'])
 @login_required
 def get_projects():
-    user_projects = User_Project.query.filter_by(user_id=current_user.user_id).all()
+    user_projects = db.session.query(User_Project.role, Project).\
+        join(Project, Project.project_id == User_Project.project_id).\
+        filter(User_Project.user_id == current_user.user_id).\
+        all()
 
-    projects_data = []
-    for user_project in user_projects:
-        project = Project.query.get(user_project.project_id)
+    # Newest upload per project
+    last_modified_dates = dict(
+        db.session.query(File_data.project_id, func.max(File_version.upload_date)).
+        join(File_version, File_version.file_data_id == File_data.file_data_id).
+        filter(File_data.project_id.in_([project.project_id for _, project in user_projects])).
+        group_by(File_data.project_id).
+        all()
+    )
 
-        last_version = db.session.query(File_version).join(File_data).filter(
-            File_data.project_id == project.project_id
-        ).order_by(File_version.upload_date.desc()).first()
+    users = get_user_loader()
+    users.prime(project.creator_id for _, project in user_projects)
 
-        if last_version and last_version.upload_date:
-            last_modified = last_version.upload_date
-        else:
-            last_modified = None
+    projects_data = []
+    for role, project in user_projects:
+        last_modified = last_modified_dates.get(project.project_id)
+        creator = users.get(project.creator_id)
 
         projects_data.append({
             "id": project.project_id,
             "name": project.name,
-            "role": user_project.role,
-            "lastModified": last_modified,
-            "date": project.created_date if project.created_date else None,
-            "ownerName": User_profile.query.get(project.creator_id).full_name if project.creator_id else "Unknown",
-            "ownerAvatar": f"/static/profile_pics/{User_profile.query.get(project.creator_id).profile_pic}" if project.creator_id else "/static/profile_pics/default.png",
+            "role": role,
+            "lastModified": http_date(last_modified) if last_modified else None,
+            "date": http_date(project.created_date) if project.created_date else None,
+            "ownerName": creator.full_name if creator else "Unknown",
+            "ownerAvatar": profile_pic_url(creator.profile_pic if creator else None),
             "status": "success"
         })
 
@@ -693,70 +1070,135 @@ def get_projects():
 
 
 #project page start
+# sort keys of the file list (?sort=), nullable columns are coalesced so the keyset comparison works
+PROJECT_FILE_SORTS = {
+    "upload_date": File_version.upload_date,
+    "title": func.coalesce(File_data.title, ''),
+    "size": func.coalesce(File_version.file_size, 0),
+    "uploader": func.coalesce(User_profile.nickname, ''),
+}
+
 @views.route('/project/<int:project_id>', methods=['GET'])
 @login_required
 def project_page(project_id):
+    # optional paging/sorting/filtering; without ?limit every latest file is returned as before
+    sort = request.args.get("sort", "upload_date")
+    order = request.args.get("order", "desc")
+    if sort not in PROJECT_FILE_SORTS or order not in ("asc", "desc"):
+        return jsonify({"error": "Invalid sort or order"}), 400
+
     try:
-        membership = User_Project.query.filter_by(user_id=current_user.user_id, project_id=project_id).first()
-        if not membership:
-            return jsonify({"error": "Access denied: You are not a member of this project"}), 403
+        limit = parse_limit(request.args.get("limit"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        project = Project.query.get(project_id)
-        if not project:
-            return jsonify({"error": "Project not found"}), 404
+    cursor_tag = f"{sort}:{order}"
+    cursor = None
+    if request.args.get("cursor"):
+        cursor = decode_cursor(request.args["cursor"], tag=cursor_tag, length=2)
+        if cursor is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    uploader_raw = request.args.get("uploader", "")
+    if uploader_raw and not uploader_raw.isdigit():
+        return jsonify({"error": "uploader must be a user id"}), 400
 
+    try:
         user_id = current_user.user_id
+        creator = aliased(User_profile)
 
-        # Fetch all latest versions
-        latest_versions = File_version.query.\
-            join(File_data, File_version.file_data_id == File_data.file_data_id).\
-            filter(File_data.project_id == project_id, File_version.last_version == True).\
-            all()
+        # Membership, project and creator name in one round trip
+        row = db.session.query(Project, User_Project.role, creator.full_name).\
+            outerjoin(User_Project, (User_Project.project_id == Project.project_id) & (User_Project.user_id == user_id)).\
+            outerjoin(creator, creator.user_id == Project.creator_id).\
+            filter(Project.project_id == project_id).\
+            first()
+
+        if not row:
+            return jsonify({"error": "Project not found"}), 404
+        if row.role is None:
+            return jsonify({"error": "Access denied: You are not a member of this project"}), 403
+
+        project = row.Project
+
+        # Latest versions with their main file, uploader and the user's download flag in one query;
+        # the download check is correlated to each listed version, so only this project's versions are looked at
+        downloaded = db.session.query(Last_download.last_download_id).filter(
+            Last_download.user_id == user_id,
+            Last_download.version_id == File_version.version_id
+        ).exists()
+
+        latest_versions = db.session.query(
+            File_version.version_id,
+            File_version.file_data_id,
+            File_version.file_name,
+            File_version.version_number,
+            File_version.file_size,
+            File_version.file_type,
+            File_version.upload_date,
+            File_version.comment,
+            File_version.user_id,
+            File_data.title,
+            File_data.description,
+            User_profile.nickname,
+            User_profile.nickname_id,
+            User_profile.profile_pic,
+            downloaded.label("downloaded")
+        ).join(File_data, File_version.file_data_id == File_data.file_data_id).\
+            outerjoin(User_profile, User_profile.user_id == File_version.user_id).\
+            filter(File_data.project_id == project_id, File_version.last_version == True)
+
+        # filters: ?file_type=application/pdf or image/*, ?uploader=<user id>, ?not_downloaded=1
+        file_type = request.args.get("file_type", "")
+        if file_type.endswith("/*"):
+            latest_versions = latest_versions.filter(File_version.file_type.like(file_type[:-1].replace('%', r'\%').replace('_', r'\_') + '%'))
+        elif file_type:
+            latest_versions = latest_versions.filter(File_version.file_type == file_type)
+        if uploader_raw:
+            latest_versions = latest_versions.filter(File_version.user_id == int(uploader_raw))
+        if request.args.get("not_downloaded", "").lower() in ("1", "true", "yes"):
+            latest_versions = latest_versions.filter(~downloaded, or_(File_version.user_id == None, File_version.user_id != user_id))
+
+        # keyset: (sort key, version_id) strictly after the cursor
+        sort_key = PROJECT_FILE_SORTS[sort]
+        descending = order == "desc"
+        if cursor is not None:
+            latest_versions = latest_versions.filter(keyset_filter([sort_key, File_version.version_id], cursor, descending))
+        if descending:
+            latest_versions = latest_versions.order_by(sort_key.desc(), File_version.version_id.desc())
+        else:
+            latest_versions = latest_versions.order_by(sort_key.asc(), File_version.version_id.asc())
 
-        # Get version IDs user has downloaded
-        downloaded_versions = db.session.query(Last_download.version_id).\
-            filter_by(user_id=user_id).distinct().all()
-        downloaded_version_ids = {vid for (vid,) in downloaded_versions}
+        latest_versions = latest_versions.add_columns(sort_key.label("sort_key"))
+        if limit is not None:
+            latest_versions = latest_versions.limit(limit + 1)
+        latest_versions = latest_versions.all()
+
+        next_cursor = None
+        if limit is not None and len(latest_versions) > limit:
+            latest_versions = latest_versions[:limit]
+            last = latest_versions[-1]
+            next_cursor = encode_cursor([last.sort_key, last.version_id], tag=cursor_tag)
 
         # Prepare file list
-        files_data = []
-        download_flags = {}
-
-        # Iterate through the latest versions and prepare the response
-        for file in latest_versions:
-            uploader = User_profile.query.get(file.user_id)  
-            downloaded = (file.user_id == user_id) or (file.version_id in downloaded_version_ids)
-            files_data.append({
-                "version_id": file.version_id,
-                "file_data_id": file.file_data_id,
-                "title": file.file_data.title,
-                "file_name": file.file_name,
-                "version_number": file.version_number,
-                "file_size": file.file_size,
-                "file_type": file.file_type,
-                "upload_date": file.upload_date.isoformat() if file.upload_date else None,
-                "description": file.file_data.description,
-                "comment": file.comment,
-                "uploader_nickname": uploader.nickname if uploader else "Unknown",
-                "uploader_nickname_id": uploader.nickname_id if uploader else "No ID",
-                "uploader_pic": f"/static/profile_pics/{uploader.profile_pic}" if uploader and uploader.profile_pic else "/static/profile_pics/default.png"  # Add uploader profile picture
-            })
-            download_flags[file.version_id] = downloaded
+        files_data = [ProjectFileDTO.from_row(file) for file in latest_versions]
+        download_flags = {file.version_id: (file.user_id == user_id) or file.downloaded for file in latest_versions}
 
         # Prepare project data
         project_data = {
             "id": project.project_id,
             "name": project.name,
-            "role": membership.role,
+            "role": row.role,
             "description": project.description,
             "created_date": project.created_date.isoformat() if project.created_date else None,
-            "creator": User_profile.query.get(project.creator_id).full_name if project.creator_id else "Unknown"
+            "creator": row.full_name if project.creator_id else "Unknown"
         }
 
         return jsonify({
             "project": project_data,
             "files": files_data,
-            "download_file_results": download_flags
+            "download_file_results": download_flags,
+            "next_cursor": next_cursor
         })
 
     except Exception as e:
@@ -794,56 +1236,70 @@ def create_project():
 @projects_bp.route("/api/files/<int:file_data_id>/versions", methods=["GET"])
 @login_required
 def get_file_versions(file_data_id):
+    # optional paging, newest first; without ?limit every version is returned as before
+    try:
+        limit = parse_limit(request.args.get("limit"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    cursor = None
+    if request.args.get("cursor"):
+        cursor = decode_cursor(request.args["cursor"], tag="versions", length=2)
+        if cursor is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+
     try:
         # Fetch the file data
-        file_data = File_data.query.get(file_data_id)
+        file_data = db.session.get(File_data, file_data_id)
         if not file_data:
             return jsonify({"error": "File not found"}), 404
 
         # Check if the user has access to the project
-        project = Project.query.get(file_data.project_id)
-        user_project = User_Project.query.filter_by(
-            user_id=current_user.user_id,
-            project_id=project.project_id
-        ).first()
-
-        if not user_project:
+        if not is_user_active_member(file_data.project_id, current_user.user_id):
             return jsonify({"error": "Access denied"}), 403
 
-        # Load all versions of the file
-        versions = File_version.query.filter_by(file_data_id=file_data_id)\
-            .order_by(File_version.version_number.desc()).all()
-
-        # Fetch all downloaded versions for the current user
-        downloaded_versions = db.session.query(Last_download.version_id).filter(
+        # Versions of the file with their uploader and the "downloaded" status of the current user
+        downloaded = db.session.query(Last_download.last_download_id).filter(
+            Last_download.user_id == current_user.user_id,
             Last_download.file_data_id == file_data_id,
-            Last_download.user_id == current_user.user_id
-        ).distinct().all()
-        downloaded_version_ids = {vid for (vid,) in downloaded_versions}
-
-        # Build the version history with the "downloaded" status
-        version_history = []
-        for v in versions:
-            uploader = User_profile.query.get(v.user_id)
-            version_history.append({
-                "version_id": v.version_id,
-                "version_number": v.version_number,
-                "file_name": v.file_name,
-                "file_size": v.file_size,
-                "file_type": v.file_type,
-                "upload_date": v.upload_date.isoformat() if v.upload_date else None,
-                "comment": v.comment,
-                "uploader_nickname": uploader.nickname if uploader else "Unknown",
-                "uploader_nickname_id": uploader.nickname_id if uploader else "No ID",
-                "uploader_pic": f"/static/profile_pics/{uploader.profile_pic}" if uploader and uploader.profile_pic else "/static/profile_pics/default.png",  # Added uploader's profile picture
-                "downloaded": v.version_id in downloaded_version_ids
-            })
+            Last_download.version_id == File_version.version_id
+        ).exists()
+
+        versions = db.session.query(
+            File_version.version_id,
+            File_version.version_number,
+            File_version.file_name,
+            File_version.file_size,
+            File_version.file_type,
+            File_version.upload_date,
+            File_version.comment,
+            User_profile.nickname,
+            User_profile.nickname_id,
+            User_profile.profile_pic,
+            downloaded.label("downloaded")
+        ).outerjoin(User_profile, User_profile.user_id == File_version.user_id).\
+            filter(File_version.file_data_id == file_data_id)
+
+        if cursor is not None:
+            versions = versions.filter(keyset_filter([File_version.version_number, File_version.version_id], cursor, descending=True))
+        versions = versions.order_by(File_version.version_number.desc(), File_version.version_id.desc())
+        if limit is not None:
+            versions = versions.limit(limit + 1)
+        versions = versions.all()
+
+        next_cursor = None
+        if limit is not None and len(versions) > limit:
+            versions = versions[:limit]
+            next_cursor = encode_cursor([versions[-1].version_number, versions[-1].version_id], tag="versions")
+
+        version_history = [FileVersionDTO.from_row(v) for v in versions]
 
         # Return the file data and version history
         return jsonify({
             "file_data_id": file_data_id,
             "title": file_data.title,
-            "version_history": version_history
+            "version_history": version_history,
+            "next_cursor": next_cursor
         }), 200
 
     except Exception as e:
@@ -852,27 +1308,50 @@ def get_file_versions(file_data_id):
 
 
 # Get all versions for a project
+# rows per server-side cursor fetch (and per streamed chunk) of the export
+VERSION_EXPORT_BATCH = 1000
+
 @projects_bp.route("/api/projects/<int:project_id>/versions", methods=["GET"])
+@login_required
 def get_project_versions(project_id):
-    project = Project.query.get_or_404(project_id)
-    file_data = File_data.query.filter_by(project_id=project.project_id).all()
+    # Check if the user is an active member of the project
+    if not is_user_active_member(project_id, current_user.user_id):
+        return jsonify({"error": "You are not an active member of this project"}), 403
 
-    if not file_data:
+    # JSON array by default, NDJSON with ?format=ndjson or "Accept: application/x-ndjson"
+    ndjson = request.args.get("format") == "ndjson" or request.accept_mimetypes.best == "application/x-ndjson"
+
+    # Every version of the project in one query, read through a server-side cursor in batches
+    # of VERSION_EXPORT_BATCH rows and streamed as it is read: memory does not grow with the project
+    rows = db.session.execute(
+        select(
+            File_version.version_id,
+            File_version.file_name,
+            File_version.upload_date,
+            File_version.file_size,
+            File_data.description
+        ).join(File_data, File_data.file_data_id == File_version.file_data_id).
+        where(File_data.project_id == project_id).
+        order_by(File_version.file_data_id, File_version.version_number).
+        execution_options(yield_per=VERSION_EXPORT_BATCH)
+    )
+    batches = rows.partitions()
+    first_batch = next(batches, [])
+    if not first_batch:
+        rows.close()
         return jsonify({"error": "No files for this project"}), 404
 
-    versions = []
-    for f in file_data:
-        file_versions = File_version.query.filter_by(file_data_id=f.file_data_id).all()
-        for v in file_versions:
-            versions.append({
-                "version_id": v.version_id,
-                "filename": v.file_name,
-                "timestamp": v.upload_date.isoformat(),
-                "file_size": v.file_size,
-                "description": f.description
-            })
-
-    return jsonify(versions)
+    def export_batches():
+        try:
+            for batch in itertools.chain([first_batch], batches):
+                yield [ProjectVersionDTO.from_row(row) for row in batch]
+        finally:
+            rows.close()
+
+    return Response(
+        stream_with_context(iter_json(export_batches(), ndjson=ndjson)),
+        mimetype="application/x-ndjson" if ndjson else "application/json"
+    )
 # Get all versions for a project end
 
 
@@ -976,11 +1455,17 @@ def update_user():
         if password1 or password2:
             if not current_password:
                 return jsonify({"error": "Current password is required."}), 400
-            if not check_password_hash(user.password, current_password):
-                return jsonify({"error": "Current password is incorrect."}), 400
+            # read from the database: cached profiles (current_user) do not carry the hash
+            stored_hash = db.session.query(User_profile.password).filter_by(user_id=user.user_id).scalar()
+            try:
+                if not verify_password(stored_hash, current_password):
+                    return jsonify({"error": "Current password is incorrect."}), 400
+            except HashingBusy:
+                return jsonify({"error": "Server is busy, please try again."}), 503
         if password1 != password2:
             return jsonify({"error": "Passwords don't match."}), 400
-        elif password1 and check_password_hash(user.password, password1):
+        # current_password matched the stored hash, so comparing with it is enough (no second hash)
+        elif password1 and password1 == current_password:
             return jsonify({"error": "Password can't be the old one."}), 400
         elif not PASSWORD_REGEX.match(password1):
             return jsonify({
@@ -990,10 +1475,16 @@ def update_user():
     # update user data
     if email and email != user.email:
         user.email = email
+        claim_email_invitations(user.user_id, email)
     if full_name and full_name != user.full_name:
         user.full_name = full_name
     if nickname and nickname != user.nickname:
-        user.nickname = nickname
+        # the old nickname_id may be taken under the new nickname
+        try:
+            assign_nickname(user, nickname)
+        except NicknameIdsExhausted:
+            db.session.rollback()
+            return jsonify({"error": "No available nickname IDs for this nickname."}), 400
     if mobile and mobile != user.mobile:
         user.mobile = mobile
     if job and job != user.job:
@@ -1004,9 +1495,15 @@ def update_user():
         if selected_pic in profile_pics:
             user.profile_pic = selected_pic
     if password1:
-        user.password = generate_password_hash(password1, method='pbkdf2:sha256')
+        try:
+            user.password = hash_password(password1)
+        except HashingBusy:
+            db.session.rollback()
+            return jsonify({"error": "Server is busy, please try again."}), 503
 
     db.session.commit()
+    invalidate_user(user.user_id)
+    invalidate_member_profile(user.user_id)
     return jsonify({"message": "Your changes have been saved!"})
 # settings update logic end
 
@@ -1033,7 +1530,7 @@ def create_project():
     )
 
     db.session.add(new_project)
-    db.session.commit()
+    db.session.flush()
 
     creator_relation = User_Project(
         user_id=current_user.user_id,
@@ -1042,19 +1539,14 @@ def create_project():
     )
 
     db.session.add(creator_relation)
+    db.session.flush()
+    # a new project has no files yet, so nothing is stale for the owner
+    record_membership(current_user.user_id, new_project.project_id, stale_files=0)
 
-    # Handle invited user emails
+    # Handle invited user emails (addresses without an account are invited by email);
+    # project, owner and invitations are committed together
     if invited_emails:
-        email_list = [email.strip() for email in invited_emails.replace("\n", ",").split(",") if email.strip()]
-        for email in email_list:
-            invited_user = User_profile.query.filter_by(email=email).first()
-            new_invite = Invitation(
-                invited_email=email,
-                invited_user_id=invited_user.user_id if invited_user else None,
-                referrer_id=current_user.user_id,
-                project_id=new_project.project_id
-            )
-            db.session.add(new_invite)
+        invite_emails(new_project.project_id, current_user.user_id, split_emails(invited_emails), invite_unknown=True)
 
     db.session.commit()
 
@@ -1064,70 +1556,12 @@ def create_project():
 @views.route('/api/mainpage', methods=['GET', 'POST'])
 @login_required
 def home():
-    user = User_profile.query.get(current_user.user_id)
+    user = load_user_profile(current_user.user_id)
 
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    # Build project list with same shape as get_user_projects stored procedure (ORM-based fallback)
-    user_projects = User_Project.query.filter_by(user_id=user.user_id, is_removed=False).all()
-    roles_list = []
-
-    for up in user_projects:
-        project = Project.query.get(up.project_id)
-        if not project:
-            continue
-        creator = User_profile.query.get(project.creator_id) if project.creator_id else None
-
-        # Latest version per file in this project (for has_latest and last_modified)
-        latest_per_file = (
-            db.session.query(File_version)
-            .join(File_data, File_version.file_data_id == File_data.file_data_id)
-            .filter(File_data.project_id == project.project_id, File_version.last_version == True)
-            .all()
-        )
-
-        # has_latest: no file has a newer version the user hasn't downloaded (and not uploaded by user)
-        has_latest = True
-        last_modified_date = project.created_date
-        last_modified_by = "Unknown"
-
-        for fv in latest_per_file:
-            if fv.upload_date and (last_modified_date is None or fv.upload_date > last_modified_date):
-                last_modified_date = fv.upload_date
-                uploader = User_profile.query.get(fv.user_id)
-                last_modified_by = uploader.full_name if uploader else "Unknown"
-            if fv.user_id == user.user_id:
-                continue
-            ld = Last_download.query.filter_by(
-                user_id=user.user_id,
-                file_data_id=fv.file_data_id,
-                version_id=fv.version_id,
-            ).first()
-            if not ld:
-                has_latest = False
-
-        created_dt = project.created_date
-        last_modified_dt = last_modified_date or created_dt
-
-        roles_list.append({
-            "project_id": project.project_id,
-            "project_name": project.name or "",
-            "role": up.role.value if hasattr(up.role, "value") else up.role,
-            "created_date": created_dt.isoformat() if created_dt else None,
-            "creator_name": creator.full_name if creator else "Unknown",
-            "creator_profile_picture": creator.profile_pic if creator and creator.profile_pic else "default.png",
-            "has_latest": has_latest,
-            "description": project.description or "",
-            "last_modified_by": last_modified_by,
-            "last_modified_date": last_modified_dt.isoformat() if last_modified_dt else None,
-            "nickname": creator.nickname if creator else None,
-            "nickname_id": creator.nickname_id if creator else None,
-        })
-
-    # Sort: has_latest ASC (False first), then last_modified_date DESC (stable sort)
-    roles_list.sort(key=lambda r: (r["last_modified_date"] or ""), reverse=True)
-    roles_list.sort(key=lambda r: (0 if r["has_latest"] else 1))
+    roles_list = get_dashboard_roles(user.user_id)
 
     response_data = {
         "user": {
@@ -1136,7 +1570,7 @@ def home():
             "email": user.email,
             "nickname": user.nickname,
             "nickname_id": user.nickname_id,
-            "profile_pic": f"/static/profile_pics/{user.profile_pic}" if user.profile_pic else "/static/profile_pics/default.png"
+            "profile_pic": profile_pic_url(user.profile_pic)
         },
         "roles": roles_list
     }
@@ -1148,14 +1582,14 @@ def home():
 @views.route('/api/profile', methods=['GET'])
 @login_required
 def get_profile():
-    user = User_profile.query.get(current_user.user_id)
+    user = load_user_profile(current_user.user_id)
 
     if not user:
         return jsonify({"error": "User not found"}), 404
 
     profile_data = {
         "name": user.full_name,
-        "avatar": f"/static/profile_pics/{user.profile_pic}" if user.profile_pic else "/static/profile_pics/default.png",
+        "avatar": profile_pic_url(user.profile_pic),
         "nickname_id": user.nickname_id,
         "nickname": user.nickname,
     }
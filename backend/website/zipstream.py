@@ -0,0 +1,87 @@
+import os
+import zipfile
+
+# Builds a ZIP archive on the fly so downloads can start before the whole archive exists.
+# Nothing is written to disk and memory use is bounded by CHUNK_SIZE (plus the deflate window).
+
+CHUNK_SIZE = 64 * 1024
+
+# formats that are already compressed; deflating them again only burns CPU
+STORED_EXTENSIONS = {
+    'zip', 'rar', '7z', 'gz', 'tgz', 'bz2', 'xz',
+    'docx', 'xlsx', 'pptx', 'odt', 'ods', 'odp',
+    'png', 'jpg', 'jpeg', 'gif', 'webp',
+    'mp3', 'mp4', 'mov', 'avi', 'mkv',
+}
+
+
+# write-only sink for ZipFile: no seek(), so zipfile writes data descriptors instead of patching headers
+class _ChunkSink:
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def compress_type_for(filename):
+    ext = os.path.splitext(filename)[1].lstrip('.').lower()
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+# archive names must be unique, "a.txt" twice becomes "a.txt" and "a (2).txt"
+def unique_arcnames(names):
+    seen = set()
+    result = []
+    for name in names:
+        candidate = name
+        base, ext = os.path.splitext(name)
+        counter = 2
+        while candidate in seen:
+            candidate = f"{base} ({counter}){ext}"
+            counter += 1
+        seen.add(candidate)
+        result.append(candidate)
+    return result
+
+
+# entries: iterable of (path on disk, name inside the archive); yields the archive as bytes chunks
+def stream_zip(entries, chunk_size=CHUNK_SIZE):
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode='w', allowZip64=True) as archive:
+        for path, arcname in entries:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = compress_type_for(arcname)
+
+            with open(path, 'rb') as source, archive.open(info, mode='w') as target:
+                while True:
+                    chunk = source.read(chunk_size)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+
+            data = sink.drain()
+            if data:
+                yield data
+
+    # central directory
+    data = sink.drain()
+    if data:
+        yield data
@@ -23,6 +23,12 @@ function truncateComment(comment) {
   return comment.length > 30 ? comment.slice(0, 30) + '...' : comment;
 }
 
+// Files loaded per page of the project file list (more on demand)
+const FILE_PAGE_SIZE = 50;
+
+// Versions loaded per page of the version history (older pages on demand)
+const VERSION_PAGE_SIZE = 20;
+
 // Helper for JSON API calls that need authentication cookies
 async function fetchJsonWithAuth(url, options = {}) {
   const response = await fetch(url, {
@@ -59,6 +65,7 @@ const ProjectsPage = () => {
 
   const [project, setProject] = useState(null);
   const [files, setFiles] = useState([]);
+  const [filesCursor, setFilesCursor] = useState(null); // cursor of the next page of the file list
   const [selectedFiles, setSelectedFiles] = useState([]);
   const [showUploadModal, setShowUploadModal] = useState(false);
   const [showDownloadModal, setShowDownloadModal] = useState(false);
@@ -67,6 +74,7 @@ const ProjectsPage = () => {
   const [versionUploadData, setVersionUploadData] = useState({ file: null, comment: '' });
   const [expandedFile, setExpandedFile] = useState(null);
   const [fileVersions, setFileVersions] = useState({});
+  const [versionCursors, setVersionCursors] = useState({}); // cursor of the next (older) page per file
   const [download_file_results, setDownloadFileResults] = useState({}); // To track download results 
   const [localError, setLocalError] = useState(null); // used for version fetch errors
   const [showDescription, setShowDescription] = useState(false);
@@ -121,10 +129,13 @@ const ProjectsPage = () => {
   }, []);
 
   // Fetch project data
-  // Fetch project data from the server
-  const fetchProjectData = React.useCallback(async () => {
+  // Fetch project data from the server; with a cursor the next page of files is appended
+  const fetchProjectData = React.useCallback(async (cursor = null) => {
     try {
-      const { response, data } = await fetchJsonWithAuth(`${API_BASE_URL}/project/${project_id}`);
+      const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+      const { response, data } = await fetchJsonWithAuth(
+        `${API_BASE_URL}/project/${project_id}?limit=${FILE_PAGE_SIZE}${cursorParam}`
+      );
 
       if (!response.ok) {
         const errorMessage =
@@ -139,10 +150,11 @@ const ProjectsPage = () => {
       }
       console.log("Project data:", data); // Debugging
 
-      const sortedFiles = data.files.sort((a, b) => new Date(b.upload_date) - new Date(a.upload_date));
+      // pages come newest upload first
       setProject(data.project);
-      setFiles(sortedFiles);
-      setDownloadFileResults(data.download_file_results); // Store download_file_results in state
+      setFiles((prev) => (cursor ? [...prev, ...data.files] : data.files));
+      setDownloadFileResults((prev) => (cursor ? { ...prev, ...data.download_file_results } : data.download_file_results)); // Store download_file_results in state
+      setFilesCursor(data.next_cursor || null);
     } catch (error) {
       console.error("Error fetching project data:", error);
       showGlobalMessage("An error occurred while fetching project data.");
@@ -151,10 +163,11 @@ const ProjectsPage = () => {
     }
   }, [project_id, showGlobalMessage, hideLoader]);
 
-  const fetchFileVersions = async (fileId) => {
+  const fetchFileVersions = async (fileId, cursor = null) => {
     try {
+      const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
       const { response, data } = await fetchJsonWithAuth(
-        `${API_BASE_URL}/api/files/${fileId}/versions`
+        `${API_BASE_URL}/api/files/${fileId}/versions?limit=${VERSION_PAGE_SIZE}${cursorParam}`
       );
 
       if (!response.ok) {
@@ -170,7 +183,11 @@ const ProjectsPage = () => {
       }
       setFileVersions((prev) => ({
         ...prev,
-        [fileId]: data.version_history,
+        [fileId]: cursor ? [...(prev[fileId] || []), ...data.version_history] : data.version_history,
+      }));
+      setVersionCursors((prev) => ({
+        ...prev,
+        [fileId]: data.next_cursor || null,
       }));
     } catch (error) {
       console.error(`Error fetching versions for file ${fileId}:`, error);
@@ -633,7 +650,16 @@ const ProjectsPage = () => {
                                         </td>
                                       </tr>
                                     ))}
-                                  {fileVersions[file.file_data_id].filter((version) => version.version_id !== file.version_id).length === 0 && (
+                                  {versionCursors[file.file_data_id] && (
+                                    <tr>
+                                      <td colSpan="9" style={{ textAlign: "center" }}>
+                                        <button onClick={() => fetchFileVersions(file.file_data_id, versionCursors[file.file_data_id])}>
+                                          Show older versions
+                                        </button>
+                                      </td>
+                                    </tr>
+                                  )}
+                                  {!versionCursors[file.file_data_id] && fileVersions[file.file_data_id].filter((version) => version.version_id !== file.version_id).length === 0 && (
                                     <tr>
                                       <td colSpan="9" style={{ textAlign: "center" }}>There are no older versions yet.</td>
                                     </tr>
@@ -649,6 +675,13 @@ const ProjectsPage = () => {
                 ))}
               </tbody>
             </table>
+            {filesCursor && (
+              <div style={{ textAlign: "center" }}>
+                <button className={styles['button-secondary']} onClick={() => fetchProjectData(filesCursor)}>
+                  Show more files
+                </button>
+              </div>
+            )}
           </>
         )}
       </section>